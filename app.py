@@ -4,7 +4,9 @@ import os
 import secrets
 import time
 import traceback
-from utils.db import get_db_connection
+from utils.db_replica import init_read_replica
+from utils.sql_profiler import init_sql_profiler
+from utils.file_cache import cache_stats as file_cache_stats
 
 # ============================================
 # Flask 앱 생성
@@ -53,6 +55,36 @@ app.config['SESSION_COOKIE_SAMESITE'] = 'Lax'    # 외부 사이트 POST 요청
 
 CORS(app, origins=['https://www.schoolwithus.co.kr', 'https://schoolwithus.co.kr', 'https://schoolwithus.kr', 'https://www.schoolwithus.kr'])
 
+# ============================================
+# DB 커넥션 훅 (블루프린트 import 전에 설치해야 라우트의 get_db_connection에 반영됨)
+# - 읽기 복제본 라우팅 (SCHOOLUS_DB_REPLICA_HOST 설정 시 활성화)
+# - SQL 계측 (SCHOOLUS_SQL_PROFILE=true 시 활성화)
+# ============================================
+init_read_replica(app)
+init_sql_profiler(app)
+
+# 훅 설치 이후 import — `from utils.db import get_db_connection`을 쓰는 모듈(앱 자체 포함)이
+# 감싼 버전을 받아야 마이그레이션/발송함/통계 쿼리도 복제본 라우팅·SQL 계측 대상이 됨
+from utils.db import get_db_connection
+from utils.migrations import run_migrations, require_migrations, AUTO_MIGRATE_ENABLED
+from utils.push_outbox import start_outbox_worker
+from utils.public_stats import get_public_stats
+
+# ============================================
+# DB 마이그레이션 (인덱스/정렬키 — 라우트 쿼리가 의존하므로 기동 시 적용)
+# 비활성화: SCHOOLUS_AUTO_MIGRATE=false (이 경우 python -m utils.migrations 수동 실행)
+# 적용 실패/미실행으로 버전이 빠져 있으면 기동 중단 (require_migrations)
+# ============================================
+if AUTO_MIGRATE_ENABLED:
+    run_migrations()
+require_migrations()
+
+# ============================================
+# 푸시 발송함 워커 (SCHOOLUS_PUSH_WORKER=inprocess 일 때 워커 프로세스마다 스레드 1개)
+# external 배포는 python -m utils.push_outbox 별도 실행
+# ============================================
+start_outbox_worker()
+
 
 # ============================================
 # 보안 미들웨어 (취약점 1~6번 통합 해결)
@@ -379,28 +411,23 @@ def security_after_request(response):
 # ============================================
 @app.route('/api/public/stats')
 def public_stats():
+    # site_stats 집계값을 메모리에서 응답 (utils/public_stats.py) — 명단 테이블 조회 없음
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute("SELECT COUNT(DISTINCT school_id) AS cnt FROM tea_all")
-        schools = cursor.fetchone()['cnt'] or 0
-        cursor.execute("SELECT COUNT(*) AS cnt FROM tea_all")
-        teachers = cursor.fetchone()['cnt'] or 0
-        cursor.execute("SELECT COUNT(*) AS cnt FROM stu_all")
-        students = cursor.fetchone()['cnt'] or 0
-        cursor.execute("SELECT COUNT(*) AS cnt FROM fm_all")
-        parents = cursor.fetchone()['cnt'] or 0
-        cursor.close()
-        conn.close()
-        return jsonify({
-            'success': True,
-            'schools': schools,
-            'teachers': teachers,
-            'students': students,
-            'parents': parents
-        })
+        stats = get_public_stats()
     except Exception as e:
-        return jsonify({'success': True, 'schools': 0, 'teachers': 0, 'students': 0, 'parents': 0})
+        stats = {'schools': 0, 'teachers': 0, 'students': 0, 'parents': 0}
+    response = jsonify({'success': True, **stats})
+    response.headers['Cache-Control'] = 'public, max-age=300'
+    return response
+
+# ============================================
+# 첨부파일 디스크 캐시 통계 (교사 전용, 워커 프로세스 단위)
+# ============================================
+@app.route('/api/debug/file-cache')
+def file_cache_report():
+    if session.get('user_role') != 'teacher':
+        return jsonify({'success': False, 'message': '권한이 없습니다.'}), 403
+    return jsonify({'success': True, **file_cache_stats()})
 
 # ============================================
 # Blueprint 등록
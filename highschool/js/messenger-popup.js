@@ -422,7 +422,7 @@
     function _fileHtml(m){
         if(!m.file_name) return '';
         const url=`/api/message/file/download?message_id=${m.id}`;
-        if(m.message_type==='image') return `<img src="${url}" class="rounded-lg max-w-full max-h-48 cursor-pointer mb-1" onclick="window.open(this.src)" alt="${_esc(m.file_name)}">`;
+        if(m.message_type==='image') return `<img src="/api/message/file/thumb?message_id=${m.id}&size=m" loading="lazy" decoding="async" class="rounded-lg max-w-full max-h-48 cursor-pointer mb-1" onclick="window.open('${url}')" alt="${_esc(m.file_name)}">`;
         const cls=m.is_mine?'bg-blue-400/30 text-white hover:bg-blue-400/50':'bg-slate-100 text-slate-600 hover:bg-slate-200';
         return `<a href="${url}" target="_blank" class="flex items-center gap-2 ${cls} rounded-lg px-3 py-2 mb-1 transition text-xs"><i class="fas fa-file-download"></i>${_esc(m.file_name)}</a>`;
     }
@@ -1122,7 +1122,7 @@ def search_students():
             query += " AND class_grade = %s"
             params.append(grade)
 
-        query += " ORDER BY class_grade, class_no, CAST(class_num AS UNSIGNED) LIMIT 50"
+        query += " ORDER BY class_grade, class_no, class_num_sort LIMIT 50"
         cursor.execute(query, params)
 
         students = []
@@ -3,17 +3,18 @@ assignment.py - 과제 출제/제출 API + 학생 동아리 파일 제출
 교사: 과제 출제, 목록, 삭제, 제출현황, 제출파일 다운로드
 학생: 수강과목 조회, 과제목록, 과제 제출, 동아리 목록, 동아리 파일 업로드/조회/삭제
 """
-import io
 import os
 import time
 from datetime import datetime
-from flask import Blueprint, request, jsonify, send_file, session
+from flask import Blueprint, request, jsonify, session
 
 from routes.subject_utils import (
     get_db_connection, sanitize_input, sanitize_html,
-    sftp_upload_file, sftp_download_file, sftp_remove_file,
+    sftp_upload_file, sftp_remove_file,
     allowed_file
 )
+from utils.file_stream import sftp_send_file
+from utils.file_cache import invalidate_cached_file
 
 assignment_bp = Blueprint('assignment', __name__)
 
@@ -472,10 +473,10 @@ def download_submission(submission_id):
         result = cursor.fetchone()
         if not result:
             return jsonify({'success': False, 'message': '제출물을 찾을 수 없습니다.'})
-        file_data = sftp_download_file(result['file_path'])
-        if not file_data:
+        response = sftp_send_file(result['file_path'], result['file_name'])
+        if response is None:
             return jsonify({'success': False, 'message': '서버에서 파일을 찾을 수 없습니다.'})
-        return send_file(io.BytesIO(file_data), as_attachment=True, download_name=result['file_name'])
+        return response
     except Exception as e:
         print(f"제출 파일 다운로드 오류: {e}")
         return jsonify({'success': False, 'message': '파일 다운로드 중 오류가 발생했습니다.'})
@@ -717,6 +718,7 @@ def delete_student_club_file():
 
         if result['file_path']:
             sftp_remove_file(result['file_path'])
+            invalidate_cached_file(result['file_path'])
 
         cursor.execute("DELETE FROM club_files WHERE id = %s", (file_id,))
         conn.commit()
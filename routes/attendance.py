@@ -11,6 +11,9 @@ SchoolUs 출결 관리 API
 
 from flask import Blueprint, request, jsonify, session
 from utils.db import get_db_connection, sanitize_input
+from utils.db_replica import read_only
+from utils.date_range import month_range
+from utils.db_batch import bulk_insert
 
 attendance_bp = Blueprint('attendance', __name__)
 
@@ -46,7 +49,7 @@ def get_attendance_sheet():
             LEFT JOIN attendance a ON a.student_id = sa.member_id
               AND a.school_id = sa.school_id AND a.attendance_date = %s
             WHERE sa.school_id = %s AND sa.class_grade = %s AND sa.class_no = %s
-            ORDER BY CAST(sa.class_num AS UNSIGNED)
+            ORDER BY sa.class_num_sort
         """, (att_date, school_id, class_grade, class_no))
 
         students = []
@@ -108,7 +111,7 @@ def save_attendance():
         # autocommit=True 환경에서 명시적 트랜잭션 시작 (원자적 일괄 저장)
         conn.begin()
 
-        saved = 0
+        rows = []
         absent_students = []
         for rec in records:
             student_id = sanitize_input(rec.get('student_id') or rec.get('member_id'), 50)
@@ -119,27 +122,31 @@ def save_attendance():
             if not student_id or status not in valid_statuses:
                 continue
 
-            cursor.execute("""
-                INSERT INTO attendance (school_id, class_grade, class_no, student_id, attendance_date, status, memo, checked_by)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-                ON DUPLICATE KEY UPDATE status=VALUES(status), memo=VALUES(memo), checked_by=VALUES(checked_by)
-            """, (school_id, class_grade, class_no, student_id, att_date, status, memo, teacher_id))
-            saved += 1
+            rows.append((school_id, class_grade, class_no, student_id, att_date, status, memo, teacher_id))
 
             if status in ('absent', 'late', 'sick'):
                 absent_students.append({'student_id': student_id, 'status': status})
 
+        saved = bulk_insert(
+            cursor, 'attendance',
+            ['school_id', 'class_grade', 'class_no', 'student_id', 'attendance_date', 'status', 'memo', 'checked_by'],
+            rows, update_columns=['status', 'memo', 'checked_by'])
+
         conn.commit()
 
         # 결석/지각/병결 시 학부모에게 푸시 알림
         if absent_students:
             try:
-                from utils.push_helper import send_push_to_student
+                from utils.push_helper import send_push_to_students
                 status_names = {'absent': '결석', 'late': '지각', 'sick': '병결', 'early_leave': '조퇴'}
+                # 같은 상태의 학생은 알림 내용이 같으므로 상태별 1건으로 적재 (학생마다 적재/구독 조회하지 않음)
+                by_status = {}
                 for s in absent_students:
-                    status_name = status_names.get(s['status'], s['status'])
-                    send_push_to_student(
-                        school_id, s['student_id'],
+                    by_status.setdefault(s['status'], []).append(s['student_id'])
+                for status, student_ids in by_status.items():
+                    status_name = status_names.get(status, status)
+                    send_push_to_students(
+                        school_id, student_ids,
                         f'출결 알림 - {status_name}',
                         f'자녀가 오늘 {status_name} 처리되었습니다.',
                         '/highschool/fm_homeroom.html'
@@ -231,6 +238,10 @@ def get_monthly_summary():
         if not all([school_id, class_grade, class_no, month]):
             return jsonify({'success': False, 'message': '필수 정보가 누락되었습니다.'})
 
+        month_start, month_end = month_range(month) or (None, None)
+        if not month_start:
+            return jsonify({'success': False, 'message': '월 형식이 올바르지 않습니다. (YYYY-MM)'})
+
         conn = get_db_connection()
         if not conn:
             return jsonify({'success': False, 'message': '데이터베이스 연결 오류'})
@@ -247,10 +258,10 @@ def get_monthly_summary():
                    COUNT(*) AS total_cnt
             FROM attendance
             WHERE school_id = %s AND class_grade = %s AND class_no = %s
-              AND DATE_FORMAT(attendance_date, '%%Y-%%m') = %s
+              AND attendance_date >= %s AND attendance_date < %s
             GROUP BY attendance_date
             ORDER BY attendance_date
-        """, (school_id, class_grade, class_no, month))
+        """, (school_id, class_grade, class_no, month_start, month_end))
 
         daily = []
         for r in cursor.fetchall():
@@ -301,8 +312,11 @@ def get_attendance_stats():
         date_filter = ""
         date_params = []
         if month:
-            date_filter = " AND DATE_FORMAT(a.attendance_date, '%%Y-%%m') = %s"
-            date_params = [month]
+            month_start, month_end = month_range(month) or (None, None)
+            if not month_start:
+                return jsonify({'success': False, 'message': '월 형식이 올바르지 않습니다. (YYYY-MM)'})
+            date_filter = " AND a.attendance_date >= %s AND a.attendance_date < %s"
+            date_params = [month_start, month_end]
 
         cursor.execute("""
             SELECT sa.member_id, m.member_name, sa.class_num,
@@ -316,8 +330,8 @@ def get_attendance_stats():
             JOIN member m ON sa.member_id = m.member_id
             LEFT JOIN attendance a ON a.student_id = sa.member_id AND a.school_id = sa.school_id""" + date_filter + """
             WHERE sa.school_id = %s AND sa.class_grade = %s AND sa.class_no = %s
-            GROUP BY sa.member_id, m.member_name, sa.class_num
-            ORDER BY CAST(sa.class_num AS UNSIGNED)
+            GROUP BY sa.member_id, m.member_name, sa.class_num, sa.class_num_sort
+            ORDER BY sa.class_num_sort
         """, date_params + [school_id, class_grade, class_no])
 
         stats = []
@@ -351,6 +365,7 @@ def get_attendance_stats():
 # 내 출결 현황 (학생용)
 # ============================================
 @attendance_bp.route('/api/attendance/my', methods=['GET'])
+@read_only
 def get_my_attendance():
     conn = None
     cursor = None
@@ -372,6 +387,9 @@ def get_my_attendance():
         if not month:
             from datetime import datetime
             month = datetime.now().strftime('%Y-%m')
+        month_start, month_end = month_range(month) or (None, None)
+        if not month_start:
+            return jsonify({'success': False, 'message': '월 형식이 올바르지 않습니다. (YYYY-MM)'})
 
         cursor.execute("""
             SELECT
@@ -383,8 +401,8 @@ def get_my_attendance():
                 COUNT(*) AS total_cnt
             FROM attendance
             WHERE school_id = %s AND student_id = %s
-              AND DATE_FORMAT(attendance_date, '%%Y-%%m') = %s
-        """, (school_id, student_id, month))
+              AND attendance_date >= %s AND attendance_date < %s
+        """, (school_id, student_id, month_start, month_end))
         summary = cursor.fetchone()
 
         # 최근 이력
@@ -441,6 +459,9 @@ def get_child_attendance():
         if not month:
             from datetime import datetime
             month = datetime.now().strftime('%Y-%m')
+        month_start, month_end = month_range(month) or (None, None)
+        if not month_start:
+            return jsonify({'success': False, 'message': '월 형식이 올바르지 않습니다. (YYYY-MM)'})
 
         cursor.execute("""
             SELECT
@@ -452,8 +473,8 @@ def get_child_attendance():
                 COUNT(*) AS total_cnt
             FROM attendance
             WHERE school_id = %s AND student_id = %s
-              AND DATE_FORMAT(attendance_date, '%%Y-%%m') = %s
-        """, (school_id, student_id, month))
+              AND attendance_date >= %s AND attendance_date < %s
+        """, (school_id, student_id, month_start, month_end))
         summary = cursor.fetchone()
 
         cursor.execute("""
@@ -3,6 +3,9 @@ import re
 import json
 from utils.db import get_db_connection, sanitize_input, validate_phone, validate_birth, hash_password, verify_password
 from utils.email_util import generate_temp_password, send_temp_password_email, mask_email, mask_member_id
+from utils.roster_cache import invalidate_roster
+from utils.public_stats import adjust_public_stats
+from utils.timetable_version import bump_timetable_version
 
 auth_bp = Blueprint('auth', __name__)
 
@@ -235,6 +238,8 @@ def signup():
             first_child_name, first_child_birth
         ))
 
+        stats_delta = {'schools': 0, 'teachers': 0, 'students': 0, 'parents': 0}
+
         if 'teacher' in roles:
             cursor.execute("SELECT id FROM tea_all WHERE member_id = %s", (login_id,))
             existing = cursor.fetchone()
@@ -245,10 +250,14 @@ def signup():
                     WHERE member_id = %s
                 """, (member_name, member_school, school_id, member_birth, member_tel, login_id))
             else:
+                cursor.execute("SELECT 1 FROM tea_all WHERE school_id = %s LIMIT 1", (school_id,))
+                if not cursor.fetchone():
+                    stats_delta['schools'] += 1  # 공개 통계의 학교 수 = 교사가 있는 학교 수
                 cursor.execute("""
                     INSERT INTO tea_all (member_id, member_name, member_school, school_id, member_birth, member_tel)
                     VALUES (%s, %s, %s, %s, %s, %s)
                 """, (login_id, member_name, member_school, school_id, member_birth, member_tel))
+                stats_delta['teachers'] += 1
 
             # 편제표(timetable_tea) 자동 매칭
             timetable_notice = _match_timetable_tea(cursor, school_id, login_id, member_name, member_birth)
@@ -279,9 +288,12 @@ def signup():
                     VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
                 """, (login_id, member_name, member_school, school_id, member_birth, member_tel,
                       stu_grade, stu_class, stu_number))
+                stats_delta['students'] += 1
 
+        parent_school_ids = set()
         if 'parent' in roles:
             cursor.execute("DELETE FROM fm_all WHERE member_id = %s", (login_id,))
+            stats_delta['parents'] -= cursor.rowcount
 
             for child in children:
                 c_name = child.get('child_name', '').strip()
@@ -306,9 +318,21 @@ def signup():
                 """, (login_id, member_name, c_school, c_school_id,
                       member_birth, member_tel, c_name, c_birth,
                       c_grade, c_class, c_number))
+                parent_school_ids.add(c_school_id)
+                stats_delta['parents'] += 1
 
+        adjust_public_stats(cursor, **stats_delta)
         conn.commit()
 
+        # 명단 캐시 무효화
+        if 'teacher' in roles:
+            invalidate_roster(school_id, 'teachers')
+            bump_timetable_version(school_id)  # 편제표 자동 매칭
+        if 'student' in roles:
+            invalidate_roster(school_id, 'students')
+        for p_school_id in parent_school_ids:
+            invalidate_roster(p_school_id, 'parents')
+
         result = {'success': True, 'message': '회원가입이 완료되었습니다.'}
         if 'teacher' in roles and timetable_notice:
             result['timetable_notice'] = timetable_notice
@@ -1290,6 +1314,10 @@ def update_member_info():
                   class_grade, class_no, class_num, member_id))
         
         conn.commit()
+        for sid in {school_id, existing.get('school_id')}:
+            invalidate_roster(sid)
+        if 'teacher' in roles:
+            bump_timetable_version(school_id)  # 담임 고정교과 갱신/편제표 매칭
         
         return jsonify({'success': True, 'message': '회원정보가 수정되었습니다.'})
         
@@ -1360,6 +1388,8 @@ def update_teacher_class_info():
                             existing.get('member_name', ''), existing.get('member_birth'))
 
         conn.commit()
+        invalidate_roster(teacher_school_id, 'teachers')
+        bump_timetable_version(teacher_school_id)
         return jsonify({'success': True, 'message': '저장되었습니다.'})
 
     except Exception as e:
@@ -1462,6 +1492,7 @@ def timetable_match():
             total += cursor.rowcount
 
         conn.commit()
+        bump_timetable_version(school_id)
         return jsonify({'success': True, 'matched_count': total})
 
     except Exception as e:
@@ -2,6 +2,7 @@ from flask import Blueprint, request, jsonify, session
 import json
 import random
 from utils.db import get_db_connection, sanitize_input
+from utils.db_batch import bulk_insert
 
 class_maker_bp = Blueprint('class_maker', __name__)
 
@@ -349,13 +350,11 @@ def auto_assign():
         cursor.execute("DELETE FROM class_maker_result WHERE school_id=%s AND grade=%s",
                         (school_id, grade))
 
-        for r in result:
-            cursor.execute("""
-                INSERT INTO class_maker_result
-                (school_id, grade, member_id, member_name, original_class, assigned_class, score, assignment_type)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-            """, (school_id, grade, r['member_id'], r['member_name'],
-                  r['original_class'], r['assigned_class'], r['score'], r['type']))
+        bulk_insert(
+            cursor, 'class_maker_result',
+            ['school_id', 'grade', 'member_id', 'member_name', 'original_class', 'assigned_class', 'score', 'assignment_type'],
+            [(school_id, grade, r['member_id'], r['member_name'],
+              r['original_class'], r['assigned_class'], r['score'], r['type']) for r in result])
 
         conn.commit()
 
@@ -13,6 +13,7 @@ SchoolUs 학급투표 API
 
 from flask import Blueprint, request, jsonify, session
 from utils.db import get_db_connection, sanitize_input, sanitize_html
+from utils.db_batch import bulk_insert
 
 class_vote_bp = Blueprint('class_vote', __name__)
 
@@ -430,11 +431,10 @@ def respond_vote():
             return jsonify({'success': False, 'message': '하나의 항목만 선택해주세요.'})
 
         # 응답 저장
-        for opt_id in selected_options:
-            cursor.execute("""
-                INSERT INTO class_vote_response (vote_id, option_id, respondent_id, respondent_role)
-                VALUES (%s, %s, %s, %s)
-            """, (vote_id, opt_id, user_id, user_role))
+        bulk_insert(
+            cursor, 'class_vote_response',
+            ['vote_id', 'option_id', 'respondent_id', 'respondent_role'],
+            [(vote_id, opt_id, user_id, user_role) for opt_id in selected_options])
 
         conn.commit()
         return jsonify({'success': True, 'message': '투표가 완료되었습니다.'})
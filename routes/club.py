@@ -1,22 +1,23 @@
 """
 club.py - 동아리 관련 API (목록, 등록, 삭제, 학생관리, 기초작업, 작성, 파일, 공통사항, AI생성)
 """
-import io
 import os
 import time
 import base64
 from datetime import datetime
-from flask import Blueprint, request, jsonify, send_file, session
+from flask import Blueprint, request, jsonify, session
 import requests as http_requests
 
 from routes.subject_utils import (
     get_db_connection, sanitize_input, sanitize_html,
-    sftp_upload_file, sftp_download_file, sftp_remove_file, sftp_makedirs,
+    sftp_remove_file, sftp_makedirs,
     allowed_file,
     call_gemini, resummarize, calc_neis_bytes, byte_instruction,
     check_and_deduct_point,
     SUBJECT_WRITING_RULES, MIDDLE_SUBJECT_WRITING_RULES, AI_POINT_COST
 )
+from utils.file_stream import stream_size, sftp_upload_stream, sftp_send_file
+from utils.file_cache import read_cached_file, invalidate_cached_file
 
 club_bp = Blueprint('club', __name__)
 
@@ -750,8 +751,7 @@ def upload_club_file():
         if not allowed_file(file.filename):
             return jsonify({'success': False, 'message': '허용되지 않는 파일 형식입니다.'})
 
-        file_data = file.read()
-        file_size = len(file_data)
+        file_size = stream_size(file)
         if file_size > 10 * 1024 * 1024:
             return jsonify({'success': False, 'message': '파일 크기는 10MB를 초과할 수 없습니다.'})
 
@@ -761,7 +761,7 @@ def upload_club_file():
         safe_filename = f"{timestamp}_{original_name}"
         remote_path = f"/data/club/{school_id}/{club_name}/{student_id}/{safe_filename}"
 
-        if not sftp_upload_file(file_data, remote_path):
+        if not sftp_upload_stream(file, remote_path):
             return jsonify({'success': False, 'message': '파일 업로드에 실패했습니다.'})
 
         conn = get_db_connection()
@@ -872,10 +872,10 @@ def download_club_file(file_id):
         result = cursor.fetchone()
         if not result:
             return jsonify({'success': False, 'message': '파일을 찾을 수 없습니다.'})
-        file_data = sftp_download_file(result['file_path'])
-        if not file_data:
+        response = sftp_send_file(result['file_path'], result['original_name'])
+        if response is None:
             return jsonify({'success': False, 'message': '서버에서 파일을 찾을 수 없습니다.'})
-        return send_file(io.BytesIO(file_data), as_attachment=True, download_name=result['original_name'])
+        return response
     except Exception as e:
         print(f"동아리 파일 다운로드 오류: {e}")
         return jsonify({'success': False, 'message': '다운로드 중 오류가 발생했습니다.'})
@@ -911,6 +911,7 @@ def delete_club_file():
             return jsonify({'success': False, 'message': '담당 교사만 삭제할 수 있습니다.'}), 403
         if result['file_path']:
             sftp_remove_file(result['file_path'])
+            invalidate_cached_file(result['file_path'])
         cursor.execute("DELETE FROM club_files WHERE id = %s", (file_id,))
         conn.commit()
         return jsonify({'success': True, 'message': '파일이 삭제되었습니다.'})
@@ -985,7 +986,7 @@ def generate_club_record():
                         fpath = fr.get('file_path', '')
                         fname = fr.get('original_name', '')
 
-                        file_data_bytes = sftp_download_file(fpath)
+                        file_data_bytes = read_cached_file(fpath)
                         if not file_data_bytes:
                             continue
 
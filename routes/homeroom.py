@@ -1,5 +1,7 @@
 from flask import Blueprint, request, jsonify, send_file, session
 from utils.db import get_db_connection, sanitize_input, sanitize_html
+from utils.roster_cache import get_roster, invalidate_roster, roster_schools
+from utils.public_stats import adjust_public_stats
 import io
 
 homeroom_bp = Blueprint('homeroom', __name__)
@@ -26,17 +28,14 @@ def check_homeroom_teacher():
         cursor = conn.cursor()
         
         if school_id:
-            cursor.execute("""
-                SELECT class_grade, class_no, member_name FROM tea_all 
-                WHERE school_id = %s AND member_id = %s AND class_grade IS NOT NULL AND class_no IS NOT NULL
-            """, (school_id, member_id))
+            roster = get_roster(school_id, 'teachers', cursor)
+            result = roster.get(member_id) if roster else None
         else:
             cursor.execute("""
                 SELECT class_grade, class_no, member_name FROM tea_all 
                 WHERE member_school = %s AND member_id = %s AND class_grade IS NOT NULL AND class_no IS NOT NULL
             """, (member_school, member_id))
-        
-        result = cursor.fetchone()
+            result = cursor.fetchone()
         
         if result and result['class_grade'] and result['class_no']:
             return jsonify({
@@ -79,17 +78,15 @@ def get_homeroom_teacher():
         cursor = conn.cursor()
         
         if school_id:
-            cursor.execute("""
-                SELECT member_name, member_id FROM tea_all 
-                WHERE school_id = %s AND class_grade = %s AND class_no = %s LIMIT 1
-            """, (school_id, class_grade, class_no))
+            roster = get_roster(school_id, 'teachers', cursor)
+            homeroom = roster.in_class(class_grade, class_no) if roster else []
+            result = homeroom[0] if homeroom else None
         else:
             cursor.execute("""
                 SELECT member_name, member_id FROM tea_all 
                 WHERE member_school = %s AND class_grade = %s AND class_no = %s LIMIT 1
             """, (member_school, class_grade, class_no))
-        
-        result = cursor.fetchone()
+            result = cursor.fetchone()
         
         if result:
             return jsonify({'success': True, 'teacher_name': result['member_name'], 'teacher_id': result['member_id']})
@@ -134,12 +131,12 @@ def get_homeroom_students():
         if school_id:
             cursor.execute("""
                 SELECT id, member_id, member_name, member_birth, member_tel, class_num, class_role, point
-                FROM stu_all WHERE school_id = %s AND class_grade = %s AND class_no = %s ORDER BY CAST(class_num AS UNSIGNED) ASC, class_num ASC
+                FROM stu_all WHERE school_id = %s AND class_grade = %s AND class_no = %s ORDER BY class_num_sort ASC, class_num ASC
             """, (school_id, class_grade, class_no))
         else:
             cursor.execute("""
                 SELECT id, member_id, member_name, member_birth, member_tel, class_num, class_role, point
-                FROM stu_all WHERE member_school = %s AND class_grade = %s AND class_no = %s ORDER BY CAST(class_num AS UNSIGNED) ASC, class_num ASC
+                FROM stu_all WHERE member_school = %s AND class_grade = %s AND class_no = %s ORDER BY class_num_sort ASC, class_num ASC
             """, (member_school, class_grade, class_no))
 
         students = cursor.fetchall()
@@ -230,9 +227,12 @@ def assign_student_to_class():
             return jsonify({'success': False, 'message': '데이터베이스 연결 오류'})
 
         cursor = conn.cursor()
+        schools = roster_schools(cursor, 'students', 'id', [student_db_id])
         cursor.execute("UPDATE stu_all SET class_grade = %s, class_no = %s, class_num = %s, updated_at = NOW() WHERE id = %s",
                         (class_grade, class_no, class_num, student_db_id))
         conn.commit()
+        for sid in schools:
+            invalidate_roster(sid, 'students')
         return jsonify({'success': True, 'message': '학생이 반에 배정되었습니다.'})
 
     except Exception as e:
@@ -271,9 +271,9 @@ def add_student():
         cursor = conn.cursor()
 
         if school_id:
-            cursor.execute("SELECT id, member_name, member_birth, member_tel FROM stu_all WHERE school_id = %s AND member_name = %s", (school_id, member_name))
+            cursor.execute("SELECT id, school_id, member_name, member_birth, member_tel FROM stu_all WHERE school_id = %s AND member_name = %s", (school_id, member_name))
         else:
-            cursor.execute("SELECT id, member_name, member_birth, member_tel FROM stu_all WHERE member_school = %s AND member_name = %s", (member_school, member_name))
+            cursor.execute("SELECT id, school_id, member_name, member_birth, member_tel FROM stu_all WHERE member_school = %s AND member_name = %s", (member_school, member_name))
 
         candidates = cursor.fetchall()
         existing = None
@@ -296,13 +296,16 @@ def add_student():
             update_params.append(existing['id'])
             cursor.execute(f"UPDATE stu_all SET {', '.join(update_parts)} WHERE id = %s", update_params)
             conn.commit()
+            invalidate_roster(existing['school_id'], 'students')
             return jsonify({'success': True, 'message': f'{member_name} 학생이 반에 배정되었습니다. (기존 학생)', 'is_new': False})
         else:
             cursor.execute("""
                 INSERT INTO stu_all (member_id, school_id, member_school, member_name, member_birth, member_tel, class_grade, class_no, class_num, created_at)
                 VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, NOW())
             """, ('', school_id, member_school, member_name, member_birth or None, member_tel or None, class_grade, class_no, class_num or None))
+            adjust_public_stats(cursor, students=1)
             conn.commit()
+            invalidate_roster(school_id, 'students')
             return jsonify({'success': True, 'message': f'{member_name} 학생이 새로 등록되었습니다.', 'is_new': True})
 
     except Exception as e:
@@ -331,8 +334,11 @@ def remove_student_from_class():
             return jsonify({'success': False, 'message': '데이터베이스 연결 오류'})
 
         cursor = conn.cursor()
+        schools = roster_schools(cursor, 'students', 'id', [student_db_id])
         cursor.execute("UPDATE stu_all SET class_grade = NULL, class_no = NULL, class_num = NULL, updated_at = NOW() WHERE id = %s", (student_db_id,))
         conn.commit()
+        for sid in schools:
+            invalidate_roster(sid, 'students')
         return jsonify({'success': True, 'message': '학생이 반에서 제거되었습니다.'})
 
     except Exception as e:
@@ -426,6 +432,7 @@ def upload_students():
         cursor = conn.cursor()
 
         added = 0; updated = 0; skipped = 0; errors = []
+        touched_schools = {school_id}   # 무효화 대상: 신규 행의 학교 + 갱신된 기존 행의 학교
 
         for row_idx, row in enumerate(ws.iter_rows(min_row=3, values_only=True), start=3):
             if not row or not row[0]: continue
@@ -441,9 +448,9 @@ def upload_students():
 
             try:
                 if school_id:
-                    cursor.execute("SELECT id, member_birth, member_tel FROM stu_all WHERE school_id = %s AND member_name = %s", (school_id, member_name))
+                    cursor.execute("SELECT id, school_id, member_birth, member_tel FROM stu_all WHERE school_id = %s AND member_name = %s", (school_id, member_name))
                 else:
-                    cursor.execute("SELECT id, member_birth, member_tel FROM stu_all WHERE member_school = %s AND member_name = %s", (member_school, member_name))
+                    cursor.execute("SELECT id, school_id, member_birth, member_tel FROM stu_all WHERE member_school = %s AND member_name = %s", (member_school, member_name))
                 candidates = cursor.fetchall()
                 existing = None
                 for c in candidates:
@@ -459,6 +466,7 @@ def upload_students():
                     if member_birth and not existing['member_birth']: update_parts.append("member_birth = %s"); update_params.append(member_birth)
                     update_params.append(existing['id'])
                     cursor.execute(f"UPDATE stu_all SET {', '.join(update_parts)} WHERE id = %s", update_params)
+                    touched_schools.add(existing['school_id'])
                     updated += 1
                 else:
                     cursor.execute("""INSERT INTO stu_all (member_id, school_id, member_school, member_name, member_birth, member_tel, class_grade, class_no, class_num, created_at)
@@ -468,7 +476,10 @@ def upload_students():
             except Exception as row_err:
                 errors.append(f'{row_idx}행: {str(row_err)}'); skipped += 1
 
+        adjust_public_stats(cursor, students=added)
         conn.commit()
+        for sid in touched_schools:
+            invalidate_roster(sid, 'students')
         msg = f'처리 완료: 신규 {added}명, 업데이트 {updated}명'
         if skipped > 0: msg += f', 오류 {skipped}건'
         return jsonify({'success': True, 'message': msg, 'added': added, 'updated': updated, 'skipped': skipped, 'errors': errors[:10]})
@@ -508,12 +519,15 @@ def update_student_info():
             return jsonify({'success': False, 'message': '데이터베이스 연결 오류'})
 
         cursor = conn.cursor()
+        schools = roster_schools(cursor, 'students', 'id', [student_db_id])
         cursor.execute("""
             UPDATE stu_all SET member_name = %s, member_birth = %s, member_tel = %s,
             class_num = %s, class_role = %s, updated_at = NOW() WHERE id = %s
         """, (member_name, member_birth or None, member_tel or None,
               class_num or None, class_role or None, student_db_id))
         conn.commit()
+        for sid in schools:
+            invalidate_roster(sid, 'students')
         return jsonify({'success': True, 'message': '학생 정보가 수정되었습니다.'})
 
     except Exception as e:
@@ -550,12 +564,15 @@ def update_parent_info():
             return jsonify({'success': False, 'message': '데이터베이스 연결 오류'})
 
         cursor = conn.cursor()
+        schools = roster_schools(cursor, 'parents', 'id', [parent_db_id])
         cursor.execute("""
             UPDATE fm_all SET member_name = %s, member_tel = %s,
             child_name = %s, child_birth = %s, updated_at = NOW() WHERE id = %s
         """, (member_name, member_tel or None, child_name or None,
               child_birth or None, parent_db_id))
         conn.commit()
+        for sid in schools:
+            invalidate_roster(sid, 'parents')
         return jsonify({'success': True, 'message': '학부모 정보가 수정되었습니다.'})
 
     except Exception as e:
@@ -625,13 +642,13 @@ def get_homeroom_parents():
             cursor.execute("""
                 SELECT id, member_id, member_name, member_tel, child_name, child_birth, class_num
                 FROM fm_all WHERE school_id = %s AND class_grade = %s AND class_no = %s
-                ORDER BY CAST(class_num AS UNSIGNED) ASC, class_num ASC
+                ORDER BY class_num_sort ASC, class_num ASC
             """, (school_id, class_grade, class_no))
         else:
             cursor.execute("""
                 SELECT id, member_id, member_name, member_tel, child_name, child_birth, class_num
                 FROM fm_all WHERE member_school = %s AND class_grade = %s AND class_no = %s
-                ORDER BY CAST(class_num AS UNSIGNED) ASC, class_num ASC
+                ORDER BY class_num_sort ASC, class_num ASC
             """, (member_school, class_grade, class_no))
 
         parents = cursor.fetchall()
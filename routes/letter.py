@@ -12,7 +12,10 @@ SchoolUs 가정통신문 API
 
 from flask import Blueprint, request, jsonify, session, make_response
 from utils.db import get_db_connection, sanitize_input, sanitize_html
-from routes.subject_utils import sftp_upload_file, sftp_download_file, sftp_remove_file, allowed_file
+from routes.subject_utils import sftp_upload_file, sftp_remove_file, allowed_file
+from utils.file_stream import sftp_send_file
+from utils.file_cache import invalidate_cached_file
+from utils.fulltext import keyword_filter, SORT_RELEVANCE
 import os
 import csv
 import io
@@ -66,11 +69,18 @@ def get_letter_list():
                    WHERE hl.school_id = %s AND hl.class_grade = %s AND hl.class_no = %s"""
         params = [school_id, class_grade, class_no]
 
+        # 검색어: ngram FULLTEXT (ft_letter_title_content), sort=relevance 이면 관련도순
+        order_sql = "hl.created_at DESC"
         if keyword:
-            query += " AND (hl.title LIKE %s OR hl.content LIKE %s)"
-            params.extend([f'%{keyword}%', f'%{keyword}%'])
-
-        query += " ORDER BY hl.created_at DESC LIMIT 50"
+            where_sql, where_params, score_sql, score_params = keyword_filter(['hl.title', 'hl.content'], keyword)
+            if where_sql:
+                query += " AND " + where_sql
+                params.extend(where_params)
+                if request.args.get('sort') == SORT_RELEVANCE and score_params:
+                    order_sql = f"{score_sql} DESC, hl.created_at DESC"
+                    params.extend(score_params)
+
+        query += f" ORDER BY {order_sql} LIMIT 50"
         cursor.execute(query, params)
 
         letters = []
@@ -284,6 +294,7 @@ def delete_letter():
         if letter['file_path']:
             try:
                 sftp_remove_file(letter['file_path'])
+                invalidate_cached_file(letter['file_path'])
             except:
                 pass
 
@@ -478,13 +489,10 @@ def download_letter_file():
         if not letter or not letter['file_path']:
             return jsonify({'success': False, 'message': '첨부파일이 없습니다.'})
 
-        file_data = sftp_download_file(letter['file_path'])
-        if not file_data:
+        response = sftp_send_file(letter['file_path'], letter['file_name'],
+                                  mimetype='application/octet-stream')
+        if response is None:
             return jsonify({'success': False, 'message': '파일을 찾을 수 없습니다.'})
-
-        response = make_response(file_data)
-        response.headers['Content-Type'] = 'application/octet-stream'
-        response.headers['Content-Disposition'] = f'attachment; filename="{letter["file_name"]}"'
         return response
 
     except Exception as e:
@@ -1,15 +1,79 @@
 from flask import Blueprint, request, jsonify
+import time
+import threading
 from utils.db import get_db_connection, sanitize_input
+from utils.db_replica import read_only, get_primary_connection
+from utils.cache_version import get_version, bump_version
+from utils.http_cache import etag_json
 
 meal_bp = Blueprint('meal', __name__)
 
+# ============================================
+# 급식 월 캐시 (워커 메모리)
+# - (학교, 월) 단위로 한 번 조회해 보관, /today도 같은 월 캐시에서 응답
+# - save_month_meals가 버전을 올려 모든 워커의 해당 월 캐시를 무효화
+# - 캐시는 주 DB에서 채움 (읽기 전용 라우트라도 복제본의 지연된 행이 새 버전으로 TTL 동안 남지 않도록)
+# ============================================
+MEAL_CACHE_TTL = 600  # 버전 확인과 별개로 재조회하는 주기(초)
+
+_meal_cache_lock = threading.Lock()
+_meal_cache = {}
+
+
+def _meal_cache_key(school_id, member_school, month):
+    scope = f"id_{school_id}" if school_id else f"ms_{member_school}"
+    return f"{scope}.{month}"
+
+
+def _get_month_meal_rows(school_id, member_school, month):
+    """해당 월 급식 {day: row}. DB 오류 시 None"""
+    key = _meal_cache_key(school_id, member_school, month)
+    version = get_version('meal', key)
+    cached = _meal_cache.get(key)
+    if cached and cached['version'] == version and time.time() - cached['loaded_at'] < MEAL_CACHE_TTL:
+        return cached['days']
+
+    conn = get_primary_connection()
+    if not conn:
+        return None
+    cursor = None
+    try:
+        cursor = conn.cursor()
+        if school_id:
+            cursor.execute("""
+                SELECT id, school_id, member_school, month, day, menu FROM school_meal
+                WHERE school_id = %s AND month = %s ORDER BY CAST(day AS UNSIGNED)
+            """, (school_id, month))
+        else:
+            cursor.execute("""
+                SELECT id, school_id, member_school, month, day, menu FROM school_meal
+                WHERE member_school = %s AND month = %s ORDER BY CAST(day AS UNSIGNED)
+            """, (member_school, month))
+        days = {str(m['day']): m for m in cursor.fetchall()}
+    finally:
+        if cursor: cursor.close()
+        conn.close()
+
+    with _meal_cache_lock:
+        _meal_cache[key] = {'version': version, 'loaded_at': time.time(), 'days': days}
+    return days
+
+
+def _invalidate_month_meals(school_id, member_school, month):
+    for scope_id, scope_ms in ((school_id, None), (None, member_school)):
+        if not scope_id and not scope_ms:
+            continue
+        key = _meal_cache_key(scope_id, scope_ms, month)
+        bump_version('meal', key)
+        with _meal_cache_lock:
+            _meal_cache.pop(key, None)
+
 # ============================================
 # 급식 정보 조회 API (오늘)
 # ============================================
 @meal_bp.route('/api/meal/today', methods=['GET'])
+@read_only
 def get_today_meal():
-    conn = None
-    cursor = None
     try:
         school_id = sanitize_input(request.args.get('school_id'), 50)
         member_school = sanitize_input(request.args.get('member_school'), 100)
@@ -35,23 +99,14 @@ def get_today_meal():
         month = str(month).zfill(2)
         day = str(int(day))
 
-        conn = get_db_connection()
-        if not conn:
+        days = _get_month_meal_rows(school_id, member_school, month)
+        if days is None:
             return jsonify({'success': False, 'message': '데이터베이스 연결 오류'})
-        
-        cursor = conn.cursor()
-        
-        if school_id:
-            query = "SELECT id, school_id, member_school, month, day, menu FROM school_meal WHERE school_id = %s AND month = %s AND day = %s"
-            cursor.execute(query, (school_id, month, day))
-        else:
-            query = "SELECT id, school_id, member_school, month, day, menu FROM school_meal WHERE member_school = %s AND month = %s AND day = %s"
-            cursor.execute(query, (member_school, month, day))
-        
-        meal = cursor.fetchone()
+
+        meal = days.get(day)
         
         if meal:
-            return jsonify({'success': True, 'meal': {
+            return etag_json({'success': True, 'meal': {
                 'id': meal['id'],
                 'school_id': meal.get('school_id'),
                 'member_school': meal.get('member_school'),
@@ -65,17 +120,13 @@ def get_today_meal():
     except Exception as e:
         print(f"급식 정보 조회 오류: {e}")
         return jsonify({'success': False, 'message': '급식 정보 조회 중 오류가 발생했습니다.'})
-    finally:
-        if cursor: cursor.close()
-        if conn: conn.close()
 
 # ============================================
 # 급식 월간 목록 조회 API
 # ============================================
 @meal_bp.route('/api/meal/month', methods=['GET'])
+@read_only
 def get_month_meals():
-    conn = None
-    cursor = None
     try:
         school_id = sanitize_input(request.args.get('school_id'), 50)
         member_school = sanitize_input(request.args.get('member_school'), 100)
@@ -91,36 +142,22 @@ def get_month_meals():
         # zero-padding 처리 (2 → '02')
         month = str(month).zfill(2)
 
-        conn = get_db_connection()
-        if not conn:
+        days = _get_month_meal_rows(school_id, member_school, month)
+        if days is None:
             return jsonify({'success': False, 'message': '데이터베이스 연결 오류'})
-
-        cursor = conn.cursor()
-
-        if school_id:
-            query = "SELECT id, day, menu FROM school_meal WHERE school_id = %s AND month = %s ORDER BY CAST(day AS UNSIGNED)"
-            cursor.execute(query, (school_id, month))
-        else:
-            query = "SELECT id, day, menu FROM school_meal WHERE member_school = %s AND month = %s ORDER BY CAST(day AS UNSIGNED)"
-            cursor.execute(query, (member_school, month))
-        
-        meals = cursor.fetchall()
         
         meal_dict = {}
-        for m in meals:
-            meal_dict[str(m['day'])] = {
+        for day, m in days.items():
+            meal_dict[day] = {
                 'id': m['id'],
                 'menu': m['menu'] or ''
             }
         
-        return jsonify({'success': True, 'meals': meal_dict, 'year': year, 'month': month})
+        return etag_json({'success': True, 'meals': meal_dict, 'year': year, 'month': month})
         
     except Exception as e:
         print(f"급식 월간 조회 오류: {e}")
         return jsonify({'success': False, 'message': '급식 조회 중 오류가 발생했습니다.'})
-    finally:
-        if cursor: cursor.close()
-        if conn: conn.close()
 
 # ============================================
 # 급식 월간 저장 API
@@ -168,6 +205,7 @@ def save_month_meals():
                 insert_count += 1
         
         conn.commit()
+        _invalidate_month_meals(school_id, member_school, month)
         
         return jsonify({'success': True, 'message': f'{month}월 급식 {insert_count}일분이 저장되었습니다.'})
         
@@ -4,12 +4,20 @@ SchoolUs 메시지 기능 — 독립형 Blueprint
 - 외부 테이블(tea_all, stu_all, fm_all 등) JOIN 없음 → 서버 분리 대비
 """
 
-from flask import Blueprint, request, jsonify, session, make_response
-import json, os, io, time, tempfile, re
+from flask import Blueprint, request, jsonify, session, Response
+import json, os, time, tempfile, re
 from datetime import datetime
-from urllib.parse import quote
 
 from utils.db import get_db_connection, sanitize_input, sanitize_html
+from utils.roster_cache import get_roster, invalidate_roster
+from utils.room_summary import (touch_room, refresh_room_summary, list_rooms, attach_members,
+                                bump_unread, mark_room_read, drop_unread, total_unread)
+from utils.message_bus import publish, publish_many, subscribe, room_channel, member_channel
+from utils.message_history import load_page, resolve_page_args, find_message, locate_message, HOT_TABLE, ARCHIVE_TABLE
+from utils.file_stream import stream_size, sftp_upload_stream, sftp_send_file
+from utils.file_cache import store_cached_file
+from utils.fulltext import keyword_filter, normalize_sort, page_args, SORT_RECENT
+from utils.thumbnails import THUMBNAILS_ENABLED, THUMB_SIZES, thumb_path, schedule_thumbnails, thumbnail_failed
 
 message_bp = Blueprint('message', __name__)
 
@@ -21,6 +29,30 @@ ALLOWED_FILE_EXT = {'pdf', 'doc', 'docx', 'hwp', 'hwpx', 'xlsx', 'xls', 'ppt', '
 ALLOWED_ALL_EXT = ALLOWED_IMAGE_EXT | ALLOWED_FILE_EXT
 MAX_FILE_SIZE = 10 * 1024 * 1024  # 10MB
 
+# 다운로드 MIME 타입
+_MIME_MAP = {
+    'jpg': 'image/jpeg', 'jpeg': 'image/jpeg', 'png': 'image/png',
+    'gif': 'image/gif', 'webp': 'image/webp', 'pdf': 'application/pdf',
+    'doc': 'application/msword', 'docx': 'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
+    'hwp': 'application/x-hwp', 'hwpx': 'application/x-hwpx',
+    'xls': 'application/vnd.ms-excel', 'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    'ppt': 'application/vnd.ms-powerpoint', 'pptx': 'application/vnd.openxmlformats-officedocument.presentationml.presentation',
+    'txt': 'text/plain', 'zip': 'application/zip',
+}
+
+# 메시지 목록/폴링/스트림 응답 컬럼
+_MESSAGE_COLUMNS = ['id', 'room_id', 'sender_id', 'sender_name', 'sender_role', 'content',
+                    'message_type', 'file_name', 'is_system', 'is_deleted', 'created_at']
+
+# ============================================
+# 실시간 스트림(SSE) 설정
+# - 연결 1개가 응답 시간 동안 워커 스레드 1개를 점유 → gthread/gevent 워커에서만 켤 것
+#   (sync 워커 배포는 SCHOOLUS_SSE_ENABLED=false 유지, 클라이언트는 폴링으로 자동 전환)
+# ============================================
+SSE_ENABLED = os.environ.get('SCHOOLUS_SSE_ENABLED', 'false').lower() == 'true'
+SSE_MAX_SECONDS = int(os.environ.get('SCHOOLUS_SSE_MAX_SECONDS', '55'))   # 연결 유지 후 클라이언트 자동 재접속
+SSE_HEARTBEAT_SECONDS = 20                                              # 프록시 유휴 타임아웃 방지
+
 
 def _secure_filename_korean(filename):
     """한글 보존하면서 위험 문자만 제거"""
@@ -71,10 +103,17 @@ def sync_message_user(member_id, school_id, member_name, member_role,
     try:
         cursor = conn.cursor()
         cursor.execute("""
-            SELECT id FROM message_users
+            SELECT id, member_name, member_role, class_grade, class_no, class_num,
+                   parent_of, parent_of_name
+            FROM message_users
             WHERE school_id = %s AND member_id = %s
         """, (school_id, member_id))
         row = cursor.fetchone()
+        new_values = (member_name, member_role, class_grade, class_no, class_num,
+                      parent_of, parent_of_name)
+        if row and tuple(row[k] for k in ('member_name', 'member_role', 'class_grade', 'class_no',
+                                          'class_num', 'parent_of', 'parent_of_name')) == new_values:
+            return  # 변경 없음 → 쓰기/명단 캐시 무효화 생략
         if row:
             cursor.execute("""
                 UPDATE message_users
@@ -93,6 +132,7 @@ def sync_message_user(member_id, school_id, member_name, member_role,
             """, (school_id, member_id, member_name, member_role,
                   class_grade, class_no, class_num, parent_of, parent_of_name))
         conn.commit()
+        invalidate_roster(school_id, 'message_users')
     except Exception as e:
         print(f"[Message] sync_message_user error: {e}")
     finally:
@@ -115,11 +155,9 @@ def _get_session_info():
 
 
 def _get_my_name(cursor, member_id, school_id):
-    """message_users에서 이름 조회"""
-    cursor.execute(
-        "SELECT member_name FROM message_users WHERE member_id=%s AND school_id=%s",
-        (member_id, school_id))
-    row = cursor.fetchone()
+    """message_users에서 이름 조회 (명단 캐시)"""
+    roster = get_roster(school_id, 'message_users', cursor)
+    row = roster.get(member_id) if roster else None
     return row['member_name'] if row else member_id
 
 
@@ -132,12 +170,44 @@ def _is_room_member(cursor, room_id, member_id):
     return cursor.fetchone()
 
 
-def _system_message(cursor, room_id, content):
-    """시스템 메시지 삽입"""
+def _system_message(cursor, room_id, content, actor_id):
+    """
+    시스템 메시지 삽입 — 일반 메시지처럼 행위자를 뺀 멤버의 안 읽은 수 +1
+    → 올린 멤버 id 목록 (커밋 후 _publish_unread로 전달)
+    """
     cursor.execute("""
         INSERT INTO messages (room_id, sender_id, sender_name, sender_role, content, is_system)
         VALUES (%s, 'system', '시스템', 'teacher', %s, 1)
     """, (room_id, content))
+    touch_room(cursor, room_id, cursor.lastrowid, content, '시스템')
+    return bump_unread(cursor, room_id, actor_id)
+
+
+def _push_coalesce(room_id, room_title, sender_id):
+    """대화방 푸시 묶음 설정 — 짧은 시간 안의 연속 메시지는 "○○ 새 메시지 N개" 1건으로"""
+    label = f'{room_title} ' if room_title else ''
+    return {
+        'coalesce_key': f'room:{room_id}',
+        'summary': {'title': '새 메시지', 'body': label + '새 메시지 {count}개'},
+        'sender_id': sender_id,
+    }
+
+
+def _publish_message(room_id, msg_id, sender_id, sender_name, sender_role, content,
+                     message_type, file_name, created_at):
+    """새 메시지 이벤트 발행 (commit 이후 호출)"""
+    publish(room_channel(room_id), 'message', {
+        'id': msg_id, 'room_id': int(room_id), 'sender_id': sender_id,
+        'sender_name': sender_name, 'sender_role': sender_role, 'content': content,
+        'message_type': message_type, 'file_name': file_name,
+        'is_system': 0, 'is_deleted': 0, 'created_at': str(created_at or ''),
+    })
+
+
+def _publish_unread(room_id, recipients):
+    """수신자별 안 읽은 수 +1 이벤트 (각자의 member 채널, commit 이후 호출)"""
+    publish_many([member_channel(m) for m in recipients], 'unread',
+                 {'room_id': int(room_id), 'delta': 1})
 
 
 # ============================================
@@ -225,16 +295,22 @@ def get_user_groups():
     try:
         cursor = conn.cursor()
 
+        # 학년/반 별 인원 (명단 캐시에서 집계)
+        roster = get_roster(school_id, 'message_users', cursor)
+        class_counts = {}
+        for u in (roster.rows if roster else []):
+            if u['member_role'] in ('student', 'parent') and u.get('class_grade'):
+                key = (u['member_role'], u['class_grade'], u['class_no'])
+                class_counts[key] = class_counts.get(key, 0) + 1
+
+        def _class_sort(k):
+            no = str(k[2] or '')
+            return (str(k[1]), int(no) if no.isdigit() else 0)
+
         # 학년/반 별 학생 수
-        cursor.execute("""
-            SELECT class_grade, class_no, COUNT(*) AS cnt
-            FROM message_users
-            WHERE school_id=%s AND member_role='student'
-              AND class_grade IS NOT NULL AND class_grade != ''
-            GROUP BY class_grade, class_no
-            ORDER BY class_grade ASC, CAST(class_no AS UNSIGNED) ASC
-        """, (school_id,))
-        class_groups = cursor.fetchall()
+        class_groups = [{'class_grade': k[1], 'class_no': k[2], 'cnt': cnt}
+                        for k, cnt in sorted(class_counts.items(), key=lambda kv: _class_sort(kv[0]))
+                        if k[0] == 'student']
 
         # 학년별 집계
         grade_map = {}
@@ -249,26 +325,13 @@ def get_user_groups():
             })
 
         # 학년/반 별 학부모 수
-        cursor.execute("""
-            SELECT class_grade, class_no, COUNT(*) AS cnt
-            FROM message_users
-            WHERE school_id=%s AND member_role='parent'
-              AND class_grade IS NOT NULL AND class_grade != ''
-            GROUP BY class_grade, class_no
-            ORDER BY class_grade ASC, CAST(class_no AS UNSIGNED) ASC
-        """, (school_id,))
-        parent_groups = cursor.fetchall()
         parent_map = {}
-        for p in parent_groups:
-            key = f"{p['class_grade']}_{p['class_no']}"
-            parent_map[key] = p['cnt']
+        for k, cnt in class_counts.items():
+            if k[0] == 'parent':
+                parent_map[f"{k[1]}_{k[2]}"] = cnt
 
         # 교사 수
-        cursor.execute("""
-            SELECT COUNT(*) AS cnt FROM message_users
-            WHERE school_id=%s AND member_role='teacher'
-        """, (school_id,))
-        teacher_count = cursor.fetchone()['cnt']
+        teacher_count = roster.count(role='teacher') if roster else 0
 
         grades = sorted(grade_map.values(), key=lambda x: x['grade'])
 
@@ -356,45 +419,11 @@ def get_rooms():
         limit = min(50, int(request.args.get('limit', 30)))
         offset = (page - 1) * limit
 
-        cursor.execute("""
-            SELECT r.id, r.room_type, r.room_title, r.announcement_only,
-                   r.created_at, r.is_active,
-                   rm.is_admin, rm.last_read_at,
-                   (SELECT COUNT(*) FROM messages m
-                    WHERE m.room_id = r.id AND m.is_deleted = 0
-                      AND m.created_at > COALESCE(rm.last_read_at, rm.joined_at, r.created_at)
-                      AND m.sender_id != %s) AS unread_count,
-                   (SELECT m2.content FROM messages m2
-                    WHERE m2.room_id = r.id AND m2.is_deleted = 0
-                    ORDER BY m2.created_at DESC LIMIT 1) AS last_message,
-                   (SELECT m3.sender_name FROM messages m3
-                    WHERE m3.room_id = r.id AND m3.is_deleted = 0
-                    ORDER BY m3.created_at DESC LIMIT 1) AS last_sender,
-                   (SELECT m4.created_at FROM messages m4
-                    WHERE m4.room_id = r.id AND m4.is_deleted = 0
-                    ORDER BY m4.created_at DESC LIMIT 1) AS last_msg_time
-            FROM message_rooms r
-            JOIN message_room_members rm ON rm.room_id = r.id
-            WHERE rm.member_id = %s AND rm.is_active = 1
-              AND r.school_id = %s AND r.is_active = 1
-            ORDER BY COALESCE(
-                (SELECT m5.created_at FROM messages m5
-                 WHERE m5.room_id = r.id AND m5.is_deleted = 0
-                 ORDER BY m5.created_at DESC LIMIT 1),
-                r.created_at
-            ) DESC
-            LIMIT %s OFFSET %s
-        """, (member_id, member_id, school_id, limit, offset))
-        rooms = cursor.fetchall()
+        rooms = list_rooms(cursor, member_id, school_id, limit=limit, offset=offset)
 
-        # 각 방의 멤버 목록 첨부 (이름 표시용)
+        # 각 방의 멤버 목록 첨부 (이름 표시용) — 방 id 목록으로 한 번에 조회
+        attach_members(cursor, rooms)
         for room in rooms:
-            cursor.execute("""
-                SELECT member_id, member_name, member_role, is_admin
-                FROM message_room_members
-                WHERE room_id = %s AND is_active = 1
-            """, (room['id'],))
-            room['members'] = cursor.fetchall()
             # datetime → str
             for key in ('created_at', 'last_read_at', 'last_msg_time'):
                 if room.get(key):
@@ -570,9 +599,12 @@ def create_room():
 
         # 시스템 메시지
         if room_type != 'direct':
-            _system_message(cursor, room_id, f'{my_name}님이 대화방을 만들었습니다.')
+            # 멤버들은 아래 'rooms' 이벤트로 목록을 다시 받으므로 unread 이벤트는 생략
+            _system_message(cursor, room_id, f'{my_name}님이 대화방을 만들었습니다.', member_id)
 
         conn.commit()
+        for tid in [member_id] + list(target_ids):
+            publish(member_channel(tid), 'rooms', {'room_id': room_id})
         return jsonify({'success': True, 'room_id': room_id})
     except Exception as e:
         conn.rollback()
@@ -608,33 +640,13 @@ def get_messages():
         if not mem:
             return jsonify({'success': False, 'message': '대화방 접근 권한이 없습니다.'}), 403
 
-        page = max(1, int(request.args.get('page', 1)))
-        limit = min(100, int(request.args.get('limit', 50)))
-        offset = (page - 1) * limit
+        # 키셋 페이지: cursor+direction(older/newer) 또는 before_id(이전)/after_id(이후), 없으면 최신
+        limit = int(request.args.get('limit', 50))
+        before_id, after_id = resolve_page_args(request.args, room_id)
+        msgs, page_cursor = load_page(
+            cursor, room_id, _MESSAGE_COLUMNS,
+            before_id=before_id, after_id=after_id, limit=limit)
 
-        # before_id: 무한스크롤 — 이 ID보다 작은(이전) 메시지
-        before_id = request.args.get('before_id')
-
-        if before_id:
-            cursor.execute("""
-                SELECT id, room_id, sender_id, sender_name, sender_role,
-                       content, message_type, file_name, is_system, is_deleted, created_at
-                FROM messages
-                WHERE room_id = %s AND id < %s
-                ORDER BY created_at DESC
-                LIMIT %s
-            """, (room_id, before_id, limit))
-        else:
-            cursor.execute("""
-                SELECT id, room_id, sender_id, sender_name, sender_role,
-                       content, message_type, file_name, is_system, is_deleted, created_at
-                FROM messages
-                WHERE room_id = %s
-                ORDER BY created_at DESC
-                LIMIT %s OFFSET %s
-            """, (room_id, limit, offset))
-
-        msgs = cursor.fetchall()
         for m in msgs:
             m['is_mine'] = (m['sender_id'] == member_id)
             if m.get('created_at'):
@@ -660,7 +672,8 @@ def get_messages():
 
         return jsonify({
             'success': True,
-            'messages': list(reversed(msgs)),  # 시간순 정렬
+            'messages': msgs,  # 시간순 정렬
+            'cursor': page_cursor,
             'room': room_info,
             'members': members
         })
@@ -712,7 +725,7 @@ def send_message():
             return jsonify({'success': False, 'message': '대화방 접근 권한이 없습니다.'}), 403
 
         # 공지방/단체방 쓰기 권한 체크
-        cursor.execute("SELECT announcement_only, room_type FROM message_rooms WHERE id=%s", (room_id,))
+        cursor.execute("SELECT announcement_only, room_type, room_title FROM message_rooms WHERE id=%s", (room_id,))
         room = cursor.fetchone()
         if room and room['announcement_only'] and not mem['is_admin']:
             return jsonify({'success': False, 'message': '공지 전용 대화방에서는 관리자만 메시지를 보낼 수 있습니다.'})
@@ -729,7 +742,6 @@ def send_message():
         message_type = 'text'
 
         if uploaded_file and uploaded_file.filename:
-            from routes.subject_utils import sftp_upload_file
             safe_fname = _secure_filename_korean(uploaded_file.filename)
             ext = safe_fname.rsplit('.', 1)[1].lower() if '.' in safe_fname else ''
 
@@ -741,22 +753,24 @@ def send_message():
                 if ext not in ALLOWED_ALL_EXT:
                     return jsonify({'success': False, 'message': '허용되지 않는 파일 형식입니다.'})
 
-            file_data = uploaded_file.read()
-            if len(file_data) == 0:
+            file_size = stream_size(uploaded_file)
+            if file_size == 0:
                 return jsonify({'success': False, 'message': '빈 파일은 업로드할 수 없습니다.'})
-            if len(file_data) > MAX_FILE_SIZE:
+            if file_size > MAX_FILE_SIZE:
                 return jsonify({'success': False, 'message': f'파일 크기가 {MAX_FILE_SIZE // (1024*1024)}MB를 초과합니다.'})
 
             ts = int(time.time())
             remote_path = f'/data/messages/{school_id}/{room_id}/{ts}_{safe_fname}'
 
-            upload_ok = sftp_upload_file(io.BytesIO(file_data), remote_path)
+            upload_ok = sftp_upload_stream(uploaded_file, remote_path)
             if not upload_ok:
                 return jsonify({'success': False, 'message': '파일 업로드에 실패했습니다.'})
 
             file_path = remote_path
             file_name = safe_fname
             message_type = 'image' if ext in ALLOWED_IMAGE_EXT else 'file'
+            if message_type == 'image':
+                _prepare_thumbnails(uploaded_file, remote_path)
 
         # 메시지 INSERT
         cursor.execute("""
@@ -767,45 +781,36 @@ def send_message():
         """, (room_id, member_id, my_name, my_role_enum,
               content, message_type, file_path, file_name))
         msg_id = cursor.lastrowid
+        touch_room(cursor, room_id, msg_id, content, my_name, file_name)
+        recipients = bump_unread(cursor, room_id, member_id)
 
-        # 내 last_read_at 갱신
-        cursor.execute("""
-            UPDATE message_room_members SET last_read_at = NOW()
-            WHERE room_id=%s AND member_id=%s
-        """, (room_id, member_id))
+        # 내 읽음 처리 (last_read_at + 안 읽은 수 0)
+        mark_room_read(cursor, room_id, member_id)
 
         conn.commit()
 
-        # 푸시 알림 (비동기적, 실패해도 메시지 전송은 성공)
+        # 푸시 알림 (백그라운드 큐, 실패해도 메시지 전송은 성공)
         try:
-            from utils.push_helper import send_push_to_user
-            cursor2 = conn.cursor()
-            cursor2.execute("""
-                SELECT member_id FROM message_room_members
-                WHERE room_id=%s AND member_id != %s AND is_active=1
-            """, (room_id, member_id))
-            recipients = cursor2.fetchall()
-            cursor2.close()
-
+            from utils.push_helper import send_push_to_users
             preview = content[:30] + '...' if len(content) > 30 else content
             if not preview and file_name:
                 preview = f'파일: {file_name}'
-            for r in recipients:
-                try:
-                    send_push_to_user(
-                        r['member_id'],
-                        f'{my_name}님의 메시지',
-                        preview or '새 메시지가 도착했습니다.',
-                        f'/highschool/tea/message.html?room={room_id}'
-                    )
-                except Exception:
-                    pass
+            send_push_to_users(
+                recipients,
+                f'{my_name}님의 메시지',
+                preview or '새 메시지가 도착했습니다.',
+                f'/highschool/tea/message.html?room={room_id}',
+                **_push_coalesce(room_id, room and room['room_title'], member_id)
+            )
         except Exception:
             pass
 
         # 생성된 메시지의 시간 조회
         cursor.execute("SELECT created_at FROM messages WHERE id=%s", (msg_id,))
         created_row = cursor.fetchone()
+        _publish_message(room_id, msg_id, member_id, my_name, my_role_enum, content,
+                         message_type, file_name, created_row['created_at'] if created_row else '')
+        _publish_unread(room_id, recipients)
 
         return jsonify({
             'success': True,
@@ -843,12 +848,9 @@ def mark_read():
         return jsonify({'success': False, 'message': 'DB 연결 실패'}), 500
     try:
         cursor = conn.cursor()
-        cursor.execute("""
-            UPDATE message_room_members
-            SET last_read_at = NOW()
-            WHERE room_id=%s AND member_id=%s AND is_active=1
-        """, (room_id, member_id))
+        mark_room_read(cursor, room_id, member_id)
         conn.commit()
+        publish(member_channel(member_id), 'unread', {'room_id': int(room_id), 'unread_count': 0})
         return jsonify({'success': True})
     except Exception as e:
         print(f"[Message] mark_read error: {e}")
@@ -878,12 +880,19 @@ def delete_message():
         return jsonify({'success': False, 'message': 'DB 연결 실패'}), 500
     try:
         cursor = conn.cursor()
-        cursor.execute("""
-            UPDATE messages SET is_deleted=1, content='', file_name=NULL, file_path=NULL
+        # 보관(archive)된 메시지도 삭제 가능하도록 들어 있는 테이블에서 갱신
+        table, target = locate_message(cursor, message_id, ['room_id', 'created_at', 'is_deleted', 'sender_id'])
+        if not target or target['sender_id'] != member_id:
+            return jsonify({'success': False, 'message': '삭제 권한이 없거나 메시지를 찾을 수 없습니다.'})
+        cursor.execute(f"""
+            UPDATE {table} SET is_deleted=1, content='', file_name=NULL, file_path=NULL
             WHERE id=%s AND sender_id=%s
         """, (message_id, member_id))
-        if cursor.rowcount == 0:
+        if cursor.rowcount == 0:  # 이미 삭제됨, 또는 조회 직후 보관 작업이 옮김
             return jsonify({'success': False, 'message': '삭제 권한이 없거나 메시지를 찾을 수 없습니다.'})
+        if not target['is_deleted']:
+            drop_unread(cursor, target['room_id'], member_id, target['created_at'])
+        refresh_room_summary(cursor, target['room_id'])
         conn.commit()
         return jsonify({'success': True})
     except Exception as e:
@@ -909,19 +918,7 @@ def unread_count():
         return jsonify({'success': False, 'message': 'DB 연결 실패'}), 500
     try:
         cursor = conn.cursor()
-        cursor.execute("""
-            SELECT COUNT(*) AS total_unread
-            FROM messages msg
-            JOIN message_room_members rm ON rm.room_id = msg.room_id
-                AND rm.member_id = %s AND rm.is_active = 1
-            JOIN message_rooms r ON r.id = msg.room_id AND r.is_active = 1
-            WHERE msg.created_at > COALESCE(rm.last_read_at, rm.joined_at, r.created_at)
-              AND msg.sender_id != %s
-              AND msg.is_deleted = 0
-              AND msg.is_system = 0
-        """, (member_id, member_id))
-        row = cursor.fetchone()
-        return jsonify({'success': True, 'total_unread': row['total_unread'] if row else 0})
+        return jsonify({'success': True, 'total_unread': total_unread(cursor, member_id)})
     except Exception as e:
         print(f"[Message] unread_count error: {e}")
         return jsonify({'success': False, 'message': str(e)}), 500
@@ -930,6 +927,79 @@ def unread_count():
         conn.close()
 
 
+# ============================================
+# API 8-2: 메시지 검색 (내가 참여 중인 대화방만)
+# ============================================
+@message_bp.route('/api/message/search', methods=['GET'])
+def search_messages():
+    """
+    q: 검색어, room_id: 특정 방만 (선택), sort: relevance(기본)|recent, limit/offset: 페이지
+    scope=archive: 보관된 오래된 메시지에서 검색 (messages_archive, 같은 FULLTEXT 인덱스)
+    ngram FULLTEXT 인덱스(ft_msg_content)로 조회 → 이력이 몇 년치여도 LIKE 전체 스캔 없음
+    """
+    info = _get_session_info()
+    if not info:
+        return jsonify({'success': False, 'message': '로그인이 필요합니다.'}), 401
+    member_id, school_id, role = info
+
+    keyword = sanitize_input(request.args.get('q', ''), 100)
+    where_sql, where_params, score_sql, score_params = keyword_filter(['m.content'], keyword)
+    if not where_sql:
+        return jsonify({'success': False, 'message': '검색어를 입력해주세요.'})
+    room_id = request.args.get('room_id')
+    sort = normalize_sort(request.args.get('sort'))
+    limit, offset = page_args(request.args)
+    table = ARCHIVE_TABLE if request.args.get('scope') == 'archive' else HOT_TABLE
+
+    conn = get_db_connection()
+    if not conn:
+        return jsonify({'success': False, 'message': 'DB 연결 실패'}), 500
+    try:
+        cursor = conn.cursor()
+        room_sql = ''
+        room_params = []
+        if room_id:
+            room_sql = ' AND m.room_id = %s'
+            room_params = [room_id]
+        order_sql = 'm.id DESC' if sort == SORT_RECENT else 'score DESC, m.id DESC'
+        cursor.execute(f"""
+            SELECT m.id, m.room_id, m.sender_id, m.sender_name, m.sender_role,
+                   m.content, m.message_type, m.file_name, m.created_at,
+                   r.room_type, r.room_title, {score_sql} AS score
+            FROM {table} m
+            JOIN message_room_members rm
+              ON rm.room_id = m.room_id AND rm.member_id = %s AND rm.is_active = 1
+            JOIN message_rooms r
+              ON r.id = m.room_id AND r.school_id = %s AND r.is_active = 1
+            WHERE {where_sql} AND m.is_deleted = 0 AND m.is_system = 0{room_sql}
+            ORDER BY {order_sql}
+            LIMIT %s OFFSET %s
+        """, score_params + [member_id, school_id] + where_params + room_params + [limit + 1, offset])
+        rows = cursor.fetchall()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        for m in rows:
+            m['is_mine'] = (m['sender_id'] == member_id)
+            m['score'] = float(m['score'] or 0)
+            if m.get('created_at'):
+                m['created_at'] = str(m['created_at'])
+
+        return jsonify({
+            'success': True,
+            'results': rows,
+            'sort': sort,
+            'scope': 'archive' if table == ARCHIVE_TABLE else 'recent',
+            'has_more': has_more,
+            'next_offset': offset + limit if has_more else None,
+        })
+    except Exception as e:
+        print(f"[Message] search_messages error: {e}")
+        return jsonify({'success': False, 'message': str(e)}), 500
+    finally:
+        cursor.close()
+        conn.close()
+
+
 # ============================================
 # API 9: 대화방 나가기
 # ============================================
@@ -958,6 +1028,7 @@ def leave_room():
             return jsonify({'success': False, 'message': '대화방을 찾을 수 없습니다.'})
 
         # direct는 나가기 불가 (삭제와 동일)
+        recipients = []
         if room['room_type'] == 'direct':
             # direct 방은 양쪽 다 비활성화
             cursor.execute("""
@@ -970,7 +1041,7 @@ def leave_room():
                 UPDATE message_room_members SET is_active=0
                 WHERE room_id=%s AND member_id=%s
             """, (room_id, member_id))
-            _system_message(cursor, room_id, f'{my_name}님이 대화방을 나갔습니다.')
+            recipients = _system_message(cursor, room_id, f'{my_name}님이 대화방을 나갔습니다.', member_id)
 
             # 남은 활성 멤버 확인
             cursor.execute("""
@@ -982,6 +1053,7 @@ def leave_room():
                 cursor.execute("UPDATE message_rooms SET is_active=0 WHERE id=%s", (room_id,))
 
         conn.commit()
+        _publish_unread(room_id, recipients)
         return jsonify({'success': True})
     except Exception as e:
         conn.rollback()
@@ -1033,6 +1105,7 @@ def kick_member():
 
         my_name = _get_my_name(cursor, member_id, school_id)
         kicked = []
+        notified = []
         for tid in target_ids:
             if tid == member_id:
                 continue  # 본인은 건너뜀
@@ -1044,10 +1117,12 @@ def kick_member():
                 UPDATE message_room_members SET is_active=0
                 WHERE room_id=%s AND member_id=%s
             """, (room_id, tid))
-            _system_message(cursor, room_id, f'{my_name}님이 {target_name}님을 내보냈습니다.')
+            notified.append(_system_message(cursor, room_id, f'{my_name}님이 {target_name}님을 내보냈습니다.', member_id))
             kicked.append(target_name)
 
         conn.commit()
+        for recipients in notified:
+            _publish_unread(room_id, recipients)
         if kicked:
             return jsonify({'success': True, 'kicked_count': len(kicked), 'message': f'{", ".join(kicked)}님을 내보냈습니다.'})
         return jsonify({'success': False, 'message': '강퇴할 대상이 없습니다.'})
@@ -1104,6 +1179,7 @@ def invite_members():
 
         my_name = _get_my_name(cursor, member_id, school_id)
         invited = []
+        invited_ids = []
         for tid in target_ids:
             if tid not in valid_users:
                 continue
@@ -1117,10 +1193,11 @@ def invite_members():
             if existing:
                 if not existing['is_active']:
                     cursor.execute("""
-                        UPDATE message_room_members SET is_active=1, joined_at=NOW()
+                        UPDATE message_room_members SET is_active=1, joined_at=NOW(), unread_count=0
                         WHERE id=%s
                     """, (existing['id'],))
                     invited.append(u['member_name'])
+                    invited_ids.append(tid)
             else:
                 cursor.execute("""
                     INSERT INTO message_room_members
@@ -1129,12 +1206,17 @@ def invite_members():
                 """, (room_id, tid, u['member_name'], u['member_role'],
                       u.get('class_grade'), u.get('class_no')))
                 invited.append(u['member_name'])
+                invited_ids.append(tid)
 
+        recipients = []
         if invited:
             names = ', '.join(invited)
-            _system_message(cursor, room_id, f'{my_name}님이 {names}님을 초대했습니다.')
+            recipients = _system_message(cursor, room_id, f'{my_name}님이 {names}님을 초대했습니다.', member_id)
 
         conn.commit()
+        _publish_unread(room_id, recipients)
+        for tid in invited_ids:
+            publish(member_channel(tid), 'rooms', {'room_id': int(room_id)})
         return jsonify({'success': True, 'invited_count': len(invited)})
     except Exception as e:
         conn.rollback()
@@ -1214,12 +1296,8 @@ def download_file():
     try:
         cursor = conn.cursor()
 
-        # 메시지 조회
-        cursor.execute("""
-            SELECT m.file_path, m.file_name, m.room_id, m.is_deleted
-            FROM messages m WHERE m.id=%s
-        """, (message_id,))
-        msg = cursor.fetchone()
+        # 메시지 조회 (보관된 메시지 포함)
+        msg = find_message(cursor, message_id, ['file_path', 'file_name', 'room_id', 'is_deleted'])
         if not msg:
             return jsonify({'success': False, 'message': '파일을 찾을 수 없습니다.'}), 404
         if msg['is_deleted']:
@@ -1231,28 +1309,13 @@ def download_file():
         if not _is_room_member(cursor, msg['room_id'], member_id):
             return jsonify({'success': False, 'message': '접근 권한이 없습니다.'}), 403
 
-        from routes.subject_utils import sftp_download_file
-        file_data = sftp_download_file(msg['file_path'])
-        if not file_data:
-            return jsonify({'success': False, 'message': '파일을 찾을 수 없습니다.'}), 404
-
-        response = make_response(file_data)
         fname = msg['file_name'] or 'download'
         ext = fname.rsplit('.', 1)[1].lower() if '.' in fname else ''
-        # MIME 타입 설정
-        mime_map = {
-            'jpg': 'image/jpeg', 'jpeg': 'image/jpeg', 'png': 'image/png',
-            'gif': 'image/gif', 'webp': 'image/webp', 'pdf': 'application/pdf',
-            'doc': 'application/msword', 'docx': 'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
-            'hwp': 'application/x-hwp', 'hwpx': 'application/x-hwpx',
-            'xls': 'application/vnd.ms-excel', 'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-            'ppt': 'application/vnd.ms-powerpoint', 'pptx': 'application/vnd.openxmlformats-officedocument.presentationml.presentation',
-            'txt': 'text/plain', 'zip': 'application/zip',
-        }
-        response.headers['Content-Type'] = mime_map.get(ext, 'application/octet-stream')
-        # RFC 5987 한글 파일명 지원
-        encoded_fname = quote(fname)
-        response.headers['Content-Disposition'] = f"attachment; filename=\"{encoded_fname}\"; filename*=UTF-8''{encoded_fname}"
+        # SFTP → 임시파일 → 청크 스트리밍 (Range 요청 시 206), 한글 파일명은 RFC 5987로 자동 인코딩
+        response = sftp_send_file(msg['file_path'], fname,
+                                  mimetype=_MIME_MAP.get(ext, 'application/octet-stream'))
+        if response is None:
+            return jsonify({'success': False, 'message': '파일을 찾을 수 없습니다.'}), 404
         return response
     except Exception as e:
         print(f"[Message] download_file error: {e}")
@@ -1262,6 +1325,81 @@ def download_file():
         conn.close()
 
 
+# ============================================
+# API 12-A: 이미지 썸네일
+# ============================================
+_THUMB_CACHE_CONTROL = 'private, max-age=31536000, immutable'
+
+
+def _prepare_thumbnails(uploaded_file, remote_path):
+    """업로드 스트림을 디스크 캐시에 넣어 두고 썸네일 생성 예약 (원본 SFTP 재다운로드 없이 생성)"""
+    try:
+        store_cached_file(remote_path, uploaded_file.stream)
+        schedule_thumbnails(remote_path)
+    except Exception as e:
+        print(f"[Message] thumbnail schedule error: {e}")
+
+
+@message_bp.route('/api/message/file/thumb', methods=['GET'])
+def download_thumbnail():
+    """
+    이미지 메시지 썸네일 (size=s|m, 기본 m).
+    경로가 바뀌지 않는 파일이므로 1년 캐시. 아직 생성 전이면 생성 예약 후 원본으로 응답(짧은 캐시)
+    """
+    info = _get_session_info()
+    if not info:
+        return jsonify({'success': False, 'message': '로그인이 필요합니다.'}), 401
+    member_id, school_id, role = info
+
+    message_id = request.args.get('message_id')
+    size = request.args.get('size', 'm')
+    if not message_id:
+        return jsonify({'success': False, 'message': 'message_id가 필요합니다.'})
+    if size not in THUMB_SIZES:
+        return jsonify({'success': False, 'message': f"size는 {', '.join(THUMB_SIZES)} 중 하나입니다."})
+
+    conn = get_db_connection()
+    if not conn:
+        return jsonify({'success': False, 'message': 'DB 연결 실패'}), 500
+    try:
+        cursor = conn.cursor()
+        msg = find_message(cursor, message_id,
+                           ['file_path', 'file_name', 'room_id', 'is_deleted', 'message_type'])
+        if not msg or msg['is_deleted'] or not msg['file_path'] or msg['message_type'] != 'image':
+            return jsonify({'success': False, 'message': '이미지를 찾을 수 없습니다.'}), 404
+        if not _is_room_member(cursor, msg['room_id'], member_id):
+            return jsonify({'success': False, 'message': '접근 권한이 없습니다.'}), 403
+    except Exception as e:
+        print(f"[Message] download_thumbnail error: {e}")
+        return jsonify({'success': False, 'message': str(e)}), 500
+    finally:
+        cursor.close()
+        conn.close()
+
+    failed = THUMBNAILS_ENABLED and thumbnail_failed(msg['file_path'])
+    if THUMBNAILS_ENABLED and not failed:
+        response = sftp_send_file(thumb_path(msg['file_path'], size), f'thumb_{size}.jpg',
+                                  mimetype='image/jpeg', as_attachment=False)
+        if response is not None:
+            response.headers['Cache-Control'] = _THUMB_CACHE_CONTROL
+            return response
+        # 생성 전이거나 이전 업로드 → 생성 예약 후 이번에는 원본 표시
+        schedule_thumbnails(msg['file_path'])
+
+    # Pillow 미설치/썸네일 없음 → 원본 (짧은 캐시: 다음 요청에서 썸네일로 교체되도록)
+    # 생성 실패로 표시된 원본은 썸네일 조회/재생성 없이 바로 원본
+    fname = msg['file_name'] or 'image'
+    ext = fname.rsplit('.', 1)[1].lower() if '.' in fname else ''
+    response = sftp_send_file(msg['file_path'], fname,
+                              mimetype=_MIME_MAP.get(ext, 'application/octet-stream'),
+                              as_attachment=False)
+    if response is None:
+        return jsonify({'success': False, 'message': '파일을 찾을 수 없습니다.'}), 404
+    # 생성 실패 원본은 곧 썸네일로 바뀌지 않으므로 길게 캐시
+    response.headers['Cache-Control'] = 'private, max-age=86400' if failed else 'private, max-age=60'
+    return response
+
+
 # ============================================
 # API 12-B: 독립 파일 업로드 (파일만 전송)
 # ============================================
@@ -1294,7 +1432,7 @@ def upload_file():
             return jsonify({'success': False, 'message': '대화방 접근 권한이 없습니다.'}), 403
 
         # 공지방 체크
-        cursor.execute("SELECT announcement_only FROM message_rooms WHERE id=%s", (room_id,))
+        cursor.execute("SELECT announcement_only, room_title FROM message_rooms WHERE id=%s", (room_id,))
         room = cursor.fetchone()
         if room and room['announcement_only'] and not mem['is_admin']:
             return jsonify({'success': False, 'message': '공지 전용 대화방에서는 관리자만 파일을 보낼 수 있습니다.'})
@@ -1310,20 +1448,18 @@ def upload_file():
             if ext not in ALLOWED_ALL_EXT:
                 return jsonify({'success': False, 'message': '허용되지 않는 파일 형식입니다.'})
 
-        # 파일 크기 검증
-        file_data = uploaded_file.read()
-        file_size = len(file_data)
+        # 파일 크기 검증 (본문을 메모리에 읽지 않음)
+        file_size = stream_size(uploaded_file)
         if file_size == 0:
             return jsonify({'success': False, 'message': '빈 파일은 업로드할 수 없습니다.'})
         if file_size > MAX_FILE_SIZE:
             return jsonify({'success': False, 'message': f'파일 크기가 {MAX_FILE_SIZE // (1024*1024)}MB를 초과합니다.'})
 
-        # SFTP 업로드
-        from routes.subject_utils import sftp_upload_file
+        # SFTP 업로드 (스트림 그대로 전송)
         ts = int(time.time())
         remote_path = f'/data/messages/{school_id}/{room_id}/{ts}_{safe_fname}'
 
-        upload_ok = sftp_upload_file(io.BytesIO(file_data), remote_path)
+        upload_ok = sftp_upload_stream(uploaded_file, remote_path)
         if not upload_ok:
             return jsonify({'success': False, 'message': '파일 업로드에 실패했습니다.'})
 
@@ -1332,6 +1468,8 @@ def upload_file():
         my_role_enum = role if role in ('teacher', 'student', 'parent') else 'teacher'
         message_type = 'image' if ext in ALLOWED_IMAGE_EXT else 'file'
         content = sanitize_html(content, 5000) if content else f'[파일] {safe_fname}'
+        if message_type == 'image':
+            _prepare_thumbnails(uploaded_file, remote_path)
 
         cursor.execute("""
             INSERT INTO messages
@@ -1341,35 +1479,26 @@ def upload_file():
         """, (room_id, member_id, my_name, my_role_enum,
               content, message_type, remote_path, safe_fname))
         msg_id = cursor.lastrowid
+        touch_room(cursor, room_id, msg_id, content, my_name, safe_fname)
+        recipients = bump_unread(cursor, room_id, member_id)
 
-        # 내 last_read_at 갱신
-        cursor.execute("""
-            UPDATE message_room_members SET last_read_at = NOW()
-            WHERE room_id=%s AND member_id=%s
-        """, (room_id, member_id))
+        # 내 읽음 처리 (last_read_at + 안 읽은 수 0)
+        mark_room_read(cursor, room_id, member_id)
 
         conn.commit()
 
         now_str = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        _publish_message(room_id, msg_id, member_id, my_name, my_role_enum, content,
+                         message_type, safe_fname, now_str)
+        _publish_unread(room_id, recipients)
 
-        # 푸시 알림
+        # 푸시 알림 (백그라운드 큐)
         try:
-            from utils.push_helper import send_push_to_user
-            cursor2 = conn.cursor()
-            cursor2.execute("""
-                SELECT member_id FROM message_room_members
-                WHERE room_id=%s AND member_id != %s AND is_active=1
-            """, (room_id, member_id))
-            recipients = cursor2.fetchall()
-            cursor2.close()
-
-            push_body = f'{safe_fname}'
-            for r in recipients:
-                try:
-                    send_push_to_user(r['member_id'], my_name, push_body, '/highschool/messenger.html')
-                except:
-                    pass
-        except:
+            from utils.push_helper import send_push_to_users
+            send_push_to_users(recipients,
+                               my_name, f'{safe_fname}', '/highschool/messenger.html',
+                               **_push_coalesce(room_id, room and room['room_title'], member_id))
+        except Exception:
             pass
 
         return jsonify({
@@ -1412,24 +1541,119 @@ def poll_messages():
         if not _is_room_member(cursor, room_id, member_id):
             return jsonify({'success': False, 'message': '접근 권한이 없습니다.'}), 403
 
-        cursor.execute("""
-            SELECT id, room_id, sender_id, sender_name, sender_role,
-                   content, message_type, file_name, is_system, is_deleted, created_at
-            FROM messages
-            WHERE room_id = %s AND id > %s AND is_deleted = 0
-            ORDER BY created_at ASC
-            LIMIT 100
-        """, (room_id, after_id))
-        msgs = cursor.fetchall()
+        msgs, page_cursor = load_page(
+            cursor, room_id, _MESSAGE_COLUMNS,
+            after_id=int(after_id or 0), limit=100, include_deleted=False, include_archive=False)
         for m in msgs:
             m['is_mine'] = (m['sender_id'] == member_id)
             if m.get('created_at'):
                 m['created_at'] = str(m['created_at'])
 
-        return jsonify({'success': True, 'messages': msgs})
+        return jsonify({'success': True, 'messages': msgs, 'cursor': page_cursor})
     except Exception as e:
         print(f"[Message] poll_messages error: {e}")
         return jsonify({'success': False, 'message': str(e)}), 500
     finally:
         cursor.close()
         conn.close()
+
+
+# ============================================
+# API 14: 실시간 이벤트 스트림 (SSE) — /api/message/poll 대체
+# ============================================
+def _sse(event_type, data, event_id=None):
+    lines = []
+    if event_id is not None:
+        lines.append(f'id: {event_id}')
+    lines.append(f'event: {event_type}')
+    lines.append('data: ' + json.dumps(data, ensure_ascii=False, default=str))
+    return '\n'.join(lines) + '\n\n'
+
+
+@message_bp.route('/api/message/stream', methods=['GET'])
+def stream_events():
+    """
+    내 대화방 이벤트 스트림 (text/event-stream)
+    - event: message (새 메시지, id = 메시지 id) / unread (내 안 읽은 수 증감·0) / rooms (방 추가)
+    - room_id + after_id(또는 Last-Event-ID): 재접속 사이에 놓친 현재 방 메시지를 먼저 전송
+    - 구독을 먼저 걸고 나서 방 목록/놓친 메시지를 조회 → 그 사이 커밋된 메시지도 빠지지 않음
+      (조회분과 실시간분이 겹칠 수 있음 — 클라이언트가 id로 중복 제거)
+    - 연결 시 DB 조회 후 연결을 바로 반납, 이후에는 이벤트 버스 대기만 함
+    """
+    info = _get_session_info()
+    if not info:
+        return jsonify({'success': False, 'message': '로그인이 필요합니다.'}), 401
+    member_id, school_id, role = info
+    if not SSE_ENABLED:
+        return jsonify({'success': False, 'message': '실시간 연결을 사용할 수 없습니다.'}), 503
+
+    # 잘못된 room_id / Last-Event-ID는 무시 (놓친 메시지 재전송만 생략)
+    try:
+        room_id = int(request.args.get('room_id') or 0) or None
+    except ValueError:
+        room_id = None
+    try:
+        after_id = int(request.headers.get('Last-Event-ID') or request.args.get('after_id') or 0)
+    except ValueError:
+        after_id = 0
+
+    sub = subscribe([member_channel(member_id)] + ([room_channel(room_id)] if room_id else []))
+    conn = get_db_connection()
+    if not conn:
+        sub.close()
+        return jsonify({'success': False, 'message': 'DB 연결 실패'}), 500
+    cursor = None
+    try:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT rm.room_id FROM message_room_members rm
+            JOIN message_rooms r ON r.id = rm.room_id AND r.is_active = 1 AND r.school_id = %s
+            WHERE rm.member_id = %s AND rm.is_active = 1
+        """, (school_id, member_id))
+        room_ids = [r['room_id'] for r in cursor.fetchall()]
+        if room_id and room_id not in room_ids:
+            sub.close()
+            return jsonify({'success': False, 'message': '접근 권한이 없습니다.'}), 403
+        sub.add(room_channel(r) for r in room_ids)
+
+        backlog = []
+        if room_id and after_id > 0:
+            backlog, _ = load_page(
+                cursor, room_id, _MESSAGE_COLUMNS,
+                after_id=after_id, limit=100, include_deleted=False, include_archive=False)
+    except Exception as e:
+        sub.close()
+        print(f"[Message] stream_events error: {e}")
+        return jsonify({'success': False, 'message': str(e)}), 500
+    finally:
+        if cursor: cursor.close()
+        conn.close()  # 스트림 동안 DB 연결을 잡고 있지 않음
+
+    def generate():
+        try:
+            yield 'retry: 3000\n\n'
+            for m in backlog:
+                m['is_mine'] = (m['sender_id'] == member_id)
+                yield _sse('message', m, m['id'])
+            deadline = time.time() + SSE_MAX_SECONDS
+            while not sub.overflowed:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    break
+                event = sub.get(min(SSE_HEARTBEAT_SECONDS, remaining))
+                if event is None:
+                    yield ': ping\n\n'
+                    continue
+                data = dict(event['data'])
+                if event['type'] == 'message':
+                    data['is_mine'] = (data.get('sender_id') == member_id)
+                    yield _sse('message', data, data.get('id'))
+                else:
+                    yield _sse(event['type'], data)
+        finally:
+            sub.close()
+
+    response = Response(generate(), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'  # nginx 버퍼링 해제
+    return response
@@ -2,7 +2,7 @@
 SchoolUs 내부 메신저 API (message_rooms / messages 통합)
 - /api/messenger/conversations          : 대화방 목록
 - /api/messenger/conversations/create    : 대화방 생성
-- /api/messenger/messages                : 메시지 목록
+- /api/messenger/messages                : 메시지 목록 (키셋 페이지)
 - /api/messenger/messages/send           : 메시지 전송
 - /api/messenger/messages/delete         : 메시지 삭제
 - /api/messenger/read                    : 읽음 처리
@@ -12,13 +12,17 @@ SchoolUs 내부 메신저 API (message_rooms / messages 통합)
 - /api/messenger/file/download           : 첨부파일 다운로드
 """
 
-from flask import Blueprint, request, jsonify, session, send_file
+from flask import Blueprint, request, jsonify, session
 from utils.db import get_db_connection, sanitize_input, sanitize_html
-from routes.subject_utils import sftp_upload_file, sftp_download_file, allowed_file
-from utils.push_helper import send_push_to_user
-import os
-import tempfile
+from routes.subject_utils import allowed_file
+from utils.push_helper import send_push_to_users
+from utils.room_summary import (touch_room, refresh_room_summary, list_rooms, attach_members,
+                                bump_unread, mark_room_read, drop_unread, total_unread)
+from utils.message_bus import publish, publish_many, room_channel, member_channel
+from utils.message_history import load_page, resolve_page_args, find_message, locate_message
+from utils.file_stream import sftp_upload_stream, sftp_send_file
 import traceback
+from datetime import datetime
 
 messenger_bp = Blueprint('messenger', __name__)
 
@@ -52,45 +56,13 @@ def get_conversations():
         cursor = conn.cursor()
 
         # direct/group 방만 조회 (class/grade/school 단체방은 message.html에서 관리)
-        cursor.execute("""
-            SELECT r.id, r.room_type, r.room_title, r.created_at,
-                   (SELECT content FROM messages
-                    WHERE room_id = r.id AND is_deleted = 0
-                    ORDER BY created_at DESC LIMIT 1) AS last_message,
-                   (SELECT created_at FROM messages
-                    WHERE room_id = r.id AND is_deleted = 0
-                    ORDER BY created_at DESC LIMIT 1) AS last_msg_time,
-                   (SELECT sender_name FROM messages
-                    WHERE room_id = r.id AND is_deleted = 0
-                    ORDER BY created_at DESC LIMIT 1) AS last_sender_name,
-                   (SELECT COUNT(*) FROM messages msg
-                    WHERE msg.room_id = r.id
-                      AND msg.created_at > COALESCE(rm.last_read_at, rm.joined_at, r.created_at)
-                      AND msg.sender_id != %s
-                      AND msg.is_deleted = 0) AS unread_count
-            FROM message_rooms r
-            JOIN message_room_members rm ON rm.room_id = r.id
-                 AND rm.member_id = %s AND rm.is_active = 1
-            WHERE r.school_id = %s AND r.is_active = 1
-              AND r.room_type IN ('direct', 'group')
-            ORDER BY COALESCE(
-                (SELECT created_at FROM messages WHERE room_id = r.id AND is_deleted = 0
-                 ORDER BY created_at DESC LIMIT 1),
-                r.created_at
-            ) DESC
-            LIMIT 50
-        """, (member_id, member_id, school_id))
+        rooms = list_rooms(cursor, member_id, school_id, room_types=('direct', 'group'), limit=50)
+        # 대화 상대방 정보 — 방 id 목록으로 한 번에 조회
+        attach_members(cursor, rooms, exclude_member_id=member_id, per_room_limit=10)
 
         conversations = []
-        for r in cursor.fetchall():
-            # 대화 상대방 정보 조회
-            cursor.execute("""
-                SELECT member_id, member_name, member_role
-                FROM message_room_members
-                WHERE room_id = %s AND is_active = 1 AND member_id != %s
-                LIMIT 10
-            """, (r['id'], member_id))
-            partners = [{'id': p['member_id'], 'name': p['member_name'], 'role': p['member_role']} for p in cursor.fetchall()]
+        for r in rooms:
+            partners = [{'id': p['member_id'], 'name': p['member_name'], 'role': p['member_role']} for p in r['members']]
 
             # 제목: direct/group은 상대방 이름, 고정 제목이 있으면 사용
             if r['room_type'] in ('direct', 'group'):
@@ -105,7 +77,7 @@ def get_conversations():
                 'partners': partners,
                 'last_message': r['last_message'] or '',
                 'last_msg_time': r['last_msg_time'].strftime('%Y-%m-%d %H:%M') if r['last_msg_time'] else '',
-                'last_sender_name': r['last_sender_name'] or '',
+                'last_sender_name': r['last_sender'] or '',
                 'unread_count': r['unread_count'] or 0,
                 'updated_at': r['created_at'].strftime('%Y-%m-%d %H:%M') if r['created_at'] else ''
             })
@@ -243,9 +215,6 @@ def get_messages():
     try:
         member_id = session.get('user_id') or sanitize_input(request.args.get('member_id'), 50)
         room_id = int(request.args.get('conversation_id', 0))
-        page = int(request.args.get('page', 1))
-        limit = 50
-        offset = (page - 1) * limit
 
         if not member_id or not room_id:
             return jsonify({'success': False, 'message': '필수 정보가 누락되었습니다.'})
@@ -258,17 +227,15 @@ def get_messages():
         if not _check_member_in_room(cursor, room_id, member_id):
             return jsonify({'success': False, 'message': '대화 참여 권한이 없습니다.'})
 
-        cursor.execute("""
-            SELECT id, sender_id, sender_name, content, file_name, file_path,
-                   created_at, is_deleted
-            FROM messages
-            WHERE room_id = %s
-            ORDER BY created_at ASC
-            LIMIT %s OFFSET %s
-        """, (room_id, limit, offset))
+        # 키셋 페이지 (최신 50건 → cursor/before_id로 이전 페이지)
+        before_id, after_id = resolve_page_args(request.args, room_id)
+        rows, page_cursor = load_page(
+            cursor, room_id,
+            ['id', 'sender_id', 'sender_name', 'content', 'file_name', 'file_path', 'created_at', 'is_deleted'],
+            before_id=before_id, after_id=after_id, limit=50)
 
         messages = []
-        for r in cursor.fetchall():
+        for r in rows:
             messages.append({
                 'id': r['id'],
                 'sender_id': r['sender_id'],
@@ -282,13 +249,10 @@ def get_messages():
             })
 
         # 읽음 처리
-        cursor.execute("""
-            UPDATE message_room_members SET last_read_at = NOW()
-            WHERE room_id = %s AND member_id = %s
-        """, (room_id, member_id))
+        mark_room_read(cursor, room_id, member_id)
         conn.commit()
 
-        return jsonify({'success': True, 'messages': messages})
+        return jsonify({'success': True, 'messages': messages, 'cursor': page_cursor})
     except Exception as e:
         print(f"[Messenger] get_messages error: {e}")
         traceback.print_exc()
@@ -345,15 +309,10 @@ def send_message():
             import time
             ts = int(time.time())
             remote_path = f'/schoolus/messenger/{s_id}/{room_id}/{ts}_{file_name}'
-            local_tmp = os.path.join(tempfile.gettempdir(), f'msg_{ts}_{file_name}')
-            uploaded_file.save(local_tmp)
-            try:
-                sftp_upload_file(local_tmp, remote_path)
-                file_path = remote_path
-                msg_type = 'file'
-            finally:
-                if os.path.exists(local_tmp):
-                    os.remove(local_tmp)
+            # 업로드 스트림을 그대로 SFTP로 전송 (로컬 사본/메모리 적재 없음)
+            sftp_upload_stream(uploaded_file, remote_path)
+            file_path = remote_path
+            msg_type = 'file'
 
         # 메시지 저장
         cursor.execute("""
@@ -361,33 +320,34 @@ def send_message():
             VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
         """, (room_id, member_id, member_name, member_role, content, msg_type, file_path, file_name))
         msg_id = cursor.lastrowid
+        touch_room(cursor, room_id, msg_id, content, member_name, file_name)
+        recipients = bump_unread(cursor, room_id, member_id)
 
         # 발신자 읽음 처리
-        cursor.execute("""
-            UPDATE message_room_members SET last_read_at = NOW()
-            WHERE room_id = %s AND member_id = %s
-        """, (room_id, member_id))
+        mark_room_read(cursor, room_id, member_id)
 
         conn.commit()
-
-        # 상대방 푸시 알림
-        cursor.execute("""
-            SELECT member_id FROM message_room_members
-            WHERE room_id = %s AND member_id != %s AND is_active = 1
-        """, (room_id, member_id))
-        for row in cursor.fetchall():
-            try:
-                preview = content[:30] + '...' if len(content) > 30 else content
-                if not preview and file_name:
-                    preview = f'파일: {file_name}'
-                send_push_to_user(
-                    row['member_id'],
-                    f'{member_name}님의 메시지',
-                    preview or '새 메시지가 도착했습니다.',
-                    f'/highschool/messenger.html?conv={room_id}'
-                )
-            except Exception:
-                pass
+        publish(room_channel(room_id), 'message', {
+            'id': msg_id, 'room_id': room_id, 'sender_id': member_id,
+            'sender_name': member_name, 'sender_role': member_role, 'content': content,
+            'message_type': msg_type, 'file_name': file_name, 'is_system': 0, 'is_deleted': 0,
+            'created_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        })
+        publish_many([member_channel(m) for m in recipients], 'unread', {'room_id': room_id, 'delta': 1})
+
+        # 상대방 푸시 알림 (백그라운드 큐 — 응답은 commit 직후 반환)
+        preview = content[:30] + '...' if len(content) > 30 else content
+        if not preview and file_name:
+            preview = f'파일: {file_name}'
+        send_push_to_users(
+            recipients,
+            f'{member_name}님의 메시지',
+            preview or '새 메시지가 도착했습니다.',
+            f'/highschool/messenger.html?conv={room_id}',
+            coalesce_key=f'room:{room_id}',
+            summary={'title': '새 메시지', 'body': '새 메시지 {count}개'},
+            sender_id=member_id
+        )
 
         return jsonify({'success': True, 'message_id': msg_id})
     except Exception as e:
@@ -420,12 +380,14 @@ def delete_message():
             return jsonify({'success': False, 'message': 'DB 연결 오류'})
         cursor = conn.cursor()
 
-        cursor.execute("SELECT sender_id FROM messages WHERE id = %s", (msg_id,))
-        row = cursor.fetchone()
+        table, row = locate_message(cursor, msg_id, ['sender_id', 'room_id', 'created_at', 'is_deleted'])
         if not row or row['sender_id'] != member_id:
             return jsonify({'success': False, 'message': '본인이 보낸 메시지만 삭제할 수 있습니다.'})
 
-        cursor.execute("UPDATE messages SET is_deleted = 1 WHERE id = %s", (msg_id,))
+        cursor.execute(f"UPDATE {table} SET is_deleted = 1 WHERE id = %s", (msg_id,))
+        if not row['is_deleted']:
+            drop_unread(cursor, row['room_id'], member_id, row['created_at'])
+        refresh_room_summary(cursor, row['room_id'])
         conn.commit()
 
         return jsonify({'success': True})
@@ -458,11 +420,9 @@ def mark_read():
             return jsonify({'success': False, 'message': 'DB 연결 오류'})
         cursor = conn.cursor()
 
-        cursor.execute("""
-            UPDATE message_room_members SET last_read_at = NOW()
-            WHERE room_id = %s AND member_id = %s AND is_active = 1
-        """, (room_id, member_id))
+        mark_room_read(cursor, room_id, member_id)
         conn.commit()
+        publish(member_channel(member_id), 'unread', {'room_id': room_id, 'unread_count': 0})
 
         return jsonify({'success': True})
     except Exception as e:
@@ -492,18 +452,9 @@ def unread_count():
             return jsonify({'success': False, 'message': 'DB 연결 오류'})
         cursor = conn.cursor()
 
-        cursor.execute("""
-            SELECT COUNT(*) AS total_unread FROM messages msg
-            JOIN message_room_members rm ON rm.room_id = msg.room_id
-                AND rm.member_id = %s AND rm.is_active = 1
-            JOIN message_rooms r ON r.id = msg.room_id
-                AND r.room_type IN ('direct', 'group') AND r.is_active = 1
-            WHERE msg.created_at > COALESCE(rm.last_read_at, rm.joined_at, '1970-01-01')
-              AND msg.sender_id != %s AND msg.is_deleted = 0
-        """, (member_id, member_id))
-        row = cursor.fetchone()
-
-        return jsonify({'success': True, 'total_unread': row['total_unread'] if row else 0})
+        # direct/group 방만 합산 (단체방은 message.html 배지에서 별도 표시)
+        total = total_unread(cursor, member_id, room_types=('direct', 'group'))
+        return jsonify({'success': True, 'total_unread': total})
     except Exception as e:
         print(f"[Messenger] unread_count error: {e}")
         return jsonify({'success': False, 'message': '조회 오류'})
@@ -690,22 +641,18 @@ def download_file():
             return jsonify({'success': False, 'message': 'DB 연결 오류'})
         cursor = conn.cursor()
 
-        cursor.execute("""
-            SELECT file_path, file_name, room_id
-            FROM messages
-            WHERE id = %s AND is_deleted = 0 AND file_path IS NOT NULL
-        """, (msg_id,))
-        row = cursor.fetchone()
-        if not row:
+        row = find_message(cursor, msg_id, ['file_path', 'file_name', 'room_id', 'is_deleted'])
+        if not row or row['is_deleted'] or not row['file_path']:
             return jsonify({'success': False, 'message': '파일을 찾을 수 없습니다.'})
 
         if not _check_member_in_room(cursor, row['room_id'], member_id):
             return jsonify({'success': False, 'message': '권한이 없습니다.'})
 
-        local_tmp = os.path.join(tempfile.gettempdir(), f'dl_{msg_id}_{row["file_name"]}')
-        sftp_download_file(row['file_path'], local_tmp)
-
-        return send_file(local_tmp, as_attachment=True, download_name=row['file_name'])
+        # 청크 스트리밍 + Range(206) 지원, 임시파일은 응답 종료 후 삭제
+        response = sftp_send_file(row['file_path'], row['file_name'])
+        if response is None:
+            return jsonify({'success': False, 'message': '파일을 찾을 수 없습니다.'})
+        return response
     except Exception as e:
         print(f"[Messenger] download_file error: {e}")
         return jsonify({'success': False, 'message': '파일 다운로드 오류'})
@@ -1,5 +1,7 @@
 from flask import Blueprint, request, jsonify, session
 from utils.db import get_db_connection, sanitize_input
+from utils.db_replica import read_only
+from utils.fulltext import keyword_filter, SORT_RELEVANCE
 
 notice_bp = Blueprint('notice', __name__)
 
@@ -7,6 +9,7 @@ notice_bp = Blueprint('notice', __name__)
 # ê³µì§€ì‚¬í•­ ëª©ë¡ ì¡°íšŒ API
 # ============================================
 @notice_bp.route('/api/notice/list', methods=['GET'])
+@read_only
 def get_notice_list():
     conn = None
     cursor = None
@@ -24,18 +27,24 @@ def get_notice_list():
         cursor = conn.cursor()
         
         keyword = sanitize_input(request.args.get('keyword'), 100)
-        keyword_filter = ""
+        # 검색어: ngram FULLTEXT (ft_notice_title_message), sort=relevance 이면 관련도순
+        keyword_sql = ""
         keyword_params = []
+        order_sql = "created_at DESC"
         if keyword:
-            keyword_filter = " AND (title LIKE %s OR message LIKE %s)"
-            keyword_params = [f'%{keyword}%', f'%{keyword}%']
+            where_sql, keyword_params, score_sql, score_params = keyword_filter(['title', 'message'], keyword)
+            if where_sql:
+                keyword_sql = " AND " + where_sql
+                if request.args.get('sort') == SORT_RELEVANCE and score_params:
+                    order_sql = f"{score_sql} DESC, created_at DESC"
+                    keyword_params = keyword_params + score_params
 
         if school_id:
             query = """
                 SELECT id, member_name, title, message, created_at
                 FROM notice
-                WHERE school_id = %s""" + keyword_filter + """
-                ORDER BY created_at DESC
+                WHERE school_id = %s""" + keyword_sql + """
+                ORDER BY """ + order_sql + """
                 LIMIT 50
             """
             cursor.execute(query, [school_id] + keyword_params)
@@ -43,8 +52,8 @@ def get_notice_list():
             query = """
                 SELECT id, member_name, title, message, created_at
                 FROM notice
-                WHERE member_school = %s""" + keyword_filter + """
-                ORDER BY created_at DESC
+                WHERE member_school = %s""" + keyword_sql + """
+                ORDER BY """ + order_sql + """
                 LIMIT 50
             """
             cursor.execute(query, [member_school] + keyword_params)
@@ -1,16 +1,19 @@
 """
 SchoolUs 푸시 알림 API
 - /api/push/vapid-key: VAPID 공개키 반환
-- /api/push/subscribe: 구독 등록
+- /api/push/subscribe: 구독 등록 (발송 대상 세그먼트 push_audience도 같은 트랜잭션에서 갱신)
 - /api/push/unsubscribe: 구독 해제
-- /api/push/send: 알림 발송 (교사/관리자 전용)
+- /api/push/send: 알림 발송 요청 (교사/관리자 전용, 발송함 적재 후 즉시 응답)
+- /api/push/outbox-stats: 발송함 대기 건수/지연 (교사 전용)
 """
 
 from flask import Blueprint, request, jsonify, session
 import json
 import os
-from pywebpush import webpush, WebPushException
 from utils.db import get_db_connection, sanitize_html
+from utils.push_helper import send_push_to_school
+from utils.push_audience import refresh_endpoint, remove_endpoints
+from utils.push_outbox import outbox_stats
 
 push_bp = Blueprint('push', __name__)
 
@@ -87,6 +90,7 @@ def subscribe():
                 auth = VALUES(auth),
                 updated_at = NOW()
         """, (member_id, school_id, user_role, endpoint, p256dh, auth))
+        refresh_endpoint(cursor, endpoint)
         conn.commit()
         return jsonify({'success': True, 'message': '푸시 알림이 등록되었습니다.'})
     except Exception as e:
@@ -115,6 +119,7 @@ def unsubscribe():
     try:
         cursor = conn.cursor()
         cursor.execute("DELETE FROM push_subscriptions WHERE endpoint = %s", (endpoint,))
+        remove_endpoints(cursor, [endpoint])
         conn.commit()
         return jsonify({'success': True, 'message': '구독이 해제되었습니다.'})
     except Exception as e:
@@ -147,83 +152,22 @@ def send_push():
     if not body:
         return jsonify({'success': False, 'message': '알림 내용을 입력해주세요.'}), 400
 
-    conn = get_db_connection()
-    if not conn:
-        return jsonify({'success': False, 'message': 'DB 연결 오류'}), 500
+    # 발송함 적재만 하고 응답 — 대상 조회/전송/재시도는 발송 워커가 처리 (utils/push_outbox)
+    outbox_id = send_push_to_school(target_school, title, body, url, target_role)
+    if not outbox_id:
+        return jsonify({'success': False, 'message': '발송 요청 중 오류가 발생했습니다.'}), 500
+    return jsonify({
+        'success': True,
+        'message': '발송 요청이 접수되었습니다.',
+        'outbox_id': outbox_id
+    })
 
-    try:
-        cursor = conn.cursor()
 
-        # 대상 구독자 조회
-        query = "SELECT endpoint, p256dh, auth FROM push_subscriptions WHERE school_id = %s"
-        params = [target_school]
-        if target_role:
-            query += " AND user_role = %s"
-            params.append(target_role)
-
-        cursor.execute(query, params)
-        subscriptions = cursor.fetchall()
-
-        if not subscriptions:
-            return jsonify({'success': True, 'message': '발송 대상이 없습니다.', 'sent': 0})
-
-        config = _load_vapid_config()
-        private_key_path = config.get('private_key_path', '')
-        claims_email = config.get('claims_email', 'mailto:admin@schoolwithus.co.kr')
-
-        payload = json.dumps({
-            'title': title,
-            'body': body,
-            'icon': '/static/icons/icon-192x192.png',
-            'url': url
-        })
-
-        sent = 0
-        failed = 0
-        expired_endpoints = []
-
-        for sub in subscriptions:
-            try:
-                webpush(
-                    subscription_info={
-                        'endpoint': sub['endpoint'],
-                        'keys': {
-                            'p256dh': sub['p256dh'],
-                            'auth': sub['auth']
-                        }
-                    },
-                    data=payload,
-                    vapid_private_key=private_key_path,
-                    vapid_claims={"sub": claims_email}
-                )
-                sent += 1
-            except WebPushException as e:
-                if e.response and e.response.status_code in (404, 410):
-                    # 만료된 구독 → 삭제 예정
-                    expired_endpoints.append(sub['endpoint'])
-                else:
-                    print(f"[Push] Send error: {e}")
-                failed += 1
-            except Exception as e:
-                print(f"[Push] Send error: {e}")
-                failed += 1
-
-        # 만료된 구독 정리
-        if expired_endpoints:
-            format_str = ','.join(['%s'] * len(expired_endpoints))
-            cursor.execute(f"DELETE FROM push_subscriptions WHERE endpoint IN ({format_str})", expired_endpoints)
-            conn.commit()
-
-        return jsonify({
-            'success': True,
-            'message': f'{sent}명에게 발송 완료',
-            'sent': sent,
-            'failed': failed,
-            'expired': len(expired_endpoints)
-        })
-    except Exception as e:
-        print(f"[Push] Send error: {e}")
-        return jsonify({'success': False, 'message': '발송 중 오류가 발생했습니다.'}), 500
-    finally:
-        cursor.close()
-        conn.close()
+# ============================================
+# 발송함 상태 (대기 건수/지연)
+# ============================================
+@push_bp.route('/api/push/outbox-stats', methods=['GET'])
+def push_outbox_stats():
+    if session.get('user_role') != 'teacher':
+        return jsonify({'success': False, 'message': '권한이 없습니다.'}), 403
+    return jsonify({'success': True, **outbox_stats()})
@@ -1,5 +1,7 @@
 from flask import Blueprint, request, jsonify
 from utils.db import get_db_connection, sanitize_input
+from utils.db_replica import read_only
+from utils.date_range import year_month_range
 
 schedule_bp = Blueprint('schedule', __name__)
 
@@ -7,6 +9,7 @@ schedule_bp = Blueprint('schedule', __name__)
 # 일정 목록 조회 API
 # ============================================
 @schedule_bp.route('/api/schedule/list', methods=['GET'])
+@read_only
 def get_schedule_list():
     conn = None
     cursor = None
@@ -55,8 +58,11 @@ def get_schedule_list():
             params = [member_school, member_id, member_id, member_roll]
         
         if year and month:
-            query += " AND YEAR(schedule_date) = %s AND MONTH(schedule_date) = %s"
-            params.extend([year, month])
+            month_start, month_end = year_month_range(year, month) or (None, None)
+            if not month_start:
+                return jsonify({'success': False, 'message': '년월 형식이 올바르지 않습니다.'})
+            query += " AND schedule_date >= %s AND schedule_date < %s"
+            params.extend([month_start, month_end])
         
         query += " ORDER BY schedule_date ASC"
         
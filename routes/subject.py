@@ -2,22 +2,23 @@
 subject.py - 과세특 관련 API (기초작업, 작성, 파일, 공통사항, AI생성)
 + 학교별 과목 목록, 학생 과제제출 조회
 """
-import io
 import os
 import time
 import base64
 from datetime import datetime
-from flask import Blueprint, request, jsonify, send_file, session
+from flask import Blueprint, request, jsonify, session
 import requests as http_requests
 
 from routes.subject_utils import (
     get_db_connection, sanitize_input, sanitize_html,
-    sftp_upload_file, sftp_download_file, sftp_remove_file, sftp_makedirs,
+    sftp_remove_file, sftp_makedirs,
     allowed_file,
     call_gemini, resummarize, calc_neis_bytes, byte_instruction,
     check_and_deduct_point,
     SUBJECT_WRITING_RULES, MIDDLE_SUBJECT_WRITING_RULES, AI_POINT_COST
 )
+from utils.file_stream import stream_size, sftp_upload_stream, sftp_send_file
+from utils.file_cache import read_cached_file, invalidate_cached_file
 
 subject_bp = Blueprint('subject', __name__)
 
@@ -52,7 +53,7 @@ def get_subject_students():
             SELECT id, member_id, member_name, class_grade, class_no, class_num
             FROM stu_all
             WHERE school_id = %s AND class_grade = %s AND class_no = %s
-            ORDER BY CAST(class_num AS UNSIGNED)
+            ORDER BY class_num_sort
         """, (school_id, class_grade, class_no))
 
         students = []
@@ -301,7 +302,7 @@ def get_subject_record_status():
             SELECT member_id, member_name, class_grade, class_no, class_num
             FROM stu_all
             WHERE school_id = %s AND class_grade = %s AND class_no = %s
-            ORDER BY CAST(class_num AS UNSIGNED)
+            ORDER BY class_num_sort
         """, (school_id, class_grade, class_no))
         students = cursor.fetchall()
 
@@ -548,8 +549,7 @@ def upload_subject_file():
         if not allowed_file(file.filename):
             return jsonify({'success': False, 'message': '허용되지 않는 파일 형식입니다.'})
 
-        file_data = file.read()
-        file_size = len(file_data)
+        file_size = stream_size(file)
         if file_size > 10 * 1024 * 1024:
             return jsonify({'success': False, 'message': '파일 크기는 10MB를 초과할 수 없습니다.'})
 
@@ -559,7 +559,7 @@ def upload_subject_file():
         safe_filename = f"{timestamp}_{original_name}"
         remote_path = f"/data/subject/{school_id}/{subject_name}/{student_id}/{safe_filename}"
 
-        if not sftp_upload_file(file_data, remote_path):
+        if not sftp_upload_stream(file, remote_path):
             return jsonify({'success': False, 'message': '파일 업로드에 실패했습니다.'})
 
         conn = get_db_connection()
@@ -678,11 +678,10 @@ def download_subject_file(file_id):
         if not result:
             return jsonify({'success': False, 'message': '파일을 찾을 수 없습니다.'})
 
-        file_data = sftp_download_file(result['file_path'])
-        if not file_data:
+        response = sftp_send_file(result['file_path'], result['original_name'])
+        if response is None:
             return jsonify({'success': False, 'message': '서버에서 파일을 찾을 수 없습니다.'})
-
-        return send_file(io.BytesIO(file_data), as_attachment=True, download_name=result['original_name'])
+        return response
 
     except Exception as e:
         print(f"파일 다운로드 오류: {e}")
@@ -721,6 +720,7 @@ def delete_subject_file():
 
         if result['file_path']:
             sftp_remove_file(result['file_path'])
+            invalidate_cached_file(result['file_path'])
 
         cursor.execute("DELETE FROM subject_files WHERE id = %s", (file_id,))
         conn.commit()
@@ -965,7 +965,7 @@ def generate_subject_record():
                                 fname = sr.get('file_name', '')
                                 if fpath and fname:
                                     ext = fname.rsplit('.', 1)[-1].lower() if '.' in fname else ''
-                                    file_data_bytes = sftp_download_file(fpath)
+                                    file_data_bytes = read_cached_file(fpath)
                                     if not file_data_bytes:
                                         continue
 
@@ -1018,7 +1018,7 @@ def generate_subject_record():
                         fpath = fr.get('file_path', '')
                         fname = fr.get('original_name', '')
 
-                        file_data_bytes = sftp_download_file(fpath)
+                        file_data_bytes = read_cached_file(fpath)
                         if not file_data_bytes:
                             continue
 
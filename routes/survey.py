@@ -14,6 +14,7 @@ SchoolUs 설문조사 API
 
 from flask import Blueprint, request, jsonify, session
 from utils.db import get_db_connection, sanitize_input, sanitize_html
+from utils.roster_cache import get_roster
 import json
 
 survey_bp = Blueprint('survey', __name__)
@@ -599,30 +600,19 @@ def survey_stats():
         cursor.execute("SELECT COUNT(*) AS cnt FROM survey_response WHERE survey_id = %s", (survey_id,))
         total_responses = int(cursor.fetchone()['cnt'] or 0)
 
-        # 대상 수 계산
+        # 대상 수 계산 (명단 캐시)
         school_id = s['school_id']
         target_count = 0
+        grades = None
+        if s['target_grades'] != 'all':
+            grades = [g.strip() for g in s['target_grades'].split(',')]
         if s['target_role'] in ('student', 'both'):
-            grade_filter = ""
-            grade_params = [school_id]
-            if s['target_grades'] != 'all':
-                grades = [g.strip() for g in s['target_grades'].split(',')]
-                placeholders = ','.join(['%s'] * len(grades))
-                grade_filter = f" AND class_grade IN ({placeholders})"
-                grade_params.extend(grades)
-            cursor.execute(f"SELECT COUNT(*) AS cnt FROM stu_all WHERE school_id = %s{grade_filter}", grade_params)
-            target_count += int(cursor.fetchone()['cnt'] or 0)
+            roster = get_roster(school_id, 'students', cursor)
+            target_count += roster.count(grades) if roster else 0
 
         if s['target_role'] in ('parent', 'both'):
-            grade_filter = ""
-            grade_params = [school_id]
-            if s['target_grades'] != 'all':
-                grades = [g.strip() for g in s['target_grades'].split(',')]
-                placeholders = ','.join(['%s'] * len(grades))
-                grade_filter = f" AND class_grade IN ({placeholders})"
-                grade_params.extend(grades)
-            cursor.execute(f"SELECT COUNT(*) AS cnt FROM fm_all WHERE school_id = %s{grade_filter}", grade_params)
-            target_count += int(cursor.fetchone()['cnt'] or 0)
+            roster = get_roster(school_id, 'parents', cursor)
+            target_count += roster.count(grades) if roster else 0
 
         # 문항별 통계
         cursor.execute("SELECT * FROM survey_question WHERE survey_id = %s ORDER BY question_order", (survey_id,))
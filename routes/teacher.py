@@ -1,6 +1,8 @@
 from flask import Blueprint, render_template, request, jsonify, session, redirect
 from functools import wraps
 from utils.db import get_db_connection, sanitize_input
+from utils.db_batch import bulk_update
+from utils.roster_cache import get_roster, invalidate_roster, roster_schools
 
 teacher_bp = Blueprint('teacher', __name__)
 
@@ -200,13 +202,8 @@ def get_teachers_list():
         cursor = conn.cursor()
         
         if school_id:
-            cursor.execute("""
-                SELECT id, member_id, member_name, member_school, member_birth,
-                       department, department_position, class_grade, class_no
-                FROM tea_all
-                WHERE school_id = %s
-                ORDER BY member_name
-            """, (school_id,))
+            roster = get_roster(school_id, 'teachers', cursor)
+            teachers = roster.rows if roster else []
         else:
             cursor.execute("""
                 SELECT id, member_id, member_name, member_school, member_birth,
@@ -215,8 +212,7 @@ def get_teachers_list():
                 WHERE member_school = %s
                 ORDER BY member_name
             """, (member_school,))
-        
-        teachers = cursor.fetchall()
+            teachers = cursor.fetchall()
         
         return jsonify({
             'success': True,
@@ -250,39 +246,34 @@ def update_teachers_batch():
             return jsonify({'success': False, 'message': '데이터베이스 연결 오류'})
 
         cursor = conn.cursor()
-        updated = 0
+        rows = []
 
         for t in teachers_list:
             member_id = sanitize_input(t.get('member_id'), 50)
             if not member_id:
                 continue
 
-            fields = []
-            values = []
+            row = {'member_id': member_id}
 
             if 'member_name' in t:
-                fields.append('member_name = %s')
-                values.append(sanitize_input(t['member_name'], 100))
+                row['member_name'] = sanitize_input(t['member_name'], 100)
             if 'department' in t:
-                fields.append('department = %s')
-                values.append(sanitize_input(t['department'], 100))
+                row['department'] = sanitize_input(t['department'], 100)
             if 'department_position' in t:
-                fields.append('department_position = %s')
-                values.append(sanitize_input(t['department_position'], 50))
+                row['department_position'] = sanitize_input(t['department_position'], 50)
             if 'class_grade' in t:
-                fields.append('class_grade = %s')
-                values.append(sanitize_input(str(t['class_grade']), 10) if t['class_grade'] else None)
+                row['class_grade'] = sanitize_input(str(t['class_grade']), 10) if t['class_grade'] else None
             if 'class_no' in t:
-                fields.append('class_no = %s')
-                values.append(sanitize_input(str(t['class_no']), 50) if t['class_no'] else None)
+                row['class_no'] = sanitize_input(str(t['class_no']), 50) if t['class_no'] else None
+
+            rows.append(row)
 
-            if fields:
-                values.append(member_id)
-                query = f"UPDATE tea_all SET {', '.join(fields)} WHERE member_id = %s"
-                cursor.execute(query, values)
-                updated += cursor.rowcount
+        schools = roster_schools(cursor, 'teachers', 'member_id', [r['member_id'] for r in rows])
+        updated = bulk_update(cursor, 'tea_all', 'member_id', rows)
 
         conn.commit()
+        for sid in schools:
+            invalidate_roster(sid, 'teachers')
         return jsonify({'success': True, 'message': f'{updated}명의 교사 정보가 수정되었습니다.', 'updated': updated})
 
     except Exception as e:
@@ -1,6 +1,12 @@
 from flask import Blueprint, request, jsonify, session
 from datetime import datetime, timedelta
 from utils.db import get_db_connection, sanitize_input
+from utils.db_replica import read_only
+from utils.db_batch import bulk_insert
+from utils.roster_cache import get_roster
+from utils.student_week import find_student_week, load_class_weeks, decode_week, rebuild_student_weeks
+from utils.timetable_version import timetable_conditional, bump_timetable_version
+from utils.http_cache import gzip_response
 
 timetable_bp = Blueprint('timetable', __name__)
 
@@ -754,6 +760,7 @@ def get_student_timetable():
 # 학생 개인 시간표 주간 조회 API (인쇄용 - 5일 전체)
 # ============================================
 @timetable_bp.route('/api/timetable/student/week', methods=['GET'])
+@read_only
 def get_student_timetable_week():
     """학생 개인 시간표: 월~금 전체 (원반 시간표 + 선택과목 교육반 오버레이)"""
     conn = None
@@ -773,6 +780,17 @@ def get_student_timetable_week():
             return jsonify({'success': False, 'message': '데이터베이스 연결 오류'})
         cursor = conn.cursor()
 
+        # 0) 물리화된 주간 시간표 (timetable_stu_week) 키 조회 — 없으면 아래 실시간 계산
+        week_row = find_student_week(cursor, school_id, grade, class_no, member_id=member_id, stu_id=stu_id)
+        if week_row:
+            return jsonify({
+                'success': True,
+                'timetable': decode_week(week_row['timetable']),
+                'student_name': week_row['student_name'] or '',
+                'grade': grade,
+                'class_no': class_no
+            })
+
         # stu_id로 조회 시 member_id와 이름 조회
         student_name = ''
         if stu_id and not member_id:
@@ -872,6 +890,7 @@ def get_student_timetable_week():
 # 학생 시간표 배치 조회 (같은 반 여러 학생 한번에)
 # ============================================
 @timetable_bp.route('/api/timetable/student/week-batch', methods=['POST'])
+@read_only
 def get_student_timetable_week_batch():
     """같은 반 학생 여러 명의 시간표를 한 번에 반환"""
     conn = None
@@ -891,6 +910,29 @@ def get_student_timetable_week_batch():
             return jsonify({'success': False, 'message': '데이터베이스 연결 오류'})
         cursor = conn.cursor()
 
+        # 0) 물리화된 주간 시간표 — 학급 전체 한 번 조회, 모든 학생이 있으면 바로 응답
+        class_row, week_by_stu_id, week_by_member_id = load_class_weeks(cursor, school_id, grade, class_no)
+        results = []
+        for s in students:
+            mid = s.get('member_id', '')
+            sid = str(s.get('stu_id', '') or '')
+            if mid:
+                row = week_by_member_id.get(mid)
+            elif sid:
+                row = week_by_stu_id.get(sid)
+            else:
+                row = class_row
+            if row is None:
+                results = None  # 물리화 누락 학생 → 실시간 계산
+                break
+            results.append({
+                'student_name': s.get('name', '') or row['student_name'] or '',
+                'class_num': s.get('class_num', ''),
+                'timetable': decode_week(row['timetable'])
+            })
+        if results is not None:
+            return jsonify({'success': True, 'results': results, 'grade': grade, 'class_no': class_no})
+
         # 1) 원반 시간표 (한 번만 조회 - 같은 반)
         cursor.execute("""
             SELECT period, subject, member_name, day_of_week
@@ -1099,7 +1141,7 @@ def save_timetable_stu():
         
         cursor.execute("DELETE FROM timetable_stu WHERE school_id = %s", (school_id,))
         
-        inserted = 0
+        rows = []
         
         for item in stu_data:
             member_id = sanitize_input(item.get('member_id'), 50) or None
@@ -1123,16 +1165,14 @@ def save_timetable_stu():
                 subj = sanitize_input(item.get(f'subject{i}'), 100)
                 subjects.append(subj if subj and subj.strip() else None)
             
-            cursor.execute("""
-                INSERT INTO timetable_stu 
-                (member_id, school_id, member_school, member_name, member_birth, grade, class_no, student_num,
-                 subject1, subject2, subject3, subject4, subject5, subject6,
-                 subject7, subject8, subject9, subject10, subject11, subject12, created_at, updated_at)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, NOW(), NOW())
-            """, (member_id, school_id, member_school, member_name, member_birth, grade, class_no, student_num,
-                  subjects[0], subjects[1], subjects[2], subjects[3], subjects[4], subjects[5],
-                  subjects[6], subjects[7], subjects[8], subjects[9], subjects[10], subjects[11]))
-            inserted += 1
+            rows.append((member_id, school_id, member_school, member_name, member_birth, grade, class_no, student_num,
+                         *subjects))
+        
+        inserted = bulk_insert(
+            cursor, 'timetable_stu',
+            ['member_id', 'school_id', 'member_school', 'member_name', 'member_birth', 'grade', 'class_no', 'student_num']
+            + [f'subject{i}' for i in range(1, 13)],
+            rows, const_values={'created_at': 'NOW()', 'updated_at': 'NOW()'})
         
         conn.commit()
         
@@ -1332,7 +1372,9 @@ def save_timetable_tea():
                   hours, day_of_week, period, member_birth))
             inserted += 1
         
+        rebuild_student_weeks(cursor, school_id)
         conn.commit()
+        bump_timetable_version(school_id)
         
         return jsonify({
             'success': True,
@@ -1353,6 +1395,7 @@ def save_timetable_tea():
 # 교사별 주간 시간표 조회 API
 # ============================================
 @timetable_bp.route('/api/timetable/teacher/week', methods=['GET'])
+@timetable_conditional()
 def get_teacher_week_timetable():
     conn = None
     cursor = None
@@ -1380,7 +1423,7 @@ def get_teacher_week_timetable():
                     FROM timetable_tea
                     WHERE school_id = %s AND member_name = %s
                       AND day_of_week IN ('월','화','수','목','금')
-                    ORDER BY FIELD(day_of_week,'월','화','수','목','금'), period
+                    ORDER BY day_sort, period
                 """, (school_id, member_name))
             else:
                 cursor.execute("""
@@ -1388,7 +1431,7 @@ def get_teacher_week_timetable():
                     FROM timetable_tea
                     WHERE member_school = %s AND member_name = %s
                       AND day_of_week IN ('월','화','수','목','금')
-                    ORDER BY FIELD(day_of_week,'월','화','수','목','금'), period
+                    ORDER BY day_sort, period
                 """, (member_school, member_name))
             timetable = cursor.fetchall()
 
@@ -1402,7 +1445,7 @@ def get_teacher_week_timetable():
                     FROM timetable
                     WHERE {id_col} = %s AND member_id = %s
                       AND day_of_week IN ('월','화','수','목','금')
-                    ORDER BY FIELD(day_of_week,'월','화','수','목','금'), period
+                    ORDER BY day_sort, period
                 """, (id_val, query_member_id))
             elif school_id:
                 cursor.execute("""
@@ -1410,7 +1453,7 @@ def get_teacher_week_timetable():
                     FROM timetable
                     WHERE school_id = %s AND member_name = %s
                       AND day_of_week IN ('월','화','수','목','금')
-                    ORDER BY FIELD(day_of_week,'월','화','수','목','금'), period
+                    ORDER BY day_sort, period
                 """, (school_id, member_name))
             else:
                 cursor.execute("""
@@ -1418,7 +1461,7 @@ def get_teacher_week_timetable():
                     FROM timetable
                     WHERE member_school = %s AND member_name = %s
                       AND day_of_week IN ('월','화','수','목','금')
-                    ORDER BY FIELD(day_of_week,'월','화','수','목','금'), period
+                    ORDER BY day_sort, period
                 """, (member_school, member_name))
             timetable = cursor.fetchall()
 
@@ -1453,6 +1496,7 @@ def get_teacher_week_timetable():
 # 학급별 주간 시간표 조회 API
 # ============================================
 @timetable_bp.route('/api/timetable/class/week', methods=['GET'])
+@timetable_conditional()
 def get_class_week_timetable():
     conn = None
     cursor = None
@@ -1478,7 +1522,7 @@ def get_class_week_timetable():
                 FROM timetable
                 WHERE school_id = %s AND grade = %s AND class_no = %s
                   AND day_of_week IN ('월','화','수','목','금')
-                ORDER BY FIELD(day_of_week,'월','화','수','목','금'), period
+                ORDER BY day_sort, period
             """, (school_id, grade, class_no))
         else:
             cursor.execute("""
@@ -1486,7 +1530,7 @@ def get_class_week_timetable():
                 FROM timetable
                 WHERE member_school = %s AND grade = %s AND class_no = %s
                   AND day_of_week IN ('월','화','수','목','금')
-                ORDER BY FIELD(day_of_week,'월','화','수','목','금'), period
+                ORDER BY day_sort, period
             """, (member_school, grade, class_no))
 
         timetable = cursor.fetchall()
@@ -1499,7 +1543,7 @@ def get_class_week_timetable():
                     FROM timetable_tea
                     WHERE school_id = %s AND grade = %s AND class_no = %s
                       AND day_of_week IN ('월','화','수','목','금')
-                    ORDER BY FIELD(day_of_week,'월','화','수','목','금'), period
+                    ORDER BY day_sort, period
                 """, (school_id, grade, class_no))
             else:
                 cursor.execute("""
@@ -1507,7 +1551,7 @@ def get_class_week_timetable():
                     FROM timetable_tea
                     WHERE member_school = %s AND grade = %s AND class_no = %s
                       AND day_of_week IN ('월','화','수','목','금')
-                    ORDER BY FIELD(day_of_week,'월','화','수','목','금'), period
+                    ORDER BY day_sort, period
                 """, (member_school, grade, class_no))
             timetable = cursor.fetchall()
 
@@ -1542,7 +1586,103 @@ def get_class_week_timetable():
 # ============================================
 # 학교 전체 시간표 조회 API (출력용)
 # ============================================
+_COLUMNAR_DAYS = ['월', '화', '수', '목', '금']
+
+
+def _columnar_timetable(timetable, tea_rows, teachers):
+    """
+    학교 전체 시간표 → 열 지향(columnar) 압축 형식 (format=columnar)
+    - subjects / teacher_names / teacher_ids: 사전 (0번 = 빈 값), 셀에는 사전 인덱스만 저장
+    - grid_subject / grid_teacher: 학급 × 요일 × 교시 평탄화 정수 배열 (timetable_tea 우선 병합 결과)
+      인덱스 = (class_idx * len(days) + day_idx) * periods + (period - 1)
+    - 교사 입력 시간표(행 형식의 teacher_timetable)는 격자를 다시 보내지 않고 희소 표시로만 전달
+      - tea_cells: 격자 값이 timetable_tea에서 온 칸의 평탄화 인덱스 (오름차순)
+      - tea_extra: 같은 칸에 겹친 밴드 수업 등 격자에 없는 timetable_tea 행 [인덱스, subject_idx, teacher_idx]
+      (복원: static/js/timetable-columnar.js)
+    """
+    subjects = ['']
+    subject_idx = {'': 0}
+    teacher_names = ['']
+    teacher_ids = ['']
+    teacher_idx = {('', ''): 0}
+
+    def sub_index(name):
+        name = name or ''
+        if name not in subject_idx:
+            subject_idx[name] = len(subjects)
+            subjects.append(name)
+        return subject_idx[name]
+
+    def tea_index(name, member_id):
+        key = (name or '', member_id or '')
+        if key not in teacher_idx:
+            teacher_idx[key] = len(teacher_names)
+            teacher_names.append(key[0])
+            teacher_ids.append(key[1])
+        return teacher_idx[key]
+
+    def period_no(r):
+        try:
+            return int(r['period'])
+        except (TypeError, ValueError):
+            return 0
+
+    cells = [r for r in list(timetable) + list(tea_rows)
+             if r['day_of_week'] in _COLUMNAR_DAYS and period_no(r) > 0]
+    classes = sorted({(str(r['grade']), str(r['class_no'])) for r in cells},
+                     key=lambda gc: (int(gc[0]) if gc[0].isdigit() else 0,
+                                     int(gc[1]) if gc[1].isdigit() else 0))
+    class_idx = {gc: i for i, gc in enumerate(classes)}
+    periods = max((period_no(r) for r in cells), default=0)
+    n_days = len(_COLUMNAR_DAYS)
+
+    grid_subject = [0] * (len(classes) * n_days * periods)
+    grid_teacher = [0] * len(grid_subject)
+    for r in timetable:
+        p = period_no(r)
+        if r['day_of_week'] not in _COLUMNAR_DAYS or p <= 0:
+            continue
+        c = class_idx[(str(r['grade']), str(r['class_no']))]
+        i = (c * n_days + _COLUMNAR_DAYS.index(r['day_of_week'])) * periods + p - 1
+        grid_subject[i] = sub_index(r['subject'])
+        grid_teacher[i] = tea_index(r['member_name'], r['member_id'])
+
+    tea_cells = set()
+    tea_extra = []
+    for r in tea_rows:
+        p = period_no(r)
+        if r['day_of_week'] not in _COLUMNAR_DAYS or p <= 0:
+            continue
+        c = class_idx[(str(r['grade']), str(r['class_no']))]
+        i = (c * n_days + _COLUMNAR_DAYS.index(r['day_of_week'])) * periods + p - 1
+        s_idx = sub_index(r['subject'])
+        if i not in tea_cells and grid_subject[i] == s_idx and \
+                teacher_names[grid_teacher[i]] == (r['member_name'] or ''):
+            tea_cells.add(i)
+        else:
+            tea_extra.append([i, s_idx, tea_index(r['member_name'], r['member_id'])])
+
+    return {
+        'success': True,
+        'format': 'columnar',
+        'days': _COLUMNAR_DAYS,
+        'periods': periods,
+        'classes': [[g, c] for g, c in classes],
+        'subjects': subjects,
+        'teacher_names': teacher_names,
+        'teacher_ids': teacher_ids,
+        'grid_subject': grid_subject,
+        'grid_teacher': grid_teacher,
+        'tea_cells': sorted(tea_cells),
+        'tea_extra': tea_extra,
+        'teachers': teachers,
+        'count': len(timetable)
+    }
+
+
 @timetable_bp.route('/api/timetable/school/all', methods=['GET'])
+@gzip_response()
+@timetable_conditional(('roster', lambda sid: f"{sid}.teachers"))
 def get_school_all_timetable():
     conn = None
     cursor = None
@@ -1561,7 +1701,7 @@ def get_school_all_timetable():
             SELECT day_of_week, period, subject, grade, class_no, member_name, member_id
             FROM timetable
             WHERE school_id = %s AND day_of_week IN ('월','화','수','목','금')
-            ORDER BY grade, class_no, FIELD(day_of_week,'월','화','수','목','금'), period
+            ORDER BY grade, class_no, day_sort, period
         """, (school_id,))
         tt_rows = cursor.fetchall()
 
@@ -1570,22 +1710,18 @@ def get_school_all_timetable():
             SELECT day_of_week, period, subject, grade, class_no, member_name, member_id
             FROM timetable_tea
             WHERE school_id = %s AND day_of_week IN ('월','화','수','목','금')
-            ORDER BY grade, class_no, FIELD(day_of_week,'월','화','수','목','금'), period
+            ORDER BY grade, class_no, day_sort, period
         """, (school_id,))
         tea_rows = cursor.fetchall()
 
-        # 3) 교사 목록 (member_id 보정용 + 프론트 반환용)
-        cursor.execute("""
-            SELECT member_id, member_name, department
-            FROM tea_all WHERE school_id = %s
-        """, (school_id,))
-        teachers = cursor.fetchall()
+        # 3) 교사 목록 (member_id 보정용 + 프론트 반환용) — 명단 캐시
+        roster = get_roster(school_id, 'teachers', cursor)
+        teacher_rows = roster.rows if roster else []
+        teachers = [{'member_id': t['member_id'], 'member_name': t['member_name'],
+                     'department': t['department']} for t in teacher_rows]
 
         # 교사명→member_id 매핑 (member_id 보정용)
-        name_to_id = {}
-        for t in teachers:
-            if t.get('member_id') and t.get('member_name'):
-                name_to_id[t['member_name']] = t['member_id']
+        name_to_id = roster.name_to_id() if roster else {}
 
         # 4) 두 테이블 병합: timetable_tea 우선 (교사가 직접 입력한 것이 더 정확)
         #    key = (day_of_week, period, grade, class_no)
@@ -1606,6 +1742,10 @@ def get_school_all_timetable():
                     r['member_id'] = matched_id
             timetable.append(r)
 
+        # 화면이 많은 학교용 압축 형식 (기본 응답은 기존 행 목록 그대로)
+        if request.args.get('format') == 'columnar':
+            return jsonify(_columnar_timetable(timetable, tea_rows, teachers))
+
         return jsonify({
             'success': True,
             'timetable': timetable,
@@ -1754,6 +1894,7 @@ def save_timetable_change():
               new_teacher, new_subject, change_reason, changed_by))
 
         conn.commit()
+        bump_timetable_version(school_id)
         return jsonify({'success': True, 'message': '변경사항이 저장되었습니다.', 'id': cursor.lastrowid})
 
     except Exception as e:
@@ -1836,6 +1977,7 @@ def delete_timetable_change():
         cursor.execute("DELETE FROM timetable_changes WHERE id = %s AND school_id = %s",
                         (change_id, school_id))
         conn.commit()
+        bump_timetable_version(school_id)
 
         if cursor.rowcount > 0:
             return jsonify({'success': True, 'message': '변경이 취소되었습니다.'})
@@ -1882,7 +2024,7 @@ def save_class_timetable_manual():
 
         # 새 레코드 삽입
         VALID_DAYS = {'월','화','수','목','금'}
-        inserted = 0
+        rows = []
         for item in timetable:
             day = sanitize_input(item.get('day_of_week', ''), 10)
             subject = sanitize_input(item.get('subject', ''), 50)
@@ -1897,14 +2039,17 @@ def save_class_timetable_manual():
             if period < 1 or period > 10:
                 continue
 
-            cursor.execute("""
-                INSERT INTO timetable_tea
-                (school_id, member_school, member_name, subject, grade, class_no, class_conut, hours, day_of_week, period)
-                VALUES (%s, %s, %s, %s, %s, %s, 1, 0, %s, %s)
-            """, (school_id, member_school, member_name, subject, grade, class_no, day, period))
-            inserted += 1
+            rows.append((school_id, member_school, member_name, subject, grade, class_no, 1, 0, day, period))
+
+        inserted = bulk_insert(
+            cursor, 'timetable_tea',
+            ['school_id', 'member_school', 'member_name', 'subject', 'grade', 'class_no',
+             'class_conut', 'hours', 'day_of_week', 'period'],
+            rows)
 
+        rebuild_student_weeks(cursor, school_id, grade, class_no)
         conn.commit()
+        bump_timetable_version(school_id)
         return jsonify({'success': True, 'message': f'학급 시간표가 저장되었습니다. ({inserted}건)', 'count': inserted})
 
     except Exception as e:
@@ -1948,7 +2093,7 @@ def save_timetable_schedule():
         else:
             cursor.execute("DELETE FROM timetable WHERE member_school = %s", (member_school,))
 
-        inserted = 0
+        rows = []
         for item in entries:
             grade = sanitize_input(str(item.get('grade', '')), 10)
             class_no = sanitize_input(str(item.get('class_no', '')), 10)
@@ -1961,14 +2106,16 @@ def save_timetable_schedule():
             if not grade or not class_no or not day_of_week or not period or not subject:
                 continue
 
-            cursor.execute("""
-                INSERT INTO timetable
-                (school_id, member_id, member_school, grade, class_no, day_of_week, period, subject, member_name)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
-            """, (school_id, item_member_id, member_school, grade, class_no, day_of_week, period, subject, member_name))
-            inserted += 1
+            rows.append((school_id, item_member_id, member_school, grade, class_no, day_of_week, period, subject, member_name))
 
+        inserted = bulk_insert(
+            cursor, 'timetable',
+            ['school_id', 'member_id', 'member_school', 'grade', 'class_no', 'day_of_week', 'period', 'subject', 'member_name'],
+            rows)
+
+        rebuild_student_weeks(cursor, school_id)
         conn.commit()
+        bump_timetable_version(school_id)
         return jsonify({'success': True, 'message': f'시간표 저장 완료 ({inserted}건)', 'count': inserted})
 
     except Exception as e:
@@ -1984,6 +2131,7 @@ def save_timetable_schedule():
 # 시간표 스케줄 불러오기 API (timetablemaker용)
 # ============================================
 @timetable_bp.route('/api/timetable/schedule/load', methods=['GET'])
+@timetable_conditional()
 def load_timetable_schedule():
     conn = None
     cursor = None
@@ -2003,13 +2151,13 @@ def load_timetable_schedule():
             cursor.execute("""
                 SELECT grade, class_no, day_of_week, period, subject, member_name, member_id
                 FROM timetable WHERE school_id = %s
-                ORDER BY grade, class_no, FIELD(day_of_week,'월','화','수','목','금'), period
+                ORDER BY grade, class_no, day_sort, period
             """, (school_id,))
         else:
             cursor.execute("""
                 SELECT grade, class_no, day_of_week, period, subject, member_name, member_id
                 FROM timetable WHERE member_school = %s
-                ORDER BY grade, class_no, FIELD(day_of_week,'월','화','수','목','금'), period
+                ORDER BY grade, class_no, day_sort, period
             """, (member_school,))
 
         data = cursor.fetchall()
@@ -2042,6 +2190,13 @@ def save_teacher_timetable_manual():
             return jsonify({'success': False, 'message': '데이터베이스 연결 오류'})
         cursor = conn.cursor()
 
+        # 기존/새 담당 학급만 학생 주간 시간표 재생성 (학교 전체 재생성 방지)
+        cursor.execute(
+            "SELECT DISTINCT grade, class_no FROM timetable_tea WHERE school_id = %s AND member_name = %s",
+            (school_id, member_name)
+        )
+        affected = {(str(r['grade'] or ''), str(r['class_no'] or '')) for r in cursor.fetchall()}
+
         # 해당 교사의 기존 레코드 삭제
         cursor.execute(
             "DELETE FROM timetable_tea WHERE school_id = %s AND member_name = %s",
@@ -2050,7 +2205,7 @@ def save_teacher_timetable_manual():
 
         # 새 레코드 삽입
         VALID_DAYS = {'월','화','수','목','금'}
-        inserted = 0
+        rows = []
         for item in timetable:
             day = sanitize_input(item.get('day_of_week', ''), 10)
             subject = sanitize_input(item.get('subject', ''), 50)
@@ -2066,14 +2221,20 @@ def save_teacher_timetable_manual():
             if period < 1 or period > 10:
                 continue
 
-            cursor.execute("""
-                INSERT INTO timetable_tea
-                (school_id, member_school, member_name, subject, grade, class_no, class_conut, hours, day_of_week, period)
-                VALUES (%s, %s, %s, %s, %s, %s, 1, 0, %s, %s)
-            """, (school_id, member_school, member_name, subject, grade, class_no, day, period))
-            inserted += 1
+            rows.append((school_id, member_school, member_name, subject, grade, class_no, 1, 0, day, period))
+
+        inserted = bulk_insert(
+            cursor, 'timetable_tea',
+            ['school_id', 'member_school', 'member_name', 'subject', 'grade', 'class_no',
+             'class_conut', 'hours', 'day_of_week', 'period'],
+            rows)
 
+        affected.update((r[4], r[5]) for r in rows)
+        for g, c in sorted(affected):
+            if g and c:
+                rebuild_student_weeks(cursor, school_id, g, c)
         conn.commit()
+        bump_timetable_version(school_id)
         return jsonify({'success': True, 'message': f'교사 시간표가 저장되었습니다. ({inserted}건)', 'count': inserted})
 
     except Exception as e:
@@ -2400,6 +2561,7 @@ def respond_timetable_exchange():
                 cursor.execute("""UPDATE timetable_exchange SET change_id_1=%s, change_id_2=%s
                     WHERE id=%s""", (cid1, cid2, rec['id']))
             conn.commit()
+            bump_timetable_version(school_id)
             return jsonify({'success': True,
                 'message': f'연쇄 교환 승인! {len(chain_records)}건의 교환이 적용되었습니다.'})
 
@@ -2442,6 +2604,7 @@ def respond_timetable_exchange():
             WHERE id=%s""", (change_id_1, change_id_2, exchange_id))
 
         conn.commit()
+        bump_timetable_version(school_id)
         return jsonify({'success': True, 'message': '교환 요청이 승인되었습니다.'})
 
     except Exception as e:
@@ -2496,6 +2659,7 @@ def cancel_timetable_exchange():
             cursor.execute("""UPDATE timetable_exchange SET status='cancelled'
                 WHERE chain_id=%s AND status IN ('pending','approved')""", (ex['chain_id'],))
             conn.commit()
+            bump_timetable_version(school_id)
             return jsonify({'success': True, 'message': '연쇄 교환 요청이 전체 취소되었습니다.'})
 
         # 기존 2인 교환: 단건 취소
@@ -2509,6 +2673,7 @@ def cancel_timetable_exchange():
 
         cursor.execute("UPDATE timetable_exchange SET status='cancelled' WHERE id=%s", (exchange_id,))
         conn.commit()
+        bump_timetable_version(school_id)
         return jsonify({'success': True, 'message': '교환 요청이 취소되었습니다.'})
 
     except Exception as e:
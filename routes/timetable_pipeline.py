@@ -5,6 +5,8 @@
 """
 from flask import Blueprint, request, jsonify
 from utils.db import get_db_connection, sanitize_input
+from utils.student_week import rebuild_student_weeks
+from utils.timetable_version import bump_timetable_version
 
 timetable_pipeline_bp = Blueprint('timetable_pipeline', __name__)
 
@@ -130,7 +132,9 @@ def generate_timetable():
             run_auto_generate(blocks, fixed_subjects, constraints, teachers)
 
         cnt = save_timetable(cursor, school_id, schedule)
+        rebuild_student_weeks(cursor, school_id)
         conn.commit()
+        bump_timetable_version(school_id)
 
         pct = round(total_placed / total_needed * 100) if total_needed else 0
 
@@ -189,6 +193,7 @@ def assign_electives():
 
         if result.get('saved'):
             conn.commit()
+            bump_timetable_version(school_id)
         elif not result.get('skipped'):
             conn.rollback()
 
@@ -0,0 +1,51 @@
+/**
+ * SchoolUs 학교 전체 시간표 열 지향(columnar) 응답 복원
+ * - /api/timetable/school/all?format=columnar 응답 → 기존 행 형식 { timetable, teacher_timetable, teachers, count }
+ * - 격자(grid_subject/grid_teacher)는 과목/교사 사전 인덱스, 0번은 빈 칸
+ * - 교사 입력 시간표: tea_cells(격자 칸 재사용) + tea_extra(같은 칸에 겹친 수업)
+ */
+(function() {
+  'use strict';
+
+  function decodeColumnarTimetable(data) {
+    if (!data || data.format !== 'columnar') return data;
+    const days = data.days || [];
+    const periods = data.periods || 0;
+    const classes = data.classes || [];
+
+    function cellAt(idx, subjectIdx, teacherIdx) {
+      const p = idx % periods;
+      const rest = (idx - p) / periods;
+      const d = rest % days.length;
+      const c = (rest - d) / days.length;
+      return {
+        day_of_week: days[d],
+        period: p + 1,
+        subject: data.subjects[subjectIdx],
+        grade: classes[c][0],
+        class_no: classes[c][1],
+        member_name: data.teacher_names[teacherIdx],
+        member_id: data.teacher_ids[teacherIdx] || null
+      };
+    }
+
+    const timetable = [];
+    data.grid_subject.forEach((s, i) => {
+      const t = data.grid_teacher[i];
+      if (s || t) timetable.push(cellAt(i, s, t));
+    });
+
+    const teacherTimetable = (data.tea_cells || []).map(i => cellAt(i, data.grid_subject[i], data.grid_teacher[i]));
+    (data.tea_extra || []).forEach(([i, s, t]) => teacherTimetable.push(cellAt(i, s, t)));
+
+    return {
+      success: data.success,
+      timetable: timetable,
+      teacher_timetable: teacherTimetable,
+      teachers: data.teachers || [],
+      count: data.count
+    };
+  }
+
+  window.decodeColumnarTimetable = decodeColumnarTimetable;
+})();
@@ -26,6 +26,13 @@ const STATIC_PATTERNS = [
   /cdnjs\.cloudflare\.com/
 ];
 
+// 시간표 조회 API: 서버 ETag로 재검증 (304면 브라우저 HTTP 캐시 본문 사용), 오프라인 시 마지막 응답
+const REVALIDATE_API_PATTERNS = [
+  /\/api\/timetable\/(class|teacher)\/week/,
+  /\/api\/timetable\/school\/all/,
+  /\/api\/timetable\/schedule\/load/
+];
+
 // 캐시 제외 패턴
 const NO_CACHE_PATTERNS = [
   /\/api\//,
@@ -78,6 +85,22 @@ self.addEventListener('fetch', (event) => {
   // POST 등 GET 아닌 요청은 캐시하지 않음
   if (request.method !== 'GET') return;
 
+  // 시간표 API: ETag 재검증 (no-cache 요청 → If-None-Match 자동 전송)
+  if (REVALIDATE_API_PATTERNS.some((p) => p.test(url.pathname))) {
+    event.respondWith(
+      fetch(request, { cache: 'no-cache' })
+        .then((response) => {
+          if (response && response.status === 200) {
+            const clone = response.clone();
+            caches.open(API_CACHE).then((cache) => cache.put(request, clone));
+          }
+          return response;
+        })
+        .catch(() => caches.match(request))
+    );
+    return;
+  }
+
   // 캐시 제외 대상
   if (NO_CACHE_PATTERNS.some((p) => p.test(url.href))) return;
 
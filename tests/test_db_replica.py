@@ -0,0 +1,176 @@
+"""
+utils.db_replica 라우팅 테스트 (MySQL 없이 대체 커넥션 사용)
+- @read_only / read_only_blueprint 라우트는 복제본 커넥션을 받음
+- 복제 지연 초과 / 접속 실패 시 주 DB로 폴백, 쓰기 라우트는 항상 주 DB
+
+실행: python -m pytest -q tests
+"""
+
+import os
+import sys
+import types
+import importlib
+
+import pytest
+
+pytest.importorskip('flask')
+pytest.importorskip('pymysql')
+
+from flask import Flask, Blueprint, jsonify
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class FakeConn:
+    """pymysql 커넥션 대체 — 어느 DB에서 왔는지와 close 여부만 기록"""
+
+    def __init__(self, source):
+        self.source = source
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def replica(monkeypatch):
+    # utils.db(배포 환경 전용)가 없어도 import 되도록 테스트 동안만 대체 모듈 등록
+    fake_db = types.ModuleType('utils.db')
+    fake_db.get_db_connection = lambda *a, **kw: FakeConn('primary')
+    monkeypatch.setitem(sys.modules, 'utils.db', fake_db)
+    monkeypatch.setattr(importlib.import_module('utils'), 'db', fake_db, raising=False)
+    sys.modules.pop('utils.db_replica', None)
+    module = importlib.import_module('utils.db_replica')
+
+    calls = {'connect': 0, 'lag': 0}
+    opened = []
+    behaviour = {'connect_error': None, 'lag': 0}
+
+    def fake_connect():
+        calls['connect'] += 1
+        if behaviour['connect_error']:
+            raise behaviour['connect_error']
+        conn = FakeConn('replica')
+        opened.append(conn)
+        return conn
+
+    def fake_lag(conn):
+        calls['lag'] += 1
+        return behaviour['lag']
+
+    monkeypatch.setattr(module, 'REPLICA_HOST', 'replica.test')
+    monkeypatch.setattr(module, 'REPLICA_USER', 'reader')
+    monkeypatch.setattr(module, 'REPLICA_MAX_LAG', 5)
+    monkeypatch.setattr(module, '_connect_replica', fake_connect)
+    monkeypatch.setattr(module, '_replica_lag', fake_lag)
+    monkeypatch.setattr(module, '_state',
+                        {'checked_at': 0.0, 'healthy': False, 'down_until': 0.0, 'lag': None})
+    monkeypatch.setattr(module, '_counters', {'replica': 0, 'primary_fallback': 0})
+
+    app = Flask(__name__)
+    module.init_read_replica(app)
+    # init_read_replica가 잡은 원본 대신 대체 주 DB 커넥션 사용
+    monkeypatch.setattr(module, '_primary_get_db_connection', lambda *a, **kw: FakeConn('primary'))
+
+    # 실제 라우트처럼 요청 시점에 utils.db.get_db_connection 호출
+    def source():
+        conn = fake_db.get_db_connection()
+        try:
+            return jsonify({'success': True, 'source': conn.source})
+        finally:
+            conn.close()
+
+    @app.route('/read')
+    @module.read_only
+    def read_route():
+        return source()
+
+    @app.route('/write', methods=['POST'])
+    def write_route():
+        return source()
+
+    @app.route('/read-primary')
+    @module.read_only
+    def read_primary_route():
+        conn = module.get_primary_connection()
+        after = fake_db.get_db_connection()
+        return jsonify({'success': True, 'source': conn.source, 'after': after.source})
+
+    bp = Blueprint('reports', __name__)
+
+    @bp.route('/report')
+    def report_route():
+        return source()
+
+    module.read_only_blueprint(bp)
+    app.register_blueprint(bp)
+
+    return types.SimpleNamespace(module=module, client=app.test_client(),
+                                 calls=calls, opened=opened, behaviour=behaviour)
+
+
+def _source(resp):
+    assert resp.status_code == 200
+    return resp.get_json()['source']
+
+
+def test_read_only_route_uses_replica(replica):
+    assert _source(replica.client.get('/read')) == 'replica'
+    assert replica.module.get_replica_status()['replica_connections'] == 1
+
+
+def test_read_only_blueprint_uses_replica(replica):
+    assert _source(replica.client.get('/report')) == 'replica'
+
+
+def test_write_route_uses_primary(replica):
+    assert _source(replica.client.post('/write')) == 'primary'
+    assert replica.calls['connect'] == 0
+
+
+def test_primary_connection_inside_read_only_route(replica):
+    data = replica.client.get('/read-primary').get_json()
+    assert data['source'] == 'primary'
+    assert data['after'] == 'replica'  # 이후 호출은 다시 복제본
+
+
+def test_lag_check_is_cached_between_requests(replica):
+    replica.client.get('/read')
+    replica.client.get('/read')
+    assert replica.calls['connect'] == 2
+    assert replica.calls['lag'] == 1
+
+
+def test_lag_over_limit_falls_back_to_primary(replica):
+    replica.behaviour['lag'] = 60
+    assert _source(replica.client.get('/read')) == 'primary'
+    assert replica.opened and all(c.closed for c in replica.opened)
+    status = replica.module.get_replica_status()
+    assert status['healthy'] is False
+    assert status['lag'] == 60
+    assert status['primary_fallbacks'] == 1
+
+
+def test_stopped_replication_falls_back_to_primary(replica):
+    replica.behaviour['lag'] = None
+    assert _source(replica.client.get('/read')) == 'primary'
+
+
+def test_connect_failure_falls_back_and_backs_off(replica):
+    replica.behaviour['connect_error'] = OSError('connection refused')
+    assert _source(replica.client.get('/read')) == 'primary'
+    assert replica.calls['connect'] == 1
+    # 중단 시간 동안은 복제본 접속을 다시 시도하지 않음
+    replica.behaviour['connect_error'] = None
+    assert _source(replica.client.get('/read')) == 'primary'
+    assert replica.calls['connect'] == 1
+    assert replica.module.get_replica_status()['primary_fallbacks'] == 2
+
+
+def test_recovers_after_backoff(replica):
+    replica.behaviour['connect_error'] = OSError('connection refused')
+    replica.client.get('/read')
+    replica.behaviour['connect_error'] = None
+    replica.module._state['down_until'] = 0.0
+    replica.module._state['checked_at'] = 0.0
+    assert _source(replica.client.get('/read')) == 'replica'
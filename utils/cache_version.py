@@ -0,0 +1,103 @@
+"""
+워커 간 캐시 버전(무효화 신호) 공유
+- Gunicorn 워커마다 메모리 캐시가 따로 있으므로, 데이터를 바꾼 워커가 버전을 올리고
+  다른 워커는 캐시 사용 전에 버전을 비교해 오래된 항목을 버림
+- SCHOOLUS_REDIS_URL 설정 + redis 패키지 설치 시: Redis INCR 키
+- 그 외: 공유 디렉터리(/dev/shm 우선)의 버전 파일 mtime (SCHOOLUS_CACHE_VERSION_DIR로 변경 가능)
+"""
+
+import os
+import time
+import tempfile
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+REDIS_URL = os.environ.get('SCHOOLUS_REDIS_URL', '')
+
+_VERSION_DIR = os.environ.get('SCHOOLUS_CACHE_VERSION_DIR') or os.path.join(
+    '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir(), 'schoolus_cache')
+
+_redis_client = None
+
+
+def _get_redis():
+    global _redis_client
+    if not REDIS_URL or redis is None:
+        return None
+    if _redis_client is None:
+        try:
+            _redis_client = redis.Redis.from_url(REDIS_URL, socket_timeout=0.5)
+        except Exception as e:
+            print(f"[CacheVersion] Redis 연결 실패, 파일 버전으로 대체: {e}")
+            return None
+    return _redis_client
+
+
+def get_redis():
+    """공용 Redis 클라이언트 (설정 없음/패키지 미설치/연결 실패 시 None) — 워커 간 공유 카운터 등"""
+    return _get_redis()
+
+
+def backend_name():
+    return 'redis' if _get_redis() is not None else 'file'
+
+
+def _redis_key(namespace, key):
+    return f"schoolus:{namespace}:{key}"
+
+
+def _version_path(namespace, key):
+    safe = ''.join(ch for ch in str(key) if ch.isalnum() or ch in '-_.') or '_'
+    return os.path.join(_VERSION_DIR, namespace, safe)
+
+
+def get_version(namespace, key, init=False):
+    """
+    현재 버전 (한 번도 갱신된 적 없으면 0).
+    init=True: 0 대신 현재 시각(ns)으로 초기화한 값 반환 — ETag처럼 재부팅/Redis 초기화 후에도
+    예전 값과 겹치면 안 되는 용도
+    """
+    client = _get_redis()
+    if client is not None:
+        try:
+            rkey = _redis_key(namespace, key)
+            if init:
+                client.set(rkey, time.time_ns(), nx=True)
+            return int(client.get(rkey) or 0)
+        except Exception:
+            pass
+    path = _version_path(namespace, key)
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        if not init:
+            return 0
+    bump_version(namespace, key)
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return 0
+
+
+def bump_version(namespace, key):
+    """버전 증가 → 모든 워커의 해당 캐시 항목이 다음 조회 시 재적재됨"""
+    client = _get_redis()
+    if client is not None:
+        try:
+            rkey = _redis_key(namespace, key)
+            client.set(rkey, time.time_ns(), nx=True)  # 키가 없으면 시각 기반 값에서 시작
+            client.incr(rkey)
+            return
+        except Exception as e:
+            print(f"[CacheVersion] Redis 버전 갱신 실패: {e}")
+    try:
+        path = _version_path(namespace, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'a'):
+            pass
+        os.utime(path, None)
+    except OSError as e:
+        print(f"[CacheVersion] 버전 파일 갱신 실패: {e}")
@@ -0,0 +1,27 @@
+"""
+날짜 범위 헬퍼
+- 인덱스 컬럼을 DATE_FORMAT/YEAR/MONTH로 감싸지 않도록 반열린 구간 [start, end) 생성
+- 사용 예: WHERE attendance_date >= %s AND attendance_date < %s
+"""
+
+from datetime import date
+
+
+def year_month_range(year, month):
+    """(year, month) → ('YYYY-MM-01', 다음달 'YYYY-MM-01'). 형식 오류 시 None"""
+    try:
+        y = int(year)
+        m = int(month)
+        start = date(y, m, 1)
+    except (TypeError, ValueError):
+        return None
+    end = date(y + 1, 1, 1) if m == 12 else date(y, m + 1, 1)
+    return start.isoformat(), end.isoformat()
+
+
+def month_range(year_month):
+    """'YYYY-MM' → ('YYYY-MM-01', 다음달 'YYYY-MM-01'). 형식 오류 시 None"""
+    if not year_month or len(str(year_month)) < 6 or '-' not in str(year_month):
+        return None
+    year, _, month = str(year_month).partition('-')
+    return year_month_range(year, month[:2])
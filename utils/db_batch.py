@@ -0,0 +1,124 @@
+"""
+SchoolUs 일괄 쓰기 헬퍼
+- 행 단위 INSERT/UPDATE 루프를 청크 단위 다중행 SQL로 대체 (왕복 횟수 감소)
+- bulk_insert: INSERT ... VALUES (...),(...) [ON DUPLICATE KEY UPDATE]
+- bulk_update: UPDATE ... SET col = CASE key WHEN ... END WHERE key IN (...)
+- caller가 cursor/트랜잭션(commit/rollback) 관리
+"""
+
+import re
+
+DEFAULT_CHUNK_SIZE = 500
+
+_IDENT_RE = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*$')
+
+
+def _ident(name):
+    """테이블/컬럼명 검증 (식별자는 파라미터 바인딩이 안 되므로 화이트리스트 패턴만 허용)"""
+    if not isinstance(name, str) or not _IDENT_RE.match(name):
+        raise ValueError(f"잘못된 식별자: {name!r}")
+    return f"`{name}`"
+
+
+def _chunks(items, size):
+    size = max(1, int(size or DEFAULT_CHUNK_SIZE))
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def bulk_insert(cursor, table, columns, rows, update_columns=None, const_values=None,
+                chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    다중행 INSERT.
+
+    Args:
+        cursor: DB 커서
+        table: 대상 테이블
+        columns: 컬럼 목록 (rows 각 튜플의 순서)
+        rows: [(v1, v2, ...), ...]
+        update_columns: 지정 시 ON DUPLICATE KEY UPDATE col=VALUES(col)
+        const_values: 모든 행에 공통으로 들어갈 SQL 식 {'created_at': 'NOW()'} (코드 상수만 사용)
+        chunk_size: 한 문장에 담을 최대 행 수
+
+    Returns:
+        int: 실행한 행 수 (len(rows))
+    """
+    rows = list(rows)
+    if not rows:
+        return 0
+
+    const_values = const_values or {}
+    col_sql = ', '.join([_ident(c) for c in columns] + [_ident(c) for c in const_values])
+    row_sql = '(' + ', '.join(['%s'] * len(columns) + list(const_values.values())) + ')'
+
+    suffix = ''
+    if update_columns:
+        suffix = ' ON DUPLICATE KEY UPDATE ' + ', '.join(
+            f"{_ident(c)}=VALUES({_ident(c)})" for c in update_columns)
+
+    for chunk in _chunks(rows, chunk_size):
+        sql = f"INSERT INTO {_ident(table)} ({col_sql}) VALUES " + ', '.join([row_sql] * len(chunk)) + suffix
+        params = []
+        for r in chunk:
+            if len(r) != len(columns):
+                raise ValueError(f"컬럼 수 불일치: {len(columns)}개 필요, {len(r)}개 전달")
+            params.extend(r)
+        cursor.execute(sql, params)
+    return len(rows)
+
+
+def bulk_update(cursor, table, key_column, rows, where=None, where_params=None,
+                chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    CASE 기반 다중행 UPDATE. 행마다 갱신할 컬럼이 달라도 됨 (없는 컬럼은 기존 값 유지).
+
+    Args:
+        cursor: DB 커서
+        table: 대상 테이블
+        key_column: 행 식별 컬럼 (WHERE key IN (...))
+        rows: [{key_column: 값, 'col': 값, ...}, ...] — 같은 키가 여러 번 오면 뒤의 값이 우선
+        where: 추가 조건 SQL (예: "school_id = %s")
+        where_params: where의 파라미터
+
+    Returns:
+        int: 변경된 행 수 (cursor.rowcount 합계)
+    """
+    merged = {}
+    for r in rows:
+        key = r.get(key_column)
+        if key is None:
+            continue
+        merged.setdefault(key, {}).update({c: v for c, v in r.items() if c != key_column})
+    merged = {k: v for k, v in merged.items() if v}
+    if not merged:
+        return 0
+
+    key_sql = _ident(key_column)
+    affected = 0
+    for chunk_keys in _chunks(list(merged.keys()), chunk_size):
+        columns = []
+        for k in chunk_keys:
+            for c in merged[k]:
+                if c not in columns:
+                    columns.append(c)
+
+        set_parts = []
+        params = []
+        for c in columns:
+            col_sql = _ident(c)
+            whens = []
+            for k in chunk_keys:
+                if c in merged[k]:
+                    whens.append('WHEN %s THEN %s')
+                    params.extend([k, merged[k][c]])
+            set_parts.append(f"{col_sql} = CASE {key_sql} {' '.join(whens)} ELSE {col_sql} END")
+
+        sql = (f"UPDATE {_ident(table)} SET {', '.join(set_parts)} "
+               f"WHERE {key_sql} IN ({', '.join(['%s'] * len(chunk_keys))})")
+        params.extend(chunk_keys)
+        if where:
+            sql += f" AND ({where})"
+            params.extend(where_params or [])
+        cursor.execute(sql, params)
+        affected += cursor.rowcount
+    return affected
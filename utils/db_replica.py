@@ -0,0 +1,195 @@
+"""
+SchoolUs 읽기 전용 복제본(read replica) 라우팅
+- 읽기 전용으로 선언된 라우트/블루프린트는 get_db_connection() 호출 시 복제본 커넥션을 받음
+- 복제본 미설정 / 접속 실패 / 복제 지연 초과 시 자동으로 주 DB(utils.db)로 폴백
+- 라우트 선언: @read_only 데코레이터, 블루프린트 전체: read_only_blueprint(bp)
+- 읽기 전용 라우트 안에서 주 DB가 꼭 필요한 조회: get_primary_connection()
+
+환경변수 (SCHOOLUS_DB_REPLICA_HOST 미설정 시 비활성화)
+- SCHOOLUS_DB_REPLICA_HOST / _PORT / _USER / _PASSWORD / _NAME
+- SCHOOLUS_DB_REPLICA_MAX_LAG: 허용 복제 지연(초, 기본 5)
+"""
+
+import os
+import time
+import threading
+from functools import wraps
+
+import pymysql
+from flask import g, has_request_context
+
+import utils.db
+
+REPLICA_HOST = os.environ.get('SCHOOLUS_DB_REPLICA_HOST', '')
+REPLICA_PORT = int(os.environ.get('SCHOOLUS_DB_REPLICA_PORT', '3306'))
+REPLICA_USER = os.environ.get('SCHOOLUS_DB_REPLICA_USER', '')
+REPLICA_PASSWORD = os.environ.get('SCHOOLUS_DB_REPLICA_PASSWORD', '')
+REPLICA_DB = os.environ.get('SCHOOLUS_DB_REPLICA_NAME', 'school_db')
+REPLICA_MAX_LAG = int(os.environ.get('SCHOOLUS_DB_REPLICA_MAX_LAG', '5'))
+
+_LAG_CHECK_INTERVAL = 5         # 복제 지연 재확인 주기(초)
+_DOWN_BACKOFF = 30              # 접속 실패 시 복제본 사용 중단 시간(초)
+
+# 주 DB 커넥션 함수 (init_read_replica 시점의 원본)
+_primary_get_db_connection = utils.db.get_db_connection
+
+_state_lock = threading.Lock()
+_state = {'checked_at': 0.0, 'healthy': False, 'down_until': 0.0, 'lag': None}
+_counters = {'replica': 0, 'primary_fallback': 0}
+
+
+def replica_enabled():
+    return bool(REPLICA_HOST and REPLICA_USER)
+
+
+# ============================================
+# 읽기 전용 선언
+# ============================================
+def read_only(f):
+    """이 라우트의 get_db_connection() 호출을 복제본으로 보냄 (SELECT만 하는 라우트 전용)"""
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        g._db_read_only = True
+        return f(*args, **kwargs)
+    return decorated
+
+
+def read_only_blueprint(bp):
+    """블루프린트 전체를 읽기 전용으로 선언 (쓰기 라우트가 없는 블루프린트에만 사용)"""
+    @bp.before_request
+    def _mark_read_only():
+        g._db_read_only = True
+    return bp
+
+
+def _is_read_only_request():
+    return has_request_context() and getattr(g, '_db_read_only', False)
+
+
+def get_primary_connection():
+    """
+    읽기 전용 라우트 안에서도 주 DB 커넥션 (복제 지연을 허용할 수 없는 조회용 — 예: 버전 캐시 채우기)
+    utils.db.get_db_connection을 그대로 거치므로 SQL 계측에는 포함됨
+    """
+    if not _is_read_only_request():
+        return utils.db.get_db_connection()
+    g._db_read_only = False
+    try:
+        return utils.db.get_db_connection()
+    finally:
+        g._db_read_only = True
+
+
+# ============================================
+# 복제본 커넥션 / 상태 확인
+# ============================================
+def _connect_replica():
+    return pymysql.connect(
+        host=REPLICA_HOST, port=REPLICA_PORT,
+        user=REPLICA_USER, password=REPLICA_PASSWORD, database=REPLICA_DB,
+        charset='utf8mb4', cursorclass=pymysql.cursors.DictCursor,
+        connect_timeout=2, read_timeout=30, autocommit=True
+    )
+
+
+def _replica_lag(conn):
+    """복제 지연(초). 복제 중단 상태면 None"""
+    cursor = conn.cursor()
+    try:
+        try:
+            cursor.execute("SHOW REPLICA STATUS")
+            row = cursor.fetchone()
+            key = 'Seconds_Behind_Source'
+        except pymysql.MySQLError:
+            cursor.execute("SHOW SLAVE STATUS")
+            row = cursor.fetchone()
+            key = 'Seconds_Behind_Master'
+        if not row:
+            # 복제 설정이 없는 단독 인스턴스(로컬 대체 DB 등)는 지연 0으로 취급
+            return 0
+        return row.get(key)
+    finally:
+        cursor.close()
+
+
+def _mark_down(now, reason):
+    with _state_lock:
+        _state['healthy'] = False
+        _state['down_until'] = now + _DOWN_BACKOFF
+        _state['checked_at'] = now
+    print(f"[DB Replica] 복제본 사용 중단 {_DOWN_BACKOFF}초: {reason}")
+
+
+def get_read_connection():
+    """복제본 커넥션 반환. 사용할 수 없으면 주 DB 커넥션으로 폴백"""
+    if not replica_enabled():
+        return _primary_get_db_connection()
+
+    now = time.time()
+    if now < _state['down_until']:
+        _counters['primary_fallback'] += 1
+        return _primary_get_db_connection()
+
+    try:
+        conn = _connect_replica()
+    except Exception as e:
+        _mark_down(now, e)
+        _counters['primary_fallback'] += 1
+        return _primary_get_db_connection()
+
+    if now - _state['checked_at'] >= _LAG_CHECK_INTERVAL:
+        try:
+            lag = _replica_lag(conn)
+        except Exception as e:
+            lag = None
+            print(f"[DB Replica] 복제 지연 확인 오류: {e}")
+        with _state_lock:
+            _state['checked_at'] = now
+            _state['lag'] = lag
+            _state['healthy'] = lag is not None and lag <= REPLICA_MAX_LAG
+
+    if not _state['healthy']:
+        conn.close()
+        _counters['primary_fallback'] += 1
+        return _primary_get_db_connection()
+
+    _counters['replica'] += 1
+    return conn
+
+
+def get_replica_status():
+    """복제본 상태/사용 횟수 (워커 프로세스 단위)"""
+    return {
+        'enabled': replica_enabled(),
+        'healthy': _state['healthy'],
+        'lag': _state['lag'],
+        'replica_connections': _counters['replica'],
+        'primary_fallbacks': _counters['primary_fallback'],
+    }
+
+
+# ============================================
+# Flask 연동
+# ============================================
+def init_read_replica(app):
+    """
+    utils.db.get_db_connection을 읽기 전용 요청이면 복제본으로 보내는 버전으로 교체.
+    블루프린트 import 이전에 호출해야 각 라우트에 반영됨.
+    """
+    global _primary_get_db_connection
+    if not replica_enabled():
+        return
+
+    original = utils.db.get_db_connection
+    if getattr(original, '_replica_routed', False):
+        return
+    _primary_get_db_connection = original
+
+    def routed_get_db_connection(*args, **kwargs):
+        if _is_read_only_request():
+            return get_read_connection()
+        return original(*args, **kwargs)
+
+    routed_get_db_connection._replica_routed = True
+    utils.db.get_db_connection = routed_get_db_connection
+    print(f"[DB Replica] 읽기 전용 라우트 복제본 라우팅 활성화: {REPLICA_HOST}:{REPLICA_PORT}")
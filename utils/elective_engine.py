@@ -5,6 +5,7 @@
 """
 import random
 from collections import defaultdict
+from utils.student_week import rebuild_student_weeks
 
 BAND_NAMES = list('ABCDEFGHIJKLMNOP')  # 최대 16밴드
 
@@ -475,6 +476,9 @@ def save_results(cursor, school_id, grade, groups, students, slot_positions, gro
                         VALUES (%s,%s,%s,%s,%s)""",
                     (school_id, grade, band_name, day, str(period)))
 
+    # 학생 개인 주간 시간표 물리화 갱신 (같은 트랜잭션)
+    rebuild_student_weeks(cursor, school_id, grade)
+
     return {'timetable_inserted': insert_count, 'mappings_saved': mapping_count}
 
 
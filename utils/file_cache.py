@@ -0,0 +1,240 @@
+"""
+SFTP 첨부파일 로컬 디스크 캐시 (LRU, 용량 제한)
+- 캐시 키: 원격 경로의 SHA-256 (저장 경로에 업로드 시각이 들어가 경로 = 내용으로 취급 가능)
+- 잠금(fcntl.flock): 여러 워커가 동시에 같은 파일을 요청해도 SFTP 다운로드는 1회,
+  나머지는 잠금 해제 후 캐시 파일을 그대로 사용
+  잠금 파일은 키 앞 _LOCK_PREFIX_LEN자리별 공유 (.locks/ 아래 최대 16^3개 — 캐시 파일 수와 무관하게 고정)
+- 적중 시 mtime 갱신 → 용량 초과 시 mtime 오래된 순으로 삭제 (최근 사용 파일은 보호)
+  전체 디렉터리 스캔은 추정 용량(마지막 스캔 + 이후 이 프로세스가 추가한 크기)이 상한을 넘었거나
+  _SCAN_INTERVAL초가 지났을 때만
+- 파일 삭제 API는 invalidate_cached_file(remote_path) 호출, 업로드 직후 미리 채우기는 store_cached_file
+- 적중/실패 카운터: cache_stats() (워커 프로세스 단위)
+
+설정
+- SCHOOLUS_FILE_CACHE=false       : 비활성화 (매번 SFTP)
+- SCHOOLUS_FILE_CACHE_DIR         : 캐시 디렉터리 (기본: 임시 디렉터리/schoolus_file_cache)
+- SCHOOLUS_FILE_CACHE_MB          : 최대 용량 MB (기본 1024)
+"""
+
+import os
+import time
+import fcntl
+import shutil
+import hashlib
+import tempfile
+import threading
+from contextlib import contextmanager
+
+FILE_CACHE_ENABLED = os.environ.get('SCHOOLUS_FILE_CACHE', 'true').lower() != 'false'
+FILE_CACHE_DIR = os.environ.get('SCHOOLUS_FILE_CACHE_DIR') or os.path.join(
+    tempfile.gettempdir(), 'schoolus_file_cache')
+FILE_CACHE_MAX_BYTES = int(os.environ.get('SCHOOLUS_FILE_CACHE_MB', '1024')) * 1024 * 1024
+
+_EVICT_TARGET_RATIO = 0.9       # 용량 초과 시 이 비율까지 줄임
+_RECENT_PROTECT_SECONDS = 60    # 방금 사용한 파일은 전송 중일 수 있으므로 삭제하지 않음
+_COPY_CHUNK = 1024 * 1024
+_LOCK_DIR_NAME = '.locks'
+_LOCK_PREFIX_LEN = 3
+_SCAN_INTERVAL = 60             # 다른 워커가 추가한 용량 반영 주기 (초)
+
+_stats_lock = threading.Lock()
+_stats = {'hits': 0, 'misses': 0, 'fetch_errors': 0, 'evictions': 0, 'invalidations': 0}
+
+_scan_lock = threading.Lock()
+_scan_state = {'at': 0.0, 'total': 0, 'added': 0}   # 마지막 스캔 시각/총 용량, 이후 추가한 바이트
+
+
+def _count(name, n=1):
+    with _stats_lock:
+        _stats[name] += n
+
+
+def _paths(remote_path):
+    key = hashlib.sha256(remote_path.encode('utf-8')).hexdigest()
+    bucket = os.path.join(FILE_CACHE_DIR, key[:2])
+    return bucket, os.path.join(bucket, key)
+
+
+@contextmanager
+def _file_lock(data_path):
+    """파일별 배타 잠금 (워커 프로세스 간). 키 앞자리가 같은 파일끼리 잠금 파일 공유"""
+    lock_dir = os.path.join(FILE_CACHE_DIR, _LOCK_DIR_NAME)
+    os.makedirs(lock_dir, exist_ok=True)
+    lock_path = os.path.join(lock_dir, os.path.basename(data_path)[:_LOCK_PREFIX_LEN] + '.lock')
+    with open(lock_path, 'a') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _touch(path):
+    try:
+        os.utime(path, None)
+        return True
+    except OSError:
+        return False
+
+
+# ============================================
+# 조회 / 무효화
+# ============================================
+def get_cached_file(remote_path):
+    """원격 파일의 로컬 캐시 경로 (없으면 SFTP에서 받아 저장). 실패 시 None"""
+    bucket, data_path = _paths(remote_path)
+    if _touch(data_path):
+        _count('hits')
+        return data_path
+
+    from routes.subject_utils import sftp_download_file
+    os.makedirs(bucket, exist_ok=True)
+    with _file_lock(data_path):
+        if _touch(data_path):  # 잠금 대기 중 다른 워커가 받아 둠
+            _count('hits')
+            return data_path
+        _count('misses')
+        part_path = f"{data_path}.part{os.getpid()}_{threading.get_ident()}"
+        try:
+            sftp_download_file(remote_path, part_path)
+            if not os.path.exists(part_path) or os.path.getsize(part_path) == 0:
+                _count('fetch_errors')
+                return None
+            os.replace(part_path, data_path)
+            added = os.path.getsize(data_path)
+        except Exception as e:
+            print(f"[FileCache] SFTP 다운로드 오류 ({remote_path}): {e}")
+            _count('fetch_errors')
+            return None
+        finally:
+            if os.path.exists(part_path):
+                os.remove(part_path)
+
+    _evict_if_needed(added)
+    return data_path
+
+
+def read_cached_file(remote_path):
+    """원격 파일 내용(bytes) — sftp_download_file(path) 대체. 실패 시 None"""
+    if not FILE_CACHE_ENABLED:
+        from routes.subject_utils import sftp_download_file
+        return sftp_download_file(remote_path)
+    local_path = get_cached_file(remote_path)
+    if not local_path:
+        return None
+    try:
+        with open(local_path, 'rb') as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def store_cached_file(remote_path, fileobj):
+    """방금 업로드한 내용을 캐시에 미리 저장 (직후 다운로드/썸네일 생성이 SFTP를 다시 거치지 않도록)"""
+    if not FILE_CACHE_ENABLED:
+        return None
+    bucket, data_path = _paths(remote_path)
+    part_path = f"{data_path}.part{os.getpid()}_{threading.get_ident()}"
+    try:
+        os.makedirs(bucket, exist_ok=True)
+        with _file_lock(data_path):
+            fileobj.seek(0)
+            with open(part_path, 'wb') as out:
+                shutil.copyfileobj(fileobj, out, _COPY_CHUNK)
+            os.replace(part_path, data_path)
+        added = os.path.getsize(data_path)
+    except Exception as e:
+        print(f"[FileCache] 캐시 저장 오류 ({remote_path}): {e}")
+        return None
+    finally:
+        fileobj.seek(0)
+        if os.path.exists(part_path):
+            os.remove(part_path)
+    _evict_if_needed(added)
+    return data_path
+
+
+def invalidate_cached_file(remote_path):
+    """원격 파일 삭제 시 캐시에서도 제거"""
+    if not remote_path:
+        return
+    bucket, data_path = _paths(remote_path)
+    if not os.path.exists(data_path):
+        return
+    with _file_lock(data_path):
+        try:
+            os.remove(data_path)
+            _count('invalidations')
+        except FileNotFoundError:
+            pass
+
+
+# ============================================
+# 용량 관리
+# ============================================
+def _scan():
+    entries = []
+    for root, dirs, files in os.walk(FILE_CACHE_DIR):
+        if _LOCK_DIR_NAME in dirs:
+            dirs.remove(_LOCK_DIR_NAME)
+        for name in files:
+            if '.part' in name:
+                continue
+            path = os.path.join(root, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+    return entries
+
+
+def _evict_if_needed(added=0):
+    """added: 방금 추가한 바이트. 추정 용량이 상한 이하이고 스캔 주기 전이면 디렉터리를 훑지 않음"""
+    now = time.time()
+    with _scan_lock:
+        _scan_state['added'] += added
+        estimate = _scan_state['total'] + _scan_state['added']
+        if estimate <= FILE_CACHE_MAX_BYTES and now - _scan_state['at'] < _SCAN_INTERVAL:
+            return
+    entries = _scan()
+    total = sum(size for _, size, _ in entries)
+    with _scan_lock:
+        _scan_state.update({'at': now, 'total': total, 'added': 0})
+    if total <= FILE_CACHE_MAX_BYTES:
+        return
+    target = FILE_CACHE_MAX_BYTES * _EVICT_TARGET_RATIO
+    protect_after = time.time() - _RECENT_PROTECT_SECONDS
+    evicted = 0
+    for mtime, size, path in sorted(entries):
+        if total <= target:
+            break
+        if mtime > protect_after:
+            break
+        try:
+            os.remove(path)
+            total -= size
+            evicted += 1
+        except OSError:
+            pass
+    if evicted:
+        _count('evictions', evicted)
+    with _scan_lock:
+        _scan_state['total'] = total
+
+
+def cache_stats():
+    """적중/실패 카운터 + 현재 캐시 용량"""
+    entries = _scan() if os.path.isdir(FILE_CACHE_DIR) else []
+    with _stats_lock:
+        stats = dict(_stats)
+    lookups = stats['hits'] + stats['misses']
+    stats.update({
+        'pid': os.getpid(),
+        'enabled': FILE_CACHE_ENABLED,
+        'hit_rate': round(stats['hits'] / lookups, 3) if lookups else 0.0,
+        'files': len(entries),
+        'bytes': sum(size for _, size, _ in entries),
+        'max_bytes': FILE_CACHE_MAX_BYTES,
+    })
+    return stats
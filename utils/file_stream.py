@@ -0,0 +1,69 @@
+"""
+첨부파일 스트리밍 업로드/다운로드 (SFTP 저장소)
+- 업로드: FileStorage 스트림을 그대로 sftp_upload_file에 전달
+  (werkzeug가 큰 업로드는 임시파일로 받아 둠 → 워커 메모리에 파일 전체를 올리지 않음, 크기는 seek/tell로 확인)
+- 다운로드: SFTP → 로컬 디스크 캐시(utils/file_cache, 비활성 시 임시파일) → send_file(conditional=True)
+  → 본문은 파일에서 청크 단위로 전송, Range 요청 시 206 Partial Content (이어받기/미리보기 탐색)
+  캐시 비활성 시 임시파일은 응답이 끝나면 삭제
+- 저장 경로에 업로드 시각이 들어가므로 같은 경로의 파일은 바뀌지 않음 → ETag는 원격 경로 기준
+"""
+
+import os
+import hashlib
+import tempfile
+
+from flask import send_file
+
+from utils.file_cache import FILE_CACHE_ENABLED, get_cached_file
+
+_TMP_PREFIX = 'schoolus_dl_'
+
+
+def stream_size(file_storage):
+    """업로드 파일 크기 (본문을 읽지 않고 스트림 끝으로 이동해 측정, 위치는 처음으로 되돌림)"""
+    stream = file_storage.stream
+    stream.seek(0, os.SEEK_END)
+    size = stream.tell()
+    stream.seek(0)
+    return size
+
+
+def sftp_upload_stream(file_storage, remote_path):
+    """업로드 스트림을 그대로 SFTP 저장 (청크 단위 전송)"""
+    from routes.subject_utils import sftp_upload_file
+    file_storage.stream.seek(0)
+    return sftp_upload_file(file_storage.stream, remote_path)
+
+
+def sftp_send_file(remote_path, download_name, mimetype=None, as_attachment=True):
+    """
+    SFTP 파일을 Range 지원 스트리밍 응답으로 반환 (디스크 캐시 사용 시 캐시 파일에서 바로 전송).
+    파일을 가져오지 못하면 None (caller가 오류 JSON 응답)
+    """
+    etag = hashlib.sha1(remote_path.encode('utf-8')).hexdigest()
+    if FILE_CACHE_ENABLED:
+        cached_path = get_cached_file(remote_path)
+        if not cached_path:
+            return None
+        return send_file(cached_path, mimetype=mimetype or None, as_attachment=as_attachment,
+                         download_name=download_name, conditional=True, etag=etag)
+
+    from routes.subject_utils import sftp_download_file
+    fd, local_path = tempfile.mkstemp(prefix=_TMP_PREFIX)
+    os.close(fd)
+    try:
+        sftp_download_file(remote_path, local_path)
+        if os.path.getsize(local_path) == 0:
+            os.remove(local_path)
+            return None
+    except Exception as e:
+        print(f"[FileStream] SFTP 다운로드 오류 ({remote_path}): {e}")
+        if os.path.exists(local_path):
+            os.remove(local_path)
+        return None
+
+    response = send_file(
+        local_path, mimetype=mimetype or None, as_attachment=as_attachment,
+        download_name=download_name, conditional=True, etag=etag)
+    response.call_on_close(lambda: os.path.exists(local_path) and os.remove(local_path))
+    return response
@@ -0,0 +1,72 @@
+"""
+n-gram FULLTEXT 검색 (메시지/공지/가정통신문 공용)
+- MySQL 8 ngram 파서 인덱스(migrations v10) 사용 → 한국어도 띄어쓰기와 무관하게 부분 일치
+  (LIKE '%x%' 전체 스캔 대신 인덱스 조회, 이력이 쌓여도 검색 비용이 결과 수에 비례)
+- 검색어는 BOOLEAN MODE로 변환: 단어마다 +"단어" (모든 단어 포함, 단어 내부는 연속 일치)
+- ngram_token_size(기본 2)보다 짧은 단어가 있으면 인덱스로 찾을 수 없으므로 LIKE로 대체
+- 정렬: 'relevance'(관련도, 같으면 최신순) / 'recent'(최신순)
+"""
+
+import re
+
+NGRAM_TOKEN_SIZE = 2          # 서버 ngram_token_size 와 맞출 것
+MAX_TERMS = 8
+
+_OPERATOR_CHARS = re.compile(r'[+\-<>()~*"@]')
+
+SORT_RELEVANCE = 'relevance'
+SORT_RECENT = 'recent'
+
+
+def split_terms(keyword):
+    """검색어 → 단어 목록 (BOOLEAN MODE 연산자 문자 제거, 최대 MAX_TERMS개)"""
+    cleaned = _OPERATOR_CHARS.sub(' ', keyword or '')
+    return [t for t in cleaned.split() if t][:MAX_TERMS]
+
+
+def boolean_query(terms):
+    """단어 목록 → AGAINST(... IN BOOLEAN MODE) 검색식. 인덱스로 찾을 수 없으면 None"""
+    if not terms or any(len(t) < NGRAM_TOKEN_SIZE for t in terms):
+        return None
+    return ' '.join(f'+"{t}"' for t in terms)
+
+
+def keyword_filter(columns, keyword):
+    """
+    WHERE 조건/관련도 식 생성 → (where_sql, where_params, score_sql, score_params)
+    columns는 FULLTEXT 인덱스 정의와 같은 컬럼 목록 (순서 포함)이어야 인덱스를 사용함.
+    검색어가 비어 있으면 (None, [], None, [])
+    """
+    terms = split_terms(keyword)
+    if not terms:
+        return None, [], None, []
+    col_sql = ', '.join(columns)
+    query = boolean_query(terms)
+    if query:
+        match_sql = f"MATCH({col_sql}) AGAINST (%s IN BOOLEAN MODE)"
+        return match_sql, [query], match_sql, [query]
+
+    # 한 글자 검색어 등: LIKE 대체 (단어마다 컬럼 중 하나라도 포함)
+    clauses = []
+    params = []
+    for t in terms:
+        clauses.append('(' + ' OR '.join(f"{c} LIKE %s" for c in columns) + ')')
+        params += [f'%{t}%'] * len(columns)
+    return '(' + ' AND '.join(clauses) + ')', params, '0', []
+
+
+def normalize_sort(value):
+    return SORT_RECENT if value == SORT_RECENT else SORT_RELEVANCE
+
+
+def page_args(args, default_limit=20, max_limit=50):
+    """요청 인자 → (limit, offset)"""
+    try:
+        limit = max(1, min(max_limit, int(args.get('limit', default_limit))))
+    except (TypeError, ValueError):
+        limit = default_limit
+    try:
+        offset = max(0, int(args.get('offset', 0)))
+    except (TypeError, ValueError):
+        offset = 0
+    return limit, offset
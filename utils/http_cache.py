@@ -0,0 +1,47 @@
+"""
+HTTP 조건부 응답 헬퍼
+- JSON 응답 본문으로 강한 ETag 생성, If-None-Match 일치 시 304 Not Modified (본문 전송 생략)
+- Cache-Control 기본값 'private, no-cache': 브라우저가 보관하되 매번 ETag로 재검증
+- gzip_response: 큰 JSON 응답을 앱에서 직접 gzip 압축
+"""
+
+import gzip
+import hashlib
+from functools import wraps
+
+from flask import jsonify, request, make_response
+
+
+def etag_json(payload, cache_control='private, no-cache'):
+    """payload를 JSON 응답으로 만들고 ETag/304 처리까지 적용"""
+    response = jsonify(payload)
+    response.set_etag(hashlib.sha1(response.get_data()).hexdigest())
+    response.headers['Cache-Control'] = cache_control
+    return response.make_conditional(request)
+
+
+def gzip_response(min_size=1024):
+    """
+    JSON 응답 gzip 압축 데코레이터 (클라이언트가 gzip을 받을 수 있을 때만).
+    압축 시 ETag는 약한 ETag로 바꿈 (본문 인코딩이 달라지므로 — nginx gzip과 같은 방식)
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated(*args, **kwargs):
+            response = make_response(f(*args, **kwargs))
+            response.vary.add('Accept-Encoding')
+            if (response.status_code != 200 or response.direct_passthrough
+                    or 'Content-Encoding' in response.headers
+                    or 'gzip' not in request.headers.get('Accept-Encoding', '').lower()):
+                return response
+            body = response.get_data()
+            if len(body) < min_size:
+                return response
+            response.set_data(gzip.compress(body, compresslevel=6))
+            response.headers['Content-Encoding'] = 'gzip'
+            etag, weak = response.get_etag()
+            if etag and not weak:
+                response.set_etag(etag, weak=True)
+            return response
+        return decorated
+    return decorator
@@ -0,0 +1,175 @@
+"""
+오래된 메시지 보관(archive) 작업 — 핫 테이블(messages)과 인덱스를 버퍼 풀 크기 안으로 유지
+- 대상
+  1) 작성 후 ARCHIVE_AFTER_DAYS일이 지난 메시지 (id 순으로 앞쪽부터)
+  2) 비활성 대화방(is_active=0) 또는 INACTIVE_ROOM_DAYS일 동안 새 메시지가 없는 방의 메시지
+- 배치 1건 = 트랜잭션 1건: messages_archive로 복사 → messages에서 삭제 → 방 archived_max_id 갱신
+  (중간에 끊겨도 복사만 되고 삭제되지 않은 행은 없음 — 다음 실행이 이어서 처리)
+- 비활성 방 순회 위치는 message_archive_state.room_cursor에 저장 → 재시작해도 이어서 진행
+  (방마다 선택 시점의 MAX(id)까지만 이동 — 작업 중 새 메시지가 올라오면 핫 테이블에 남음)
+- 보관된 메시지 삭제: message_history.locate_message로 들어 있는 테이블을 찾아 갱신
+- 속도 제한: 배치 사이 ARCHIVE_BATCH_PAUSE초 휴식, 1회 실행당 최대 ARCHIVE_MAX_BATCHES 배치
+- GET_LOCK으로 서버 전체에서 동시에 1개만 실행
+- 보관분 읽기: utils/message_history (이력 페이지 폴백, find_message)
+
+주기 실행 (cron 예: 매일 새벽 3시)
+- python -m utils.message_archive [--max-batches N]
+"""
+
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+from utils.db import get_db_connection
+from utils.message_history import HOT_TABLE, ARCHIVE_TABLE
+
+ARCHIVE_AFTER_DAYS = int(os.environ.get('SCHOOLUS_ARCHIVE_AFTER_DAYS', '365'))
+INACTIVE_ROOM_DAYS = int(os.environ.get('SCHOOLUS_ARCHIVE_INACTIVE_ROOM_DAYS', '90'))
+ARCHIVE_BATCH_SIZE = int(os.environ.get('SCHOOLUS_ARCHIVE_BATCH', '1000'))
+ARCHIVE_BATCH_PAUSE = float(os.environ.get('SCHOOLUS_ARCHIVE_PAUSE', '0.2'))
+ARCHIVE_MAX_BATCHES = int(os.environ.get('SCHOOLUS_ARCHIVE_MAX_BATCHES', '200'))
+
+_LOCK_NAME = 'schoolus_message_archive'
+_ROOM_SCAN_SIZE = 100
+
+
+# ============================================
+# 배치 이동
+# ============================================
+def _move_batch(conn, cursor, rows):
+    """(id, room_id) 행 목록을 보관 테이블로 이동 — 한 트랜잭션"""
+    ids = [r['id'] for r in rows]
+    placeholders = ','.join(['%s'] * len(ids))
+    cursor.execute(f"INSERT IGNORE INTO {ARCHIVE_TABLE} SELECT * FROM {HOT_TABLE} WHERE id IN ({placeholders})", ids)
+    cursor.execute(f"DELETE FROM {HOT_TABLE} WHERE id IN ({placeholders})", ids)
+    moved = cursor.rowcount
+
+    room_max = {}
+    for r in rows:
+        room_max[r['room_id']] = max(room_max.get(r['room_id'], 0), r['id'])
+    for room_id, max_id in room_max.items():
+        cursor.execute("""
+            UPDATE message_rooms SET archived_max_id = GREATEST(COALESCE(archived_max_id, 0), %s)
+            WHERE id = %s
+        """, (max_id, room_id))
+    cursor.execute("""
+        UPDATE message_archive_state SET archived_total = archived_total + %s, last_run_at = NOW()
+        WHERE id = 1
+    """, (moved,))
+    conn.commit()
+    return moved
+
+
+def _archive_by_age(conn, cursor, budget):
+    """작성 기준일 지난 메시지 이동 → (이동 행 수, 사용 배치 수)"""
+    cutoff = datetime.now() - timedelta(days=ARCHIVE_AFTER_DAYS)
+    # id와 작성 시각은 같은 순서 → 기준일 이후 첫 id를 경계로 PK 범위 스캔
+    cursor.execute(f"SELECT id FROM {HOT_TABLE} WHERE created_at >= %s ORDER BY id LIMIT 1", (cutoff,))
+    row = cursor.fetchone()
+    boundary_sql, boundary_params = ('WHERE id < %s', [row['id']]) if row else ('', [])
+
+    moved = batches = 0
+    while batches < budget:
+        cursor.execute(f"""
+            SELECT id, room_id FROM {HOT_TABLE} {boundary_sql}
+            ORDER BY id LIMIT %s
+        """, boundary_params + [ARCHIVE_BATCH_SIZE])
+        rows = cursor.fetchall()
+        if not rows:
+            break
+        moved += _move_batch(conn, cursor, rows)
+        batches += 1
+        time.sleep(ARCHIVE_BATCH_PAUSE)
+    return moved, batches
+
+
+def _archive_inactive_rooms(conn, cursor, budget):
+    """비활성/장기 무활동 방의 메시지 이동 (방 순회 위치 저장) → (이동 행 수, 사용 배치 수)"""
+    cutoff = datetime.now() - timedelta(days=INACTIVE_ROOM_DAYS)
+    cursor.execute("SELECT room_cursor FROM message_archive_state WHERE id = 1")
+    state = cursor.fetchone()
+    room_cursor = state['room_cursor'] if state else 0
+
+    moved = batches = 0
+    while batches < budget:
+        cursor.execute("""
+            SELECT id FROM message_rooms
+            WHERE id > %s AND (is_active = 0 OR COALESCE(last_message_at, created_at) < %s)
+            ORDER BY id LIMIT %s
+        """, (room_cursor, cutoff, _ROOM_SCAN_SIZE))
+        rooms = [r['id'] for r in cursor.fetchall()]
+        if not rooms:
+            room_cursor = 0  # 한 바퀴 완료 → 다음 실행은 처음부터
+            break
+        for room_id in rooms:
+            # 선택 시점의 마지막 id까지만 이동 — 보관 중 새로 올라온 메시지는 핫 테이블에 남김
+            cursor.execute(f"SELECT MAX(id) AS max_id FROM {HOT_TABLE} WHERE room_id = %s", (room_id,))
+            row = cursor.fetchone()
+            max_id = row['max_id'] if row else None
+            while max_id is not None and batches < budget:
+                cursor.execute(f"""
+                    SELECT id, room_id FROM {HOT_TABLE}
+                    WHERE room_id = %s AND id <= %s ORDER BY id LIMIT %s
+                """, (room_id, max_id, ARCHIVE_BATCH_SIZE))
+                rows = cursor.fetchall()
+                if not rows:
+                    break
+                moved += _move_batch(conn, cursor, rows)
+                batches += 1
+                time.sleep(ARCHIVE_BATCH_PAUSE)
+            if batches >= budget:
+                break  # 이 방은 다음 실행에서 이어서
+            room_cursor = room_id
+
+    cursor.execute("UPDATE message_archive_state SET room_cursor = %s WHERE id = 1", (room_cursor,))
+    conn.commit()
+    return moved, batches
+
+
+# ============================================
+# 실행
+# ============================================
+def run_archive(max_batches=None):
+    """보관 작업 1회 실행. {'by_age', 'inactive_rooms', 'batches'} 반환 (잠금 실패/오류 시 None)"""
+    budget = ARCHIVE_MAX_BATCHES if max_batches is None else max_batches
+    conn = get_db_connection()
+    if not conn:
+        print("[Archive] DB 연결 실패")
+        return None
+    cursor = None
+    locked = False
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT GET_LOCK(%s, 0) AS locked", (_LOCK_NAME,))
+        row = cursor.fetchone()
+        locked = bool(row and row['locked'])
+        if not locked:
+            print("[Archive] 다른 프로세스가 실행 중 — 건너뜀")
+            return None
+
+        by_age, used = _archive_by_age(conn, cursor, budget)
+        by_room, used_rooms = _archive_inactive_rooms(conn, cursor, budget - used)
+        result = {'by_age': by_age, 'inactive_rooms': by_room, 'batches': used + used_rooms}
+        print(f"[Archive] 완료: {result}")
+        return result
+    except Exception as e:
+        print(f"[Archive] 오류: {e}")
+        conn.rollback()
+        return None
+    finally:
+        if cursor:
+            if locked:
+                try:
+                    cursor.execute("SELECT RELEASE_LOCK(%s)", (_LOCK_NAME,))
+                except Exception:
+                    pass
+            cursor.close()
+        conn.close()
+
+
+if __name__ == '__main__':
+    max_batches = None
+    if '--max-batches' in sys.argv:
+        max_batches = int(sys.argv[sys.argv.index('--max-batches') + 1])
+    sys.exit(0 if run_archive(max_batches) is not None else 1)
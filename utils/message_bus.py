@@ -0,0 +1,226 @@
+"""
+메시지 실시간 이벤트 버스 (발행/구독)
+- 채널: 'room:{room_id}' (새 메시지), 'member:{member_id}' (내 안 읽은 수 증감/대화방 목록 변경)
+- 구독자(SSE 연결)는 워커 메모리의 큐에서 이벤트를 기다림 → 대기 중에는 DB/CPU 사용 없음
+- 백엔드
+  - LocalBus: 같은 워커 안에서만 전달 (개발/단일 워커용, Redis 없을 때 기본값)
+  - RedisBus: SCHOOLUS_REDIS_URL 설정 시. 발행은 Redis PUBLISH, 워커마다 리스너 스레드 1개가
+    모든 채널을 받아 로컬 구독자에게 전달 → 워커 간 전달
+- set_bus(...)로 다른 백엔드로 교체 가능 (테스트/다른 브로커)
+"""
+
+import os
+import json
+import queue
+import threading
+import time
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+REDIS_URL = os.environ.get('SCHOOLUS_REDIS_URL', '')
+
+_CHANNEL_PREFIX = 'schoolus:bus:'
+_QUEUE_SIZE = 200          # 구독자별 대기 이벤트 상한 (느린 연결이 워커 메모리를 잡아먹지 않도록)
+
+
+class Subscription:
+    """구독 1건 (SSE 연결 1개). get()으로 이벤트 대기, close()로 해제"""
+
+    def __init__(self, bus, channels):
+        self.bus = bus
+        self.channels = set(channels)
+        self.queue = queue.Queue(maxsize=_QUEUE_SIZE)
+        self.overflowed = False
+
+    def deliver(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except queue.Full:
+            self.overflowed = True  # 클라이언트가 재접속 후 DB에서 다시 받도록 표시
+
+    def get(self, timeout):
+        """이벤트 1건 (timeout초 동안 없으면 None)"""
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def add(self, channels):
+        self.bus.extend(self, channels)
+
+    def close(self):
+        self.bus.unsubscribe(self)
+
+
+class LocalBus:
+    """워커 내부 전달 전용 버스"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subs = {}  # channel -> set(Subscription)
+
+    def subscribe(self, channels):
+        sub = Subscription(self, channels)
+        with self._lock:
+            for ch in sub.channels:
+                self._subs.setdefault(ch, set()).add(sub)
+        return sub
+
+    def extend(self, sub, channels):
+        """구독 중인 연결에 채널 추가 (이미 받고 있던 이벤트는 그대로 유지)"""
+        with self._lock:
+            for ch in set(channels) - sub.channels:
+                sub.channels.add(ch)
+                self._subs.setdefault(ch, set()).add(sub)
+
+    def unsubscribe(self, sub):
+        with self._lock:
+            for ch in sub.channels:
+                subs = self._subs.get(ch)
+                if subs:
+                    subs.discard(sub)
+                    if not subs:
+                        del self._subs[ch]
+
+    def publish(self, channel, event):
+        self._deliver(channel, event)
+
+    def publish_many(self, channels, event):
+        for ch in channels:
+            self._deliver(ch, event)
+
+    def _deliver(self, channel, event):
+        with self._lock:
+            subs = list(self._subs.get(channel, ()))
+        for sub in subs:
+            sub.deliver(event)
+
+    def subscriber_count(self):
+        with self._lock:
+            return len({s for subs in self._subs.values() for s in subs})
+
+
+class RedisBus(LocalBus):
+    """Redis PUBLISH/PSUBSCRIBE로 워커 간 전달"""
+
+    def __init__(self, url):
+        super().__init__()
+        self._client = redis.Redis.from_url(url, socket_timeout=2)  # 발행 전용 (짧은 타임아웃)
+        # 리스너 전용: 대기 중 읽기 타임아웃 없음 (유휴 상태를 끊김으로 보고 재구독하다 이벤트를 놓치지 않도록)
+        # 죽은 연결은 keepalive + health check로 감지
+        self._listen_client = redis.Redis.from_url(url, socket_timeout=None, socket_keepalive=True,
+                                                   health_check_interval=30)
+        self._listener = None
+
+    def subscribe(self, channels):
+        self._ensure_listener()
+        return super().subscribe(channels)
+
+    def publish(self, channel, event):
+        try:
+            self._client.publish(_CHANNEL_PREFIX + channel, json.dumps(event, ensure_ascii=False, default=str))
+        except Exception as e:
+            print(f"[MessageBus] Redis 발행 실패, 이 워커에만 전달: {e}")
+            self._deliver(channel, event)
+
+    def publish_many(self, channels, event):
+        """여러 채널에 같은 이벤트 (파이프라인 왕복 1회)"""
+        payload = json.dumps(event, ensure_ascii=False, default=str)
+        try:
+            pipe = self._client.pipeline(transaction=False)
+            for ch in channels:
+                pipe.publish(_CHANNEL_PREFIX + ch, payload)
+            pipe.execute()
+        except Exception as e:
+            print(f"[MessageBus] Redis 발행 실패, 이 워커에만 전달: {e}")
+            super().publish_many(channels, event)
+
+    def _ensure_listener(self):
+        with self._lock:
+            if self._listener and self._listener.is_alive():
+                return
+            self._listener = threading.Thread(target=self._listen, daemon=True)
+            self._listener.start()
+
+    def _listen(self):
+        while True:
+            pubsub = None
+            try:
+                pubsub = self._listen_client.pubsub(ignore_subscribe_messages=True)
+                pubsub.psubscribe(_CHANNEL_PREFIX + '*')
+                for msg in pubsub.listen():
+                    if msg.get('type') != 'pmessage':
+                        continue
+                    channel = msg['channel']
+                    if isinstance(channel, bytes):
+                        channel = channel.decode('utf-8')
+                    self._deliver(channel[len(_CHANNEL_PREFIX):], json.loads(msg['data']))
+            except Exception as e:
+                print(f"[MessageBus] Redis 구독 끊김, 재연결: {e}")
+                time.sleep(1)
+            finally:
+                if pubsub:
+                    try:
+                        pubsub.close()
+                    except Exception:
+                        pass
+
+
+_bus = None
+_bus_lock = threading.Lock()
+
+
+def get_bus():
+    global _bus
+    if _bus is None:
+        with _bus_lock:
+            if _bus is None:
+                if REDIS_URL and redis is not None:
+                    try:
+                        _bus = RedisBus(REDIS_URL)
+                    except Exception as e:
+                        print(f"[MessageBus] Redis 연결 실패, 로컬 버스 사용: {e}")
+                if _bus is None:
+                    _bus = LocalBus()
+    return _bus
+
+
+def set_bus(bus):
+    """백엔드 교체 (기존 구독은 유지되지 않음)"""
+    global _bus
+    with _bus_lock:
+        _bus = bus
+
+
+def publish(channel, event_type, data):
+    """이벤트 발행. 실패해도 호출한 요청(메시지 전송 등)은 영향 없음"""
+    try:
+        get_bus().publish(channel, {'type': event_type, 'data': data})
+    except Exception as e:
+        print(f"[MessageBus] 발행 오류 ({channel}): {e}")
+
+
+def publish_many(channels, event_type, data):
+    """여러 채널(예: 수신자별 member 채널)에 같은 이벤트 발행"""
+    channels = list(channels)
+    if not channels:
+        return
+    try:
+        get_bus().publish_many(channels, {'type': event_type, 'data': data})
+    except Exception as e:
+        print(f"[MessageBus] 발행 오류 ({len(channels)}개 채널): {e}")
+
+
+def subscribe(channels):
+    return get_bus().subscribe(channels)
+
+
+def room_channel(room_id):
+    return f'room:{room_id}'
+
+
+def member_channel(member_id):
+    return f'member:{member_id}'
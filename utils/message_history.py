@@ -0,0 +1,148 @@
+"""
+메시지 이력 키셋 페이지네이션 (message.py / messenger.py 공용)
+- 정렬/페이지 기준은 (room_id, id) 하나로 통일 — created_at 정렬, OFFSET 사용 안 함
+  → 오래된 대화를 깊이 스크롤해도 인덱스 범위 스캔 + LIMIT 만큼만 읽음 (첫 페이지와 비용 동일)
+  인덱스는 기존 idx_msg_room_id (room_id, is_deleted, id) + PK — 별도 (room_id, id) 인덱스 없음
+- 응답 커서: {'older', 'newer', 'has_older', 'has_newer'}
+  older/newer는 불투명 토큰 — 다음 요청에 cursor=<토큰>&direction=older|newer 로 그대로 전달
+- 기존 파라미터 before_id / after_id 도 같은 경로로 처리
+- 보관(archive) 폴백: 오래된 메시지는 utils/message_archive 작업이 messages_archive로 옮김
+  → 핫 테이블에서 페이지가 모자라고 방에 보관분(message_rooms.archived_max_id)이 있으면 보관 테이블에서 이어 읽음
+  (한 방 안에서 보관분 id는 항상 핫 테이블 id보다 작음)
+"""
+
+import base64
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 100
+
+HOT_TABLE = 'messages'
+ARCHIVE_TABLE = 'messages_archive'
+
+
+def encode_cursor(room_id, msg_id):
+    raw = f"{room_id}:{msg_id}".encode('ascii')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token, room_id):
+    """토큰 → 메시지 id (다른 방 토큰이거나 형식 오류면 None)"""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        token_room, msg_id = base64.urlsafe_b64decode(padded).decode('ascii').split(':', 1)
+        if str(token_room) != str(room_id):
+            return None
+        return int(msg_id)
+    except Exception:
+        return None
+
+
+def resolve_page_args(args, room_id):
+    """요청 인자 → (before_id, after_id). cursor/direction 우선, 없으면 before_id/after_id"""
+    token = args.get('cursor')
+    if token:
+        msg_id = decode_cursor(token, room_id)
+        if msg_id is not None:
+            if args.get('direction') == 'newer':
+                return None, msg_id
+            return msg_id, None
+    before_id = args.get('before_id')
+    after_id = args.get('after_id')
+    return (int(before_id) if before_id else None,
+            int(after_id) if after_id else None)
+
+
+def _archived_max_id(cursor, room_id):
+    cursor.execute("SELECT archived_max_id FROM message_rooms WHERE id = %s", (room_id,))
+    row = cursor.fetchone()
+    return row['archived_max_id'] if row else None
+
+
+def _fetch(cursor, table, select_cols, room_id, deleted_sql, op, bound, order, n):
+    bound_sql = f' AND id {op} %s' if bound is not None else ''
+    params = [room_id] + ([bound] if bound is not None else []) + [n]
+    cursor.execute(f"""
+        SELECT {select_cols} FROM {table}
+        WHERE room_id = %s{bound_sql}{deleted_sql}
+        ORDER BY id {order}
+        LIMIT %s
+    """, params)
+    return list(cursor.fetchall())
+
+
+def _has_before(cursor, room_id, bound, deleted_sql, include_archive):
+    """room_id 방에 id < bound 인 메시지가 있는지 (핫 → 보관 순, 인덱스 1건 조회)"""
+    tables = (HOT_TABLE, ARCHIVE_TABLE) if include_archive else (HOT_TABLE,)
+    for table in tables:
+        if table == ARCHIVE_TABLE and not _archived_max_id(cursor, room_id):
+            break
+        cursor.execute(f"SELECT 1 AS found FROM {table} WHERE room_id = %s AND id < %s{deleted_sql} LIMIT 1",
+                       (room_id, bound))
+        if cursor.fetchone():
+            return True
+    return False
+
+
+def load_page(cursor, room_id, columns, before_id=None, after_id=None,
+              limit=DEFAULT_PAGE_SIZE, include_deleted=True, include_archive=True):
+    """
+    한 페이지 조회 → (행 목록(오래된 순), 커서 dict)
+    - before_id: 이 id보다 이전 메시지 (위로 스크롤)
+    - after_id: 이 id 이후 메시지 (새 메시지/아래로 스크롤)
+    - 둘 다 없으면 최신 페이지
+    - include_archive=False: 핫 테이블만 (폴링/스트림처럼 새 메시지만 보는 경로)
+    """
+    limit = max(1, min(MAX_PAGE_SIZE, int(limit)))
+    select_cols = ', '.join(columns if 'id' in columns else ['id'] + list(columns))
+    deleted_sql = '' if include_deleted else ' AND is_deleted = 0'
+    want = limit + 1
+
+    if after_id is not None:
+        rows = []
+        if include_archive:
+            archived_max = _archived_max_id(cursor, room_id)
+            if archived_max and after_id < archived_max:
+                rows = _fetch(cursor, ARCHIVE_TABLE, select_cols, room_id, deleted_sql,
+                              '>', after_id, 'ASC', want)
+        if len(rows) < want:
+            rows += _fetch(cursor, HOT_TABLE, select_cols, room_id, deleted_sql,
+                           '>', rows[-1]['id'] if rows else after_id, 'ASC', want - len(rows))
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        has_older = _has_before(cursor, room_id, rows[0]['id'] if rows else after_id + 1,
+                                deleted_sql, include_archive)
+        has_newer = has_more
+    else:
+        rows = _fetch(cursor, HOT_TABLE, select_cols, room_id, deleted_sql,
+                      '<', before_id, 'DESC', want)
+        if len(rows) < want and include_archive and _archived_max_id(cursor, room_id):
+            rows += _fetch(cursor, ARCHIVE_TABLE, select_cols, room_id, deleted_sql,
+                           '<', rows[-1]['id'] if rows else before_id, 'DESC', want - len(rows))
+        has_more = len(rows) > limit
+        rows = list(reversed(rows[:limit]))
+        has_older, has_newer = has_more, before_id is not None
+
+    page_cursor = {
+        'older': encode_cursor(room_id, rows[0]['id']) if rows else None,
+        'newer': encode_cursor(room_id, rows[-1]['id']) if rows else (
+            encode_cursor(room_id, after_id) if after_id is not None else None),
+        'has_older': has_older,
+        'has_newer': has_newer,
+    }
+    return rows, page_cursor
+
+
+def locate_message(cursor, message_id, columns):
+    """메시지 1건과 들어 있는 테이블 → (테이블명, 행). 없으면 (None, None) — 수정/삭제용"""
+    select_cols = ', '.join(columns)
+    for table in (HOT_TABLE, ARCHIVE_TABLE):
+        cursor.execute(f"SELECT {select_cols} FROM {table} WHERE id = %s", (message_id,))
+        row = cursor.fetchone()
+        if row:
+            return table, row
+    return None, None
+
+
+def find_message(cursor, message_id, columns):
+    """메시지 1건 (핫 테이블에 없으면 보관 테이블). 없으면 None"""
+    return locate_message(cursor, message_id, columns)[1]
@@ -0,0 +1,462 @@
+"""
+SchoolUs DB 마이그레이션 (버전 관리)
+- schema_migrations 테이블에 적용된 버전 기록, 미적용 버전만 순서대로 실행
+- GET_LOCK으로 직렬화 → Gunicorn 워커가 동시에 기동해도 한 번만 실행
+  (다른 워커가 긴 ALTER를 실행 중이면 끝날 때까지 대기 후 남은 버전만 확인, 최대 SCHOOLUS_MIGRATION_LOCK_WAIT초)
+- 이미 존재하는 컬럼/인덱스(1060/1061) 오류는 적용된 것으로 간주 (수동 적용 서버 대응)
+- EXPLAIN 점검: 핫 쿼리가 의도한 인덱스를 실제로 사용하는지 확인
+
+실행
+- 앱 기동 시 자동 (SCHOOLUS_AUTO_MIGRATE=false 로 비활성화)
+- 수동: python -m utils.migrations [--explain]
+- 기동 확인: require_migrations() — 미적용 버전이 있으면 RuntimeError (라우트 쿼리가 생성 컬럼/테이블에
+  의존하므로 "unknown column" 오류로 요청마다 실패하는 대신 기동 단계에서 중단).
+  긴급 우회: SCHOOLUS_REQUIRE_MIGRATIONS=false
+"""
+
+import os
+import sys
+
+from utils.db import get_db_connection
+
+AUTO_MIGRATE_ENABLED = os.environ.get('SCHOOLUS_AUTO_MIGRATE', 'true').lower() != 'false'
+REQUIRE_MIGRATIONS = os.environ.get('SCHOOLUS_REQUIRE_MIGRATIONS', 'true').lower() != 'false'
+
+_LOCK_NAME = 'schoolus_schema_migrations'
+_LOCK_TIMEOUT = 60                  # GET_LOCK 1회 대기(초) — 넘으면 진행 로그 후 다시 대기
+_LOCK_MAX_WAIT = int(os.environ.get('SCHOOLUS_MIGRATION_LOCK_WAIT', '3600'))
+_ALREADY_APPLIED_ERRORS = (1060, 1061)   # Duplicate column name / Duplicate key name
+
+# 요일 정렬키: FIELD(day_of_week, ...)를 ORDER BY마다 계산하지 않도록 생성 컬럼으로 저장
+_DAY_SORT_EXPR = "FIELD(day_of_week,'월','화','수','목','금','토','일')"
+# 번호 정렬키: 숫자로만 된 번호는 그 값, 그 외('3a' 등)는 0
+# (기존 ORDER BY CAST는 '3a'→3이지만, 생성 컬럼의 CAST는 strict 모드에서 잘림 오류가 나므로 숫자만 변환.
+#  숫자가 아닌 번호는 맨 앞에 모이고 같은 값끼리는 class_num 문자열 순 — 조회 쿼리가 2차 정렬키로 사용)
+_CLASS_NUM_SORT_EXPR = "IF(class_num REGEXP '^[0-9]+$', CAST(class_num AS UNSIGNED), 0)"
+
+# ============================================
+# 마이그레이션 목록 (version, 설명, [SQL...]) — 추가만 하고 기존 항목은 수정 금지
+# ============================================
+MIGRATIONS = [
+    (1, '출결 월별 조회 커버링 인덱스', [
+        "CREATE INDEX idx_att_class_date ON attendance "
+        "(school_id, class_grade, class_no, attendance_date, status)",
+        "CREATE INDEX idx_att_student_date ON attendance "
+        "(school_id, student_id, attendance_date, status)",
+    ]),
+    (2, '일정 날짜/신규 알림 조회 인덱스', [
+        "CREATE INDEX idx_schedule_school_date ON schedule (school_id, schedule_date)",
+        "CREATE INDEX idx_schedule_ms_date ON schedule (member_school, schedule_date)",
+        "CREATE INDEX idx_schedule_school_created ON schedule (school_id, created_at)",
+        "CREATE INDEX idx_schedule_ms_created ON schedule (member_school, created_at)",
+    ]),
+    (3, '공지 최신순/신규 알림 조회 인덱스', [
+        "CREATE INDEX idx_notice_school_created ON notice (school_id, created_at)",
+        "CREATE INDEX idx_notice_ms_created ON notice (member_school, created_at)",
+    ]),
+    (4, '학생/학부모 번호 정렬키 + 학급 인덱스', [
+        f"ALTER TABLE stu_all ADD COLUMN class_num_sort INT UNSIGNED "
+        f"AS ({_CLASS_NUM_SORT_EXPR}) STORED",
+        "CREATE INDEX idx_stu_class_num ON stu_all "
+        "(school_id, class_grade, class_no, class_num_sort)",
+        f"ALTER TABLE fm_all ADD COLUMN class_num_sort INT UNSIGNED "
+        f"AS ({_CLASS_NUM_SORT_EXPR}) STORED",
+        "CREATE INDEX idx_fm_class_num ON fm_all "
+        "(school_id, class_grade, class_no, class_num_sort)",
+    ]),
+    (5, '시간표 요일 정렬키 + 학급/교사 인덱스', [
+        f"ALTER TABLE timetable ADD COLUMN day_sort TINYINT UNSIGNED "
+        f"AS ({_DAY_SORT_EXPR}) STORED",
+        "CREATE INDEX idx_tt_class_day ON timetable "
+        "(school_id, grade, class_no, day_sort, period)",
+        "CREATE INDEX idx_tt_member_day ON timetable (school_id, member_id, day_sort, period)",
+        f"ALTER TABLE timetable_tea ADD COLUMN day_sort TINYINT UNSIGNED "
+        f"AS ({_DAY_SORT_EXPR}) STORED",
+        "CREATE INDEX idx_tea_class_day ON timetable_tea "
+        "(school_id, grade, class_no, day_sort, period)",
+        "CREATE INDEX idx_tea_name_day ON timetable_tea "
+        "(school_id, member_name, day_sort, period)",
+    ]),
+    (6, '공개 통계 집계 테이블 (홈페이지 카운터)', [
+        """CREATE TABLE IF NOT EXISTS site_stats (
+            id TINYINT UNSIGNED PRIMARY KEY,
+            schools INT UNSIGNED NOT NULL DEFAULT 0,
+            teachers INT UNSIGNED NOT NULL DEFAULT 0,
+            students INT UNSIGNED NOT NULL DEFAULT 0,
+            parents INT UNSIGNED NOT NULL DEFAULT 0,
+            refreshed_at DATETIME NOT NULL
+        )""",
+        """INSERT IGNORE INTO site_stats (id, schools, teachers, students, parents, refreshed_at)
+            SELECT 1,
+                   (SELECT COUNT(DISTINCT school_id) FROM tea_all),
+                   (SELECT COUNT(*) FROM tea_all),
+                   (SELECT COUNT(*) FROM stu_all),
+                   (SELECT COUNT(*) FROM fm_all),
+                   NOW()""",
+    ]),
+    (7, '학생 개인 주간 시간표 물리화 테이블', [
+        """CREATE TABLE IF NOT EXISTS timetable_stu_week (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            school_id VARCHAR(50) NOT NULL,
+            grade VARCHAR(10) NOT NULL,
+            class_no VARCHAR(10) NOT NULL,
+            stu_id INT NULL,
+            member_id VARCHAR(50) NOT NULL DEFAULT '',
+            student_name VARCHAR(100),
+            timetable MEDIUMTEXT NOT NULL,
+            built_at DATETIME NOT NULL,
+            INDEX idx_stw_member (school_id, grade, class_no, member_id),
+            INDEX idx_stw_stu (school_id, stu_id)
+        )""",
+    ]),
+    (8, '대화방 마지막 메시지 요약 컬럼 (목록 조회용)', [
+        "ALTER TABLE message_rooms ADD COLUMN last_message_id BIGINT NULL",
+        "ALTER TABLE message_rooms ADD COLUMN last_message_preview VARCHAR(200) NULL",
+        "ALTER TABLE message_rooms ADD COLUMN last_sender_name VARCHAR(100) NULL",
+        "ALTER TABLE message_rooms ADD COLUMN last_message_at DATETIME NULL",
+        "CREATE INDEX idx_msg_room_id ON messages (room_id, is_deleted, id)",
+        """UPDATE message_rooms r
+            JOIN (SELECT room_id, MAX(id) AS max_id FROM messages
+                  WHERE is_deleted = 0 GROUP BY room_id) x ON x.room_id = r.id
+            JOIN messages m ON m.id = x.max_id
+            SET r.last_message_id = m.id,
+                r.last_message_preview = LEFT(IF(m.content = '' AND m.file_name IS NOT NULL,
+                                                 CONCAT('[파일] ', m.file_name), m.content), 200),
+                r.last_sender_name = m.sender_name,
+                r.last_message_at = m.created_at""",
+    ]),
+    (9, '대화방 멤버별 안 읽은 메시지 카운터', [
+        "ALTER TABLE message_room_members ADD COLUMN unread_count INT UNSIGNED NOT NULL DEFAULT 0",
+        "CREATE INDEX idx_mrm_member_unread ON message_room_members (member_id, is_active, unread_count)",
+        """UPDATE message_room_members rm
+            JOIN message_rooms r ON r.id = rm.room_id
+            SET rm.unread_count = (
+                SELECT COUNT(*) FROM messages m
+                WHERE m.room_id = rm.room_id AND m.is_deleted = 0
+                  AND m.sender_id != rm.member_id
+                  AND m.created_at > COALESCE(rm.last_read_at, rm.joined_at, r.created_at))
+            WHERE rm.is_active = 1""",
+    ]),
+    (10, '메시지/공지/가정통신문 ngram FULLTEXT 검색 인덱스', [
+        "ALTER TABLE messages ADD FULLTEXT INDEX ft_msg_content (content) WITH PARSER ngram",
+        "ALTER TABLE notice ADD FULLTEXT INDEX ft_notice_title_message (title, message) WITH PARSER ngram",
+        "ALTER TABLE home_letter ADD FULLTEXT INDEX ft_letter_title_content (title, content) WITH PARSER ngram",
+    ]),
+    (11, '오래된 메시지 보관 테이블 + 보관 작업 진행 상태', [
+        # 컬럼/인덱스(FULLTEXT 포함)까지 messages와 동일 — 이후 messages 컬럼 추가 시 여기에도 추가할 것
+        "CREATE TABLE IF NOT EXISTS messages_archive LIKE messages",
+        "ALTER TABLE message_rooms ADD COLUMN archived_max_id BIGINT NULL",
+        """CREATE TABLE IF NOT EXISTS message_archive_state (
+            id TINYINT UNSIGNED PRIMARY KEY,
+            room_cursor BIGINT NOT NULL DEFAULT 0,
+            archived_total BIGINT UNSIGNED NOT NULL DEFAULT 0,
+            last_run_at DATETIME NULL
+        )""",
+        "INSERT IGNORE INTO message_archive_state (id) VALUES (1)",
+    ]),
+    (12, '푸시 알림 발송함 (outbox)', [
+        """CREATE TABLE IF NOT EXISTS push_outbox (
+            id BIGINT AUTO_INCREMENT PRIMARY KEY,
+            audience_type VARCHAR(20) NOT NULL,
+            audience MEDIUMTEXT NOT NULL,
+            payload TEXT NOT NULL,
+            status VARCHAR(10) NOT NULL DEFAULT 'pending',
+            attempts TINYINT UNSIGNED NOT NULL DEFAULT 0,
+            next_attempt_at DATETIME NOT NULL,
+            claim_token VARCHAR(100) NULL,
+            created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            started_at DATETIME NULL,
+            finished_at DATETIME NULL,
+            sent INT UNSIGNED NOT NULL DEFAULT 0,
+            failed INT UNSIGNED NOT NULL DEFAULT 0,
+            expired INT UNSIGNED NOT NULL DEFAULT 0,
+            last_error VARCHAR(255) NULL,
+            INDEX idx_outbox_due (status, next_attempt_at),
+            INDEX idx_outbox_claim (claim_token),
+            INDEX idx_outbox_finished (finished_at)
+        )""",
+    ]),
+    (13, '푸시 발송함 묶음 발송 키', [
+        "ALTER TABLE push_outbox ADD COLUMN coalesce_key VARCHAR(100) NULL",
+        "ALTER TABLE push_outbox ADD COLUMN merged_count INT UNSIGNED NOT NULL DEFAULT 1",
+        "CREATE INDEX idx_outbox_coalesce ON push_outbox (coalesce_key, status)",
+    ]),
+    (14, '푸시 발송 대상 세그먼트 (구독 + 역할/학년/반/연결 학생)', [
+        # 행은 utils/push_audience가 채움 (학교별 첫 발송 시 자동 재구성)
+        """CREATE TABLE IF NOT EXISTS push_audience (
+            id BIGINT AUTO_INCREMENT PRIMARY KEY,
+            endpoint VARCHAR(500) NOT NULL,
+            p256dh VARCHAR(255) NOT NULL,
+            auth VARCHAR(100) NOT NULL,
+            school_id VARCHAR(50) NOT NULL,
+            user_role VARCHAR(20) NOT NULL,
+            member_id VARCHAR(50) NOT NULL,
+            class_grade VARCHAR(10) NULL,
+            class_no VARCHAR(10) NULL,
+            student_id VARCHAR(50) NOT NULL DEFAULT '',
+            INDEX idx_pa_class (school_id, class_grade, class_no, user_role),
+            INDEX idx_pa_student (school_id, student_id),
+            INDEX idx_pa_role (school_id, user_role),
+            INDEX idx_pa_endpoint (endpoint)
+        )""",
+        """CREATE TABLE IF NOT EXISTS push_audience_state (
+            school_id VARCHAR(50) PRIMARY KEY,
+            roster_version VARCHAR(100) NOT NULL,
+            row_count INT UNSIGNED NOT NULL DEFAULT 0,
+            rebuilt_at DATETIME NOT NULL
+        )""",
+    ]),
+    (15, '푸시 기기별 분당 발송 수 (Redis 미사용 시 워커 간 공유 집계)', [
+        """CREATE TABLE IF NOT EXISTS push_rate (
+            endpoint_hash CHAR(40) NOT NULL,
+            window_min INT UNSIGNED NOT NULL,
+            sent_count INT UNSIGNED NOT NULL DEFAULT 0,
+            PRIMARY KEY (endpoint_hash, window_min),
+            INDEX idx_push_rate_window (window_min)
+        )""",
+    ]),
+]
+
+
+# ============================================
+# 실행
+# ============================================
+def _ensure_table(cursor):
+    cursor.execute("""CREATE TABLE IF NOT EXISTS schema_migrations (
+        version INT PRIMARY KEY,
+        description VARCHAR(200),
+        applied_at DATETIME DEFAULT NOW()
+    )""")
+
+
+def _execute_idempotent(cursor, sql):
+    try:
+        cursor.execute(sql)
+    except Exception as e:
+        code = e.args[0] if e.args else None
+        if code in _ALREADY_APPLIED_ERRORS:
+            print(f"[Migration] 이미 존재 (건너뜀): {sql[:80]}")
+            return
+        raise
+
+
+def _acquire_lock(cursor):
+    """
+    마이그레이션 잠금 획득 (다른 워커/수동 실행이 잡고 있으면 풀릴 때까지 대기).
+    _LOCK_MAX_WAIT 안에 못 얻으면 False
+    """
+    waited = 0
+    while True:
+        cursor.execute("SELECT GET_LOCK(%s, %s) AS locked", (_LOCK_NAME, _LOCK_TIMEOUT))
+        row = cursor.fetchone()
+        if row and row['locked']:
+            return True
+        waited += _LOCK_TIMEOUT
+        if waited >= _LOCK_MAX_WAIT:
+            return False
+        print(f"[Migration] 다른 워커가 마이그레이션 실행 중 — 대기 {waited}초")
+
+
+def run_migrations():
+    """미적용 마이그레이션을 순서대로 실행. 적용된 버전 목록 반환"""
+    applied_now = []
+    conn = get_db_connection()
+    if not conn:
+        print("[Migration] DB 연결 실패 — 마이그레이션 건너뜀")
+        return applied_now
+    cursor = None
+    locked = False
+    try:
+        cursor = conn.cursor()
+        locked = _acquire_lock(cursor)
+        if not locked:
+            print(f"[Migration] 잠금 획득 실패 — {_LOCK_MAX_WAIT}초 동안 다른 실행이 끝나지 않음")
+            return applied_now
+
+        # 대기하는 동안 다른 워커가 적용했으면 아래에서 모두 건너뜀
+
+        _ensure_table(cursor)
+        cursor.execute("SELECT version FROM schema_migrations")
+        done = {r['version'] for r in cursor.fetchall()}
+
+        for version, description, statements in MIGRATIONS:
+            if version in done:
+                continue
+            print(f"[Migration] v{version} 적용: {description}")
+            for sql in statements:
+                _execute_idempotent(cursor, sql)
+            cursor.execute(
+                "INSERT INTO schema_migrations (version, description) VALUES (%s, %s)",
+                (version, description))
+            conn.commit()
+            applied_now.append(version)
+        return applied_now
+    except Exception as e:
+        print(f"[Migration] 오류: {e}")
+        conn.rollback()
+        return applied_now
+    finally:
+        if cursor:
+            if locked:
+                try:
+                    cursor.execute("SELECT RELEASE_LOCK(%s)", (_LOCK_NAME,))
+                except Exception:
+                    pass
+            cursor.close()
+        conn.close()
+
+
+def missing_migrations():
+    """미적용 버전 목록 (DB 연결 실패 시 None)"""
+    conn = get_db_connection()
+    if not conn:
+        return None
+    cursor = None
+    try:
+        cursor = conn.cursor()
+        _ensure_table(cursor)
+        cursor.execute("SELECT version FROM schema_migrations")
+        done = {r['version'] for r in cursor.fetchall()}
+        return [version for version, _, _ in MIGRATIONS if version not in done]
+    finally:
+        if cursor: cursor.close()
+        conn.close()
+
+
+def _wait_for_running_migration():
+    """다른 프로세스가 마이그레이션 잠금을 잡고 있으면 풀릴 때까지 대기 (AUTO_MIGRATE=false 워커용)"""
+    conn = get_db_connection()
+    if not conn:
+        return
+    cursor = None
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT IS_USED_LOCK(%s) AS holder", (_LOCK_NAME,))
+        row = cursor.fetchone()
+        if not (row and row['holder']):
+            return
+        if _acquire_lock(cursor):
+            cursor.execute("SELECT RELEASE_LOCK(%s)", (_LOCK_NAME,))
+    finally:
+        if cursor: cursor.close()
+        conn.close()
+
+
+def require_migrations():
+    """
+    기동 시 호출 — 미적용 마이그레이션이 있으면 RuntimeError (DB 연결 실패는 경고만)
+    다른 프로세스가 적용 중이면 끝날 때까지 기다린 뒤 다시 확인
+    """
+    if not REQUIRE_MIGRATIONS:
+        return
+    missing = missing_migrations()
+    if missing:
+        _wait_for_running_migration()
+        missing = missing_migrations()
+    if missing is None:
+        print("[Migration] DB 연결 실패 — 스키마 버전 확인 건너뜀")
+        return
+    if missing:
+        raise RuntimeError(
+            f"[Migration] 미적용 마이그레이션 {missing} — python -m utils.migrations 실행 후 재시작하세요")
+
+
+# ============================================
+# EXPLAIN 점검 (설명, SQL, 샘플 파라미터, 기대 인덱스)
+# ============================================
+EXPLAIN_CHECKS = [
+    ('출결 월간 요약 (반)',
+     """SELECT attendance_date, SUM(status = 'present') AS present_cnt, COUNT(*) AS total_cnt
+        FROM attendance
+        WHERE school_id = %s AND class_grade = %s AND class_no = %s
+          AND attendance_date >= %s AND attendance_date < %s
+        GROUP BY attendance_date""",
+     ('0', 1, 1, '2026-03-01', '2026-04-01'), 'idx_att_class_date'),
+    ('내 출결 월 요약',
+     """SELECT SUM(status = 'present') AS present_cnt, COUNT(*) AS total_cnt
+        FROM attendance
+        WHERE school_id = %s AND student_id = %s
+          AND attendance_date >= %s AND attendance_date < %s""",
+     ('0', 'x', '2026-03-01', '2026-04-01'), 'idx_att_student_date'),
+    ('월별 일정 목록',
+     """SELECT id FROM schedule
+        WHERE school_id = %s AND schedule_date >= %s AND schedule_date < %s
+        ORDER BY schedule_date""",
+     ('0', '2026-03-01', '2026-04-01'), 'idx_schedule_school_date'),
+    ('신규 일정 알림',
+     """SELECT id FROM schedule
+        WHERE school_id = %s AND created_at > %s
+          AND (FIND_IN_SET(%s, read_roll) > 0 OR read_roll = 'all')
+        ORDER BY created_at DESC LIMIT 10""",
+     ('0', '2026-03-01 00:00:00', 'student'), 'idx_schedule_school_created'),
+    ('신규 공지 알림',
+     """SELECT id FROM notice WHERE school_id = %s AND created_at > %s
+        ORDER BY created_at DESC LIMIT 10""",
+     ('0', '2026-03-01 00:00:00'), 'idx_notice_school_created'),
+    ('학급 학생 명단',
+     """SELECT member_id FROM stu_all
+        WHERE school_id = %s AND class_grade = %s AND class_no = %s
+        ORDER BY class_num_sort""",
+     ('0', '1', '1'), 'idx_stu_class_num'),
+    ('학급 주간 시간표',
+     """SELECT day_of_week, period, subject FROM timetable
+        WHERE school_id = %s AND grade = %s AND class_no = %s
+        ORDER BY day_sort, period""",
+     ('0', '1', '1'), 'idx_tt_class_day'),
+    ('메시지 이력 이전 페이지',
+     """SELECT id, sender_id, content, created_at FROM messages
+        WHERE room_id = %s AND id < %s
+        ORDER BY id DESC LIMIT 51""",
+     (0, 1000000), 'idx_msg_room_id'),
+    ('메시지 검색 (ngram)',
+     """SELECT id FROM messages
+        WHERE MATCH(content) AGAINST (%s IN BOOLEAN MODE) AND is_deleted = 0
+        ORDER BY id DESC LIMIT 21""",
+     ('+"공지"',), 'ft_msg_content'),
+    ('공지 검색 (ngram)',
+     """SELECT id FROM notice
+        WHERE school_id = %s AND MATCH(title, message) AGAINST (%s IN BOOLEAN MODE)
+        ORDER BY created_at DESC LIMIT 50""",
+     ('0', '+"행사"'), 'ft_notice_title_message'),
+    ('학급 푸시 대상',
+     """SELECT endpoint, p256dh, auth FROM push_audience
+        WHERE school_id = %s AND class_grade = %s AND class_no = %s
+          AND user_role IN ('student', 'parent', 'teacher')""",
+     ('0', '1', '1'), 'idx_pa_class'),
+    ('학생+학부모 푸시 대상',
+     """SELECT endpoint, p256dh, auth FROM push_audience
+        WHERE school_id = %s AND student_id = %s""",
+     ('0', 'x'), 'idx_pa_student'),
+]
+
+
+def verify_indexes():
+    """EXPLAIN으로 각 핫 쿼리의 사용 인덱스 확인. [{'name', 'expected', 'key', 'ok'}, ...]"""
+    results = []
+    conn = get_db_connection()
+    if not conn:
+        return results
+    try:
+        cursor = conn.cursor()
+        for name, sql, params, expected in EXPLAIN_CHECKS:
+            cursor.execute("EXPLAIN " + sql, params)
+            plan = cursor.fetchall()
+            keys = [p.get('key') for p in plan if p.get('key')]
+            results.append({'name': name, 'expected': expected,
+                            'key': ','.join(keys), 'ok': expected in keys})
+        cursor.close()
+    finally:
+        conn.close()
+    return results
+
+
+if __name__ == '__main__':
+    applied = run_migrations()
+    print(f"[Migration] 적용 완료: {applied or '없음'}")
+    if '--explain' in sys.argv:
+        failed = 0
+        for r in verify_indexes():
+            mark = 'OK ' if r['ok'] else 'NG '
+            print(f"{mark} {r['name']}: expected={r['expected']} used={r['key'] or '-'}")
+            failed += 0 if r['ok'] else 1
+        sys.exit(1 if failed else 0)
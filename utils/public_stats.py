@@ -0,0 +1,112 @@
+"""
+SchoolUs 공개 통계 (홈페이지 카운터)
+- 학교/교사/학생/학부모 수를 site_stats 한 행에 집계해 두고 읽기만 함 (명단 테이블 COUNT 없음)
+- 갱신
+  - 명단 추가/삭제 시: adjust_public_stats(cursor, ...)로 증감만 반영 (caller 트랜잭션 안, 명단 COUNT 없음)
+  - 주기 작업(cron): refresh_public_stats로 전체 재집계 (증감 누락/직접 수정 보정)
+- 조회: 워커 메모리에 PUBLIC_STATS_TTL초 보관 → site_stats도 분당 1회 수준으로만 읽음
+
+주기 갱신 (cron 예: 10분마다)
+- python -m utils.public_stats
+"""
+
+import time
+import threading
+
+from utils.db import get_db_connection
+
+PUBLIC_STATS_TTL = 60           # 메모리 보관 시간(초)
+
+_EMPTY = {'schools': 0, 'teachers': 0, 'students': 0, 'parents': 0}
+
+_cache_lock = threading.Lock()
+_cache = {'stats': None, 'loaded_at': 0.0}
+_refresh_lock = threading.Lock()
+
+
+def refresh_public_stats():
+    """명단 테이블을 집계해 site_stats 갱신 (무거운 작업 — 주기 작업에서만 호출)"""
+    if not _refresh_lock.acquire(blocking=False):
+        return False  # 같은 워커에서 이미 갱신 중
+    conn = None
+    cursor = None
+    try:
+        conn = get_db_connection()
+        if not conn:
+            return False
+        cursor = conn.cursor()
+        cursor.execute("""
+            INSERT INTO site_stats (id, schools, teachers, students, parents, refreshed_at)
+            SELECT 1,
+                   (SELECT COUNT(DISTINCT school_id) FROM tea_all),
+                   (SELECT COUNT(*) FROM tea_all),
+                   (SELECT COUNT(*) FROM stu_all),
+                   (SELECT COUNT(*) FROM fm_all),
+                   NOW()
+            ON DUPLICATE KEY UPDATE schools = VALUES(schools), teachers = VALUES(teachers),
+                students = VALUES(students), parents = VALUES(parents), refreshed_at = VALUES(refreshed_at)
+        """)
+        conn.commit()
+        with _cache_lock:
+            _cache['loaded_at'] = 0.0  # 이 워커는 다음 조회 때 바로 새 값 사용
+        return True
+    except Exception as e:
+        print(f"[PublicStats] 집계 갱신 오류: {e}")
+        if conn: conn.rollback()
+        return False
+    finally:
+        if cursor: cursor.close()
+        if conn: conn.close()
+        _refresh_lock.release()
+
+
+def adjust_public_stats(cursor, schools=0, teachers=0, students=0, parents=0):
+    """
+    site_stats 증감 (커밋은 caller). 행이 아직 없으면 아무것도 하지 않음 — 주기 작업이 처음 만듦
+    음수 증감도 0 아래로는 내려가지 않음
+    """
+    if not (schools or teachers or students or parents):
+        return
+    cursor.execute("""
+        UPDATE site_stats
+        SET schools = GREATEST(CAST(schools AS SIGNED) + %s, 0),
+            teachers = GREATEST(CAST(teachers AS SIGNED) + %s, 0),
+            students = GREATEST(CAST(students AS SIGNED) + %s, 0),
+            parents = GREATEST(CAST(parents AS SIGNED) + %s, 0)
+        WHERE id = 1
+    """, (schools, teachers, students, parents))
+
+
+def get_public_stats():
+    """메모리 캐시 → site_stats 순으로 조회. 실패 시 마지막 값(없으면 0)"""
+    now = time.time()
+    stats = _cache['stats']
+    if stats is not None and now - _cache['loaded_at'] < PUBLIC_STATS_TTL:
+        return stats
+
+    conn = None
+    cursor = None
+    try:
+        conn = get_db_connection()
+        if not conn:
+            return stats or dict(_EMPTY)
+        cursor = conn.cursor()
+        cursor.execute("SELECT schools, teachers, students, parents FROM site_stats WHERE id = 1")
+        row = cursor.fetchone()
+        stats = {k: int(row[k] or 0) for k in _EMPTY} if row else dict(_EMPTY)
+    except Exception as e:
+        print(f"[PublicStats] 조회 오류: {e}")
+        return stats or dict(_EMPTY)
+    finally:
+        if cursor: cursor.close()
+        if conn: conn.close()
+
+    with _cache_lock:
+        _cache['stats'] = stats
+        _cache['loaded_at'] = now
+    return stats
+
+
+if __name__ == '__main__':
+    ok = refresh_public_stats()
+    print(f"[PublicStats] 갱신 {'완료' if ok else '실패'}: {get_public_stats()}")
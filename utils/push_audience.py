@@ -0,0 +1,198 @@
+"""
+푸시 발송 대상 세그먼트 (push_audience) — 구독 endpoint를 역할/학년/반/연결 학생과 함께 미리 펼쳐 둔 테이블
+- 구독 1건당 1행 이상 (학부모는 자녀마다 1행, 명단에 없는 구독자는 학년/반 NULL 1행)
+  student_id: 학생은 본인, 학부모는 fm_all 자녀 매칭(이름+학년+반)으로 찾은 학생, 그 외 ''
+- 발송 대상 조회가 JOIN 없이 인덱스 범위 스캔 1회
+  학급/학년: idx_pa_class (school_id, class_grade, class_no, user_role)
+  학생+학부모: idx_pa_student (school_id, student_id) / 학교 전체·역할별: idx_pa_role (school_id, user_role)
+- 갱신 시점
+  1) 구독 등록/해제, 만료 구독 삭제: refresh_endpoint / remove_endpoints (같은 트랜잭션에서)
+  2) 명단 변경: invalidate_roster가 올리는 명단 버전(utils/cache_version)을 발송 시점에 비교
+     → 바뀐 학교만 ensure_school_audience가 재구성 (가입 여러 건이 몰려도 발송 1건당 최대 1회)
+  3) 전체 재구성 (명단을 DB에서 직접 고친 경우 등): python -m utils.push_audience [--school SCHOOL_ID]
+"""
+
+import sys
+import threading
+
+from utils.db import get_db_connection
+from utils.cache_version import get_version
+
+_ROSTER_KINDS = ('students', 'teachers', 'parents')
+_LOCK_TIMEOUT = 5
+
+_fresh_lock = threading.Lock()
+_fresh_versions = {}          # school_id → 이 프로세스가 마지막으로 확인한 명단 버전
+
+# 구독 → 세그먼트 행 (범위 조건 {scope}는 ps 별칭 기준, 파라미터는 분기마다 1개씩 4회)
+_SEGMENT_SELECT = """
+    SELECT ps.endpoint, ps.p256dh, ps.auth, ps.school_id, ps.user_role, ps.member_id,
+           sa.class_grade, sa.class_no, ps.member_id
+    FROM push_subscriptions ps
+    JOIN stu_all sa ON sa.member_id = ps.member_id AND sa.school_id = ps.school_id
+    WHERE ps.user_role = 'student' AND {scope}
+    UNION ALL
+    SELECT ps.endpoint, ps.p256dh, ps.auth, ps.school_id, ps.user_role, ps.member_id,
+           fa.class_grade, fa.class_no, COALESCE(sa.member_id, '')
+    FROM push_subscriptions ps
+    JOIN fm_all fa ON fa.member_id = ps.member_id AND fa.school_id = ps.school_id
+    LEFT JOIN stu_all sa ON sa.school_id = fa.school_id
+        AND sa.member_name = fa.child_name AND sa.class_grade = fa.class_grade
+        AND sa.class_no = fa.class_no
+    WHERE ps.user_role = 'parent' AND {scope}
+    UNION ALL
+    SELECT ps.endpoint, ps.p256dh, ps.auth, ps.school_id, ps.user_role, ps.member_id,
+           ta.class_grade, ta.class_no, ''
+    FROM push_subscriptions ps
+    JOIN tea_all ta ON ta.member_id = ps.member_id AND ta.school_id = ps.school_id
+    WHERE ps.user_role = 'teacher' AND {scope}
+    UNION ALL
+    SELECT ps.endpoint, ps.p256dh, ps.auth, ps.school_id, ps.user_role, ps.member_id,
+           NULL, NULL, IF(ps.user_role = 'student', ps.member_id, '')
+    FROM push_subscriptions ps
+    WHERE {scope} AND NOT (
+        (ps.user_role = 'student' AND EXISTS (SELECT 1 FROM stu_all x
+            WHERE x.member_id = ps.member_id AND x.school_id = ps.school_id))
+        OR (ps.user_role = 'parent' AND EXISTS (SELECT 1 FROM fm_all x
+            WHERE x.member_id = ps.member_id AND x.school_id = ps.school_id))
+        OR (ps.user_role = 'teacher' AND EXISTS (SELECT 1 FROM tea_all x
+            WHERE x.member_id = ps.member_id AND x.school_id = ps.school_id)))
+"""
+
+_SEGMENT_INSERT = """
+    INSERT INTO push_audience (endpoint, p256dh, auth, school_id, user_role, member_id,
+                               class_grade, class_no, student_id)
+"""
+
+
+def _insert_segments(cursor, scope_sql, value):
+    cursor.execute(_SEGMENT_INSERT + _SEGMENT_SELECT.format(scope=scope_sql), [value] * 4)
+    return cursor.rowcount
+
+
+# ============================================
+# 구독 변경 (호출자 트랜잭션 안에서, 커밋은 호출자)
+# ============================================
+def refresh_endpoint(cursor, endpoint):
+    """구독 등록/갱신 직후 — 해당 endpoint 행을 다시 만듦 (다른 계정으로 옮겨진 endpoint 포함)"""
+    cursor.execute("DELETE FROM push_audience WHERE endpoint = %s", (endpoint,))
+    return _insert_segments(cursor, 'ps.endpoint = %s', endpoint)
+
+
+def remove_endpoints(cursor, endpoints):
+    """구독 해제/만료 — 세그먼트 행 삭제"""
+    endpoints = list(dict.fromkeys(e for e in endpoints if e))
+    if not endpoints:
+        return 0
+    fmt = ','.join(['%s'] * len(endpoints))
+    cursor.execute(f"DELETE FROM push_audience WHERE endpoint IN ({fmt})", endpoints)
+    return cursor.rowcount
+
+
+# ============================================
+# 학교 단위 재구성 (명단 변경)
+# ============================================
+def roster_version(school_id):
+    """학교 명단 버전 문자열 (invalidate_roster가 올리는 tea/stu/fm 버전 조합)"""
+    school_id = str(school_id)
+    return '.'.join(str(get_version('roster', f"{school_id}.{kind}")) for kind in _ROSTER_KINDS)
+
+
+def rebuild_school(cursor, school_id, version=None):
+    """
+    학교 세그먼트 전체 재구성 → 생성 행 수. 호출자 연결을 커밋함
+    (같은 학교를 여러 워커가 동시에 재구성하지 않도록 GET_LOCK — 잠금 실패 시 None, 기존 행 유지)
+    """
+    school_id = str(school_id)
+    if version is None:
+        version = roster_version(school_id)
+    lock_name = f"schoolus_push_audience_{school_id}"
+    cursor.execute("SELECT GET_LOCK(%s, %s) AS locked", (lock_name, _LOCK_TIMEOUT))
+    row = cursor.fetchone()
+    if not (row and row['locked']):
+        print(f"[PushAudience] {school_id} 재구성 잠금 실패 — 기존 세그먼트 사용")
+        return None
+    try:
+        cursor.execute("DELETE FROM push_audience WHERE school_id = %s", (school_id,))
+        count = _insert_segments(cursor, 'ps.school_id = %s', school_id)
+        cursor.execute("""
+            INSERT INTO push_audience_state (school_id, roster_version, row_count, rebuilt_at)
+            VALUES (%s, %s, %s, NOW())
+            ON DUPLICATE KEY UPDATE roster_version = VALUES(roster_version),
+                row_count = VALUES(row_count), rebuilt_at = NOW()
+        """, (school_id, version, count))
+        cursor.connection.commit()
+    except Exception:
+        cursor.connection.rollback()
+        raise
+    finally:
+        cursor.execute("SELECT RELEASE_LOCK(%s)", (lock_name,))
+    with _fresh_lock:
+        _fresh_versions[school_id] = version
+    print(f"[PushAudience] {school_id} 재구성: {count}행")
+    return count
+
+
+def ensure_school_audience(cursor, school_id):
+    """
+    발송 대상 조회 전 호출 — 명단 버전이 마지막 재구성 이후 바뀌었으면 재구성
+    (이 프로세스에서 이미 확인한 버전이면 DB 조회도 없음)
+    한 번도 구성된 적 없는 학교인데 재구성 잠금을 얻지 못하면 RuntimeError
+    → 빈 세그먼트로 '발송 완료' 처리하지 않고 발송함이 백오프 후 재시도
+    """
+    if not school_id:
+        return
+    school_id = str(school_id)
+    version = roster_version(school_id)
+    with _fresh_lock:
+        if _fresh_versions.get(school_id) == version:
+            return
+    cursor.execute("SELECT roster_version FROM push_audience_state WHERE school_id = %s", (school_id,))
+    row = cursor.fetchone()
+    if row and row['roster_version'] == version:
+        with _fresh_lock:
+            _fresh_versions[school_id] = version
+        return
+    if rebuild_school(cursor, school_id, version) is None and not row:
+        raise RuntimeError(f"push_audience 미구성 학교 {school_id} (재구성 잠금 대기 초과)")
+
+
+def rebuild_all(school_id=None):
+    """전체(또는 지정 학교) 재구성 → {school_id: 행 수}"""
+    conn = get_db_connection()
+    if not conn:
+        print("[PushAudience] DB 연결 실패")
+        return None
+    cursor = None
+    try:
+        cursor = conn.cursor()
+        if school_id:
+            schools = [str(school_id)]
+        else:
+            cursor.execute("SELECT DISTINCT school_id FROM push_subscriptions")
+            schools = [r['school_id'] for r in cursor.fetchall()]
+            conn.commit()
+        result = {s: rebuild_school(cursor, s) for s in schools}
+        if not school_id:
+            # 구독이 모두 사라진 학교의 남은 행 정리
+            cursor.execute("""
+                DELETE pa FROM push_audience pa
+                LEFT JOIN push_subscriptions ps ON ps.endpoint = pa.endpoint
+                WHERE ps.endpoint IS NULL
+            """)
+            conn.commit()
+        return result
+    except Exception as e:
+        print(f"[PushAudience] 재구성 오류: {e}")
+        conn.rollback()
+        return None
+    finally:
+        if cursor: cursor.close()
+        conn.close()
+
+
+if __name__ == '__main__':
+    target = None
+    if '--school' in sys.argv:
+        target = sys.argv[sys.argv.index('--school') + 1]
+    sys.exit(0 if rebuild_all(target) is not None else 1)
@@ -1,13 +1,41 @@
 """
 SchoolUs 푸시 알림 헬퍼
-- 학급 단위 푸시 발송 유틸리티
-- routes/push.py의 send 로직을 재사용 가능하게 분리
+- 학급/학생/사용자 단위 푸시 요청 유틸리티 (호출부는 그대로, 실제 전송은 발송함 워커가 처리)
+- send_push_to_*: push_outbox에 (대상, 내용) 1건 적재 후 바로 반환 → 요청 스레드는 푸시 서비스를 기다리지 않음
+  (적재/워커/재시도: utils/push_outbox)
+- audience_subscriptions: 발송 대상(학급/학년/학생/사용자/학교/endpoint 목록) → 구독 목록
+  (학교 단위 대상은 push_audience 세그먼트 인덱스 범위 스캔 1회 — utils/push_audience)
+- deliver_push: 공용 발송 엔진 (발송함 워커가 사용)
+  → 구독을 푸시 서비스 origin(FCM/Mozilla/Apple 등)별로 묶어 스레드 풀에서 동시 발송,
+    origin당 동시 전송 수 제한, 스레드별 requests.Session으로 origin 연결 재사용
+  → 결과: sent / failed / expired + 재시도할 일시 오류 endpoint 목록(retry_endpoints)
+- 기기별 발송 상한: endpoint당 1분 구간마다 PUSH_RATE_PER_MINUTE건, 서버 전체 공유 집계
+  (Redis 설정 시 INCR 키, 없으면 push_rate 테이블). 초과분은 throttled_endpoints로 →
+  발송함이 시도 횟수를 쓰지 않고 다음 구간에 다시 보내거나, 묶음 발송 행이면 버림
+- VAPID: 개인키는 프로세스당 1회 로드, 서명한 Authorization 헤더(JWT)는 푸시 서비스 origin별로
+  캐시해 만료 VAPID_JWT_REFRESH_MARGIN초 전까지 재사용 (구독마다 키 파일 읽기/ES256 서명 없음)
 """
 
 import json
 import os
+import time
+import hashlib
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
 from pywebpush import webpush, WebPushException
 from utils.db import get_db_connection
+from utils.cache_version import get_redis
+from utils.push_audience import ensure_school_audience, remove_endpoints
+
+try:
+    from py_vapid import Vapid
+except ImportError:
+    Vapid = None
 
 _VAPID_CONFIG = None
 
@@ -24,262 +52,444 @@ def _load_vapid_config():
     return _VAPID_CONFIG
 
 
-def send_push_to_class(school_id, class_grade, class_no, title, body, url='/', target_roles=None):
-    """
-    학급 단위 푸시 알림 발송.
+# ============================================
+# 공용 발송 엔진
+# ============================================
+PUSH_MAX_WORKERS = int(os.environ.get('SCHOOLUS_PUSH_WORKERS', '16'))      # 워커 프로세스당 전송 스레드
+PUSH_PER_ORIGIN = int(os.environ.get('SCHOOLUS_PUSH_PER_ORIGIN', '8'))     # 푸시 서비스 origin당 동시 전송
+PUSH_TIMEOUT = 10
+PUSH_RATE_PER_MINUTE = int(os.environ.get('SCHOOLUS_PUSH_RATE_PER_MINUTE', '6'))  # 기기(endpoint)당 분당 상한
+_PUSH_ICON = '/static/icons/icon-192x192.png'
 
-    Args:
-        school_id: 학교 ID
-        class_grade: 학년
-        class_no: 반
-        title: 알림 제목
-        body: 알림 내용
-        url: 클릭 시 이동할 URL
-        target_roles: list of roles ['student', 'parent', 'teacher'] or None=전체
+_send_pool = None
+_send_pool_lock = threading.Lock()
+_session_local = threading.local()
+_RATE_KEY_TTL = 120                    # Redis 구간 키 보존 시간 (초)
+_RATE_DB_CHUNK = 500
 
-    Returns:
-        dict: {'sent': int, 'failed': int, 'expired': int}
-    """
-    result = {'sent': 0, 'failed': 0, 'expired': 0}
 
+def _get_send_pool():
+    global _send_pool
+    if _send_pool is None:
+        with _send_pool_lock:
+            if _send_pool is None:
+                _send_pool = ThreadPoolExecutor(max_workers=PUSH_MAX_WORKERS, thread_name_prefix='push-send')
+    return _send_pool
+
+
+def _get_session():
+    """전송 스레드별 HTTP 세션 (origin별 keep-alive 연결 재사용)"""
+    session = getattr(_session_local, 'session', None)
+    if session is None:
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=8, pool_maxsize=PUSH_PER_ORIGIN)
+        session.mount('https://', adapter)
+        _session_local.session = session
+    return session
+
+
+def _rate_window():
+    """현재 1분 구간 번호"""
+    return int(time.time() // 60)
+
+
+def _rate_key(endpoint):
+    return hashlib.sha1(endpoint.encode('utf-8')).hexdigest()
+
+
+def _rate_reserve_db(keys, window):
+    """push_rate 테이블로 구간 카운터 증가 → {키: 증가 후 건수}"""
+    counts = {}
     conn = get_db_connection()
     if not conn:
-        return result
-
+        raise RuntimeError('DB 연결 실패')
+    cursor = None
     try:
         cursor = conn.cursor()
-        subscriptions = []
-
-        roles = target_roles or ['student', 'parent', 'teacher']
-
-        if 'student' in roles:
-            # 해당 학급 학생의 구독 조회
-            cursor.execute("""
-                SELECT ps.endpoint, ps.p256dh, ps.auth
-                FROM push_subscriptions ps
-                JOIN stu_all sa ON ps.member_id = sa.member_id AND ps.school_id = sa.school_id
-                WHERE ps.school_id = %s AND ps.user_role = 'student'
-                  AND sa.class_grade = %s AND sa.class_no = %s
-            """, (school_id, class_grade, class_no))
-            subscriptions.extend(cursor.fetchall())
-
-        if 'parent' in roles:
-            # 해당 학급 학생의 학부모 구독 조회
-            cursor.execute("""
-                SELECT ps.endpoint, ps.p256dh, ps.auth
-                FROM push_subscriptions ps
-                JOIN fm_all fa ON ps.member_id = fa.member_id AND ps.school_id = fa.school_id
-                WHERE ps.school_id = %s AND ps.user_role = 'parent'
-                  AND fa.class_grade = %s AND fa.class_no = %s
-            """, (school_id, class_grade, class_no))
-            subscriptions.extend(cursor.fetchall())
-
-        if 'teacher' in roles:
-            # 해당 학급 담임 구독 조회
-            cursor.execute("""
-                SELECT ps.endpoint, ps.p256dh, ps.auth
-                FROM push_subscriptions ps
-                JOIN tea_all ta ON ps.member_id = ta.member_id AND ps.school_id = ta.school_id
-                WHERE ps.school_id = %s AND ps.user_role = 'teacher'
-                  AND ta.class_grade = %s AND ta.class_no = %s
-            """, (school_id, class_grade, class_no))
-            subscriptions.extend(cursor.fetchall())
-
-        if not subscriptions:
-            return result
-
-        config = _load_vapid_config()
-        private_key_path = config.get('private_key_path', '')
-        claims_email = config.get('claims_email', 'mailto:admin@schoolwithus.co.kr')
-
-        payload = json.dumps({
-            'title': title,
-            'body': body,
-            'icon': '/static/icons/icon-192x192.png',
-            'url': url
-        })
-
-        expired_endpoints = []
-
-        # 중복 endpoint 제거
-        seen = set()
-        unique_subs = []
-        for sub in subscriptions:
-            if sub['endpoint'] not in seen:
-                seen.add(sub['endpoint'])
-                unique_subs.append(sub)
-
-        for sub in unique_subs:
-            try:
-                webpush(
-                    subscription_info={
-                        'endpoint': sub['endpoint'],
-                        'keys': {'p256dh': sub['p256dh'], 'auth': sub['auth']}
-                    },
-                    data=payload,
-                    vapid_private_key=private_key_path,
-                    vapid_claims={"sub": claims_email}
-                )
-                result['sent'] += 1
-            except WebPushException as e:
-                if e.response and e.response.status_code in (404, 410):
-                    expired_endpoints.append(sub['endpoint'])
-                else:
-                    print(f"[PushHelper] Send error: {e}")
-                result['failed'] += 1
-            except Exception as e:
-                print(f"[PushHelper] Send error: {e}")
-                result['failed'] += 1
-
-        # 만료된 구독 정리
-        if expired_endpoints:
-            format_str = ','.join(['%s'] * len(expired_endpoints))
-            cursor.execute(f"DELETE FROM push_subscriptions WHERE endpoint IN ({format_str})", expired_endpoints)
+        key_list = list(keys)
+        for i in range(0, len(key_list), _RATE_DB_CHUNK):
+            chunk = key_list[i:i + _RATE_DB_CHUNK]
+            cursor.execute(f"""
+                INSERT INTO push_rate (endpoint_hash, window_min, sent_count)
+                VALUES {','.join(['(%s, %s, 1)'] * len(chunk))}
+                ON DUPLICATE KEY UPDATE sent_count = sent_count + 1
+            """, [v for k in chunk for v in (k, window)])
             conn.commit()
-            result['expired'] = len(expired_endpoints)
-
-        return result
-    except Exception as e:
-        print(f"[PushHelper] Error: {e}")
-        return result
+            cursor.execute(f"""
+                SELECT endpoint_hash, sent_count FROM push_rate
+                WHERE window_min = %s AND endpoint_hash IN ({','.join(['%s'] * len(chunk))})
+            """, [window] + chunk)
+            counts.update({r['endpoint_hash']: r['sent_count'] for r in cursor.fetchall()})
+            conn.commit()
+        return counts
     finally:
-        cursor.close()
+        if cursor: cursor.close()
         conn.close()
 
 
-def send_push_to_student(school_id, student_id, title, body, url='/'):
+def _rate_reserve(endpoints):
     """
-    특정 학생 + 학부모에게 푸시 발송 (상담 일정 등 개인 알림용).
+    endpoint별 이번 1분 구간 전송 수를 1씩 올리고, 상한 이내인 endpoint 집합 반환
+    (모든 워커/프로세스 공유: Redis 우선, 없으면 push_rate 테이블. 집계 실패 시 모두 허용)
     """
-    result = {'sent': 0, 'failed': 0, 'expired': 0}
+    if PUSH_RATE_PER_MINUTE <= 0 or not endpoints:
+        return set(endpoints)
+    window = _rate_window()
+    keys = {e: _rate_key(e) for e in endpoints}
+    client = get_redis()
+    try:
+        if client is not None:
+            pipe = client.pipeline(transaction=False)
+            for k in keys.values():
+                rkey = f"schoolus:push_rate:{window}:{k}"
+                pipe.incr(rkey)
+                pipe.expire(rkey, _RATE_KEY_TTL)
+            replies = pipe.execute()[0::2]
+            counts = {k: int(c) for k, c in zip(keys.values(), replies)}
+        else:
+            counts = _rate_reserve_db(keys.values(), window)
+    except Exception as e:
+        print(f"[PushHelper] 발송 상한 집계 실패, 상한 없이 발송: {e}")
+        return set(endpoints)
+    return {e for e, k in keys.items() if counts.get(k, 0) <= PUSH_RATE_PER_MINUTE}
+
+
+def purge_rate_windows(cursor):
+    """지난 구간 push_rate 행 정리 (발송함 정기 정리에서 호출)"""
+    cursor.execute("DELETE FROM push_rate WHERE window_min < %s LIMIT 5000", (_rate_window() - 1,))
+
+
+def _origin(endpoint):
+    parts = urlsplit(endpoint)
+    return f"{parts.scheme}://{parts.netloc}"
+
+
+# ============================================
+# VAPID 서명 캐시 (origin별 Authorization 헤더)
+# ============================================
+VAPID_JWT_TTL = 12 * 60 * 60           # 푸시 서비스 허용 최대 24시간, pywebpush 기본값과 동일하게 12시간
+VAPID_JWT_REFRESH_MARGIN = 10 * 60     # 만료 10분 전부터 새로 서명
+
+_vapid_key = None
+_vapid_lock = threading.Lock()
+_jwt_cache = {}                        # origin -> (headers, exp)
+
+
+def _get_vapid_key(private_key_path):
+    """VAPID 개인키 (프로세스당 1회 로드). 로드할 수 없으면 None → webpush가 직접 서명"""
+    global _vapid_key
+    if _vapid_key is None and Vapid is not None and private_key_path:
+        with _vapid_lock:
+            if _vapid_key is None:
+                try:
+                    if os.path.exists(private_key_path):
+                        _vapid_key = Vapid.from_file(private_key_path)
+                    else:
+                        _vapid_key = Vapid.from_string(private_key=private_key_path)
+                except Exception as e:
+                    print(f"[PushHelper] VAPID key load error: {e}")
+                    return None
+    return _vapid_key
+
+
+def _vapid_headers(endpoint, private_key_path, claims_email):
+    """origin별 서명 헤더 (캐시 재사용). 서명할 수 없으면 None"""
+    origin = _origin(endpoint)
+    now = time.time()
+    cached = _jwt_cache.get(origin)
+    if cached and cached[1] - VAPID_JWT_REFRESH_MARGIN > now:
+        return dict(cached[0])
+    vapid = _get_vapid_key(private_key_path)
+    if vapid is None:
+        return None
+    with _vapid_lock:
+        cached = _jwt_cache.get(origin)
+        if cached and cached[1] - VAPID_JWT_REFRESH_MARGIN > now:
+            return dict(cached[0])
+        exp = int(now) + VAPID_JWT_TTL
+        headers = vapid.sign({'sub': claims_email, 'aud': origin, 'exp': exp})
+        _jwt_cache[origin] = (dict(headers), exp)
+    return dict(headers)
+
+
+def build_payload(title, body, url='/'):
+    return json.dumps({'title': title, 'body': body, 'icon': _PUSH_ICON, 'url': url})
+
+
+def _send_one(sub, payload, private_key_path, claims_email):
+    """구독 1건 전송 → 'sent' | 'expired' | 'retry'(일시 오류) | 'failed'"""
+    try:
+        subscription_info = {'endpoint': sub['endpoint'], 'keys': {'p256dh': sub['p256dh'], 'auth': sub['auth']}}
+        headers = _vapid_headers(sub['endpoint'], private_key_path, claims_email)
+        if headers is not None:
+            # 캐시된 서명 헤더 사용 — webpush는 페이로드 암호화만 수행
+            webpush(subscription_info=subscription_info, data=payload, headers=headers,
+                    timeout=PUSH_TIMEOUT, requests_session=_get_session())
+        else:
+            webpush(subscription_info=subscription_info, data=payload, vapid_private_key=private_key_path,
+                    vapid_claims={"sub": claims_email},  # webpush가 aud/exp를 채워 넣으므로 건마다 새 dict
+                    timeout=PUSH_TIMEOUT, requests_session=_get_session())
+        return 'sent'
+    except WebPushException as e:
+        status = e.response.status_code if e.response is not None else None
+        if status in (404, 410):
+            return 'expired'
+        if status in (401, 403):
+            _jwt_cache.pop(_origin(sub['endpoint']), None)  # 서명 거부 → 다음 전송 때 새로 서명
+        if status is None or status == 429 or status >= 500:
+            return 'retry'
+        print(f"[PushHelper] Send error: {e}")
+        return 'failed'
+    except (requests.Timeout, requests.ConnectionError):
+        return 'retry'
+    except Exception as e:
+        print(f"[PushHelper] Send error: {e}")
+        return 'failed'
+
 
+def _delete_expired(endpoints):
     conn = get_db_connection()
     if not conn:
-        return result
-
+        return
+    cursor = None
     try:
         cursor = conn.cursor()
-
-        # 학생 본인 구독
-        cursor.execute("""
-            SELECT endpoint, p256dh, auth FROM push_subscriptions
-            WHERE school_id = %s AND member_id = %s
-        """, (school_id, student_id))
-        subscriptions = list(cursor.fetchall())
-
-        # 학부모 구독 (fm_all에서 자녀 매칭)
-        cursor.execute("""
-            SELECT ps.endpoint, ps.p256dh, ps.auth
-            FROM push_subscriptions ps
-            JOIN fm_all fa ON ps.member_id = fa.member_id AND ps.school_id = fa.school_id
-            JOIN stu_all sa ON fa.school_id = sa.school_id
-                AND fa.child_name = sa.member_name AND fa.class_grade = sa.class_grade
-                AND fa.class_no = sa.class_no
-            WHERE sa.member_id = %s AND ps.school_id = %s AND ps.user_role = 'parent'
-        """, (student_id, school_id))
-        subscriptions.extend(cursor.fetchall())
-
-        if not subscriptions:
-            return result
-
-        config = _load_vapid_config()
-        private_key_path = config.get('private_key_path', '')
-        claims_email = config.get('claims_email', 'mailto:admin@schoolwithus.co.kr')
-
-        payload = json.dumps({
-            'title': title,
-            'body': body,
-            'icon': '/static/icons/icon-192x192.png',
-            'url': url
-        })
-
-        expired_endpoints = []
-        seen = set()
-
-        for sub in subscriptions:
-            if sub['endpoint'] in seen:
-                continue
-            seen.add(sub['endpoint'])
-            try:
-                webpush(
-                    subscription_info={
-                        'endpoint': sub['endpoint'],
-                        'keys': {'p256dh': sub['p256dh'], 'auth': sub['auth']}
-                    },
-                    data=payload,
-                    vapid_private_key=private_key_path,
-                    vapid_claims={"sub": claims_email}
-                )
-                result['sent'] += 1
-            except WebPushException as e:
-                if e.response and e.response.status_code in (404, 410):
-                    expired_endpoints.append(sub['endpoint'])
-                else:
-                    print(f"[PushHelper] Send error: {e}")
-                result['failed'] += 1
-            except Exception as e:
-                print(f"[PushHelper] Send error: {e}")
-                result['failed'] += 1
-
-        if expired_endpoints:
-            format_str = ','.join(['%s'] * len(expired_endpoints))
-            cursor.execute(f"DELETE FROM push_subscriptions WHERE endpoint IN ({format_str})", expired_endpoints)
-            conn.commit()
-            result['expired'] = len(expired_endpoints)
-
-        return result
+        fmt = ','.join(['%s'] * len(endpoints))
+        cursor.execute(f"DELETE FROM push_subscriptions WHERE endpoint IN ({fmt})", endpoints)
+        remove_endpoints(cursor, endpoints)
+        conn.commit()
     except Exception as e:
-        print(f"[PushHelper] Error: {e}")
-        return result
+        print(f"[PushHelper] 만료 구독 정리 오류: {e}")
     finally:
-        cursor.close()
+        if cursor: cursor.close()
         conn.close()
 
 
-def send_push_to_user(member_id, title, body, url='/'):
-    """특정 사용자 1명에게 푸시 알림 발송 (메신저 등 개인 알림용)."""
-    result = {'sent': 0, 'failed': 0, 'expired': 0}
-    conn = get_db_connection()
-    if not conn:
+def deliver_push(subscriptions, payload):
+    """
+    구독 목록에 같은 payload 동시 발송 (endpoint 중복 제거, 만료 구독 삭제).
+
+    Returns:
+        dict: {'sent': int, 'failed': int, 'expired': int, 'throttled': int,
+               'retry_endpoints': [endpoint, ...], 'throttled_endpoints': [endpoint, ...]}
+              (failed는 만료/일시 오류 건 포함, retry_endpoints는 5xx/429/타임아웃 건,
+               throttled_endpoints는 기기별 상한 초과로 보내지 않은 건 — failed에 포함하지 않음)
+    """
+    result = {'sent': 0, 'failed': 0, 'expired': 0, 'throttled': 0,
+              'retry_endpoints': [], 'throttled_endpoints': []}
+    unique = {}
+    for sub in subscriptions:
+        unique.setdefault(sub['endpoint'], sub)
+    if not unique:
         return result
-    try:
-        cursor = conn.cursor()
-        cursor.execute("SELECT endpoint, p256dh, auth FROM push_subscriptions WHERE member_id = %s", (member_id,))
-        subscriptions = cursor.fetchall()
-        if not subscriptions:
-            return result
-        config = _load_vapid_config()
-        private_key_path = config.get('private_key_path', '')
-        claims_email = config.get('claims_email', 'mailto:admin@schoolwithus.co.kr')
-        payload = json.dumps({'title': title, 'body': body, 'icon': '/static/icons/icon-192x192.png', 'url': url})
-        expired_endpoints = []
-        seen = set()
-        for sub in subscriptions:
-            if sub['endpoint'] in seen:
-                continue
-            seen.add(sub['endpoint'])
+
+    allowed = _rate_reserve(list(unique))
+    by_origin = {}
+    for endpoint, sub in unique.items():
+        if endpoint not in allowed:
+            result['throttled_endpoints'].append(endpoint)
+            continue
+        by_origin.setdefault(_origin(endpoint), queue.SimpleQueue()).put(sub)
+    result['throttled'] = len(result['throttled_endpoints'])
+    if not by_origin:
+        return result
+
+    config = _load_vapid_config()
+    private_key_path = config.get('private_key_path', '')
+    claims_email = config.get('claims_email', 'mailto:admin@schoolwithus.co.kr')
+
+    result_lock = threading.Lock()
+    expired_endpoints = []
+
+    def drain(origin_queue):
+        # origin 큐를 비울 때까지 순서대로 전송 — origin당 drain 작업 수 = 동시 전송 상한
+        while True:
             try:
-                webpush(subscription_info={'endpoint': sub['endpoint'], 'keys': {'p256dh': sub['p256dh'], 'auth': sub['auth']}},
-                        data=payload, vapid_private_key=private_key_path, vapid_claims={"sub": claims_email})
-                result['sent'] += 1
-            except WebPushException as e:
-                if e.response and e.response.status_code in (404, 410):
-                    expired_endpoints.append(sub['endpoint'])
+                sub = origin_queue.get_nowait()
+            except queue.Empty:
+                return
+            status = _send_one(sub, payload, private_key_path, claims_email)
+            with result_lock:
+                if status == 'sent':
+                    result['sent'] += 1
                 else:
-                    print(f"[PushHelper] send_push_to_user error: {e}")
-                result['failed'] += 1
-            except Exception as e:
-                print(f"[PushHelper] send_push_to_user error: {e}")
-                result['failed'] += 1
-        if expired_endpoints:
-            fmt = ','.join(['%s'] * len(expired_endpoints))
-            cursor.execute(f"DELETE FROM push_subscriptions WHERE endpoint IN ({fmt})", expired_endpoints)
-            conn.commit()
-            result['expired'] = len(expired_endpoints)
-        return result
-    except Exception as ex:
-        print(f"[PushHelper] send_push_to_user error: {ex}")
-        return result
-    finally:
-        cursor.close()
-        conn.close()
+                    result['failed'] += 1
+                    if status == 'expired':
+                        expired_endpoints.append(sub['endpoint'])
+                    elif status == 'retry':
+                        result['retry_endpoints'].append(sub['endpoint'])
+
+    pool = _get_send_pool()
+    futures = []
+    for origin_queue in by_origin.values():
+        for _ in range(min(PUSH_PER_ORIGIN, origin_queue.qsize())):
+            futures.append(pool.submit(drain, origin_queue))
+    wait(futures)
+
+    if expired_endpoints:
+        _delete_expired(expired_endpoints)
+        result['expired'] = len(expired_endpoints)
+    return result
+
+
+# ============================================
+# 발송 대상 → 구독 목록 (발송함 워커가 발송 시점에 조회)
+# ============================================
+def _segment_subscriptions(cursor, where_sql, params):
+    """push_audience 인덱스 범위 스캔 1회 (학부모 다자녀 등 중복 endpoint는 deliver_push가 제거)"""
+    cursor.execute(f"SELECT endpoint, p256dh, auth FROM push_audience WHERE {where_sql}", params)
+    return list(cursor.fetchall())
+
+
+def _class_subscriptions(cursor, audience):
+    roles = audience.get('roles') or ['student', 'parent', 'teacher']
+    fmt = ','.join(['%s'] * len(roles))
+    return _segment_subscriptions(
+        cursor, f"school_id = %s AND class_grade = %s AND class_no = %s AND user_role IN ({fmt})",
+        [audience['school_id'], str(audience['class_grade']), str(audience['class_no'])] + list(roles))
+
+
+def _grade_subscriptions(cursor, audience):
+    query = "school_id = %s AND class_grade = %s"
+    params = [audience['school_id'], str(audience['class_grade'])]
+    roles = audience.get('roles')
+    if roles:
+        query += f" AND user_role IN ({','.join(['%s'] * len(roles))})"
+        params += list(roles)
+    return _segment_subscriptions(cursor, query, params)
+
+
+def _students_subscriptions(cursor, audience):
+    """학생 본인 + 학부모 (student_id로 연결된 행, 학생 수와 관계없이 쿼리 1회)"""
+    student_ids = list(dict.fromkeys(s for s in audience.get('student_ids') or [] if s))
+    if not student_ids:
+        return []
+    fmt = ','.join(['%s'] * len(student_ids))
+    return _segment_subscriptions(cursor, f"school_id = %s AND student_id IN ({fmt})",
+                                  [audience['school_id']] + student_ids)
+
+
+def _in_subscriptions(cursor, column, values):
+    values = list(dict.fromkeys(v for v in values if v))
+    if not values:
+        return []
+    fmt = ','.join(['%s'] * len(values))
+    cursor.execute(f"SELECT endpoint, p256dh, auth FROM push_subscriptions WHERE {column} IN ({fmt})", values)
+    return list(cursor.fetchall())
+
+
+def _school_subscriptions(cursor, audience):
+    query = "school_id = %s"
+    params = [audience['school_id']]
+    if audience.get('role'):
+        query += " AND user_role = %s"
+        params.append(audience['role'])
+    return _segment_subscriptions(cursor, query, params)
+
+
+def audience_subscriptions(cursor, audience_type, audience):
+    """
+    발송 대상 → 구독 목록 [{'endpoint', 'p256dh', 'auth'}, ...]
+
+    audience_type / audience
+        'class':     {'school_id', 'class_grade', 'class_no', 'roles'(선택)}
+        'grade':     {'school_id', 'class_grade', 'roles'(선택)}
+        'student':   {'school_id', 'student_id'}  — 학생 본인 + 학부모
+        'students':  {'school_id', 'student_ids'} — 여러 학생 본인 + 학부모
+        'users':     {'member_ids': [...]}
+        'school':    {'school_id', 'role'(선택)}
+        'endpoints': {'endpoints': [...]}         — 재시도용
+
+    학교 단위 대상은 push_audience 세그먼트에서 조회 (명단이 바뀌었으면 먼저 재구성 — utils/push_audience)
+    """
+    if audience_type in ('class', 'grade', 'student', 'students', 'school'):
+        ensure_school_audience(cursor, audience.get('school_id'))
+    if audience_type == 'class':
+        return _class_subscriptions(cursor, audience)
+    if audience_type == 'grade':
+        return _grade_subscriptions(cursor, audience)
+    if audience_type == 'student':
+        return _students_subscriptions(cursor, {'school_id': audience['school_id'],
+                                                'student_ids': [audience['student_id']]})
+    if audience_type == 'students':
+        return _students_subscriptions(cursor, audience)
+    if audience_type == 'users':
+        return _in_subscriptions(cursor, 'member_id', audience.get('member_ids') or [])
+    if audience_type == 'school':
+        return _school_subscriptions(cursor, audience)
+    if audience_type == 'endpoints':
+        return _in_subscriptions(cursor, 'endpoint', audience.get('endpoints') or [])
+    raise ValueError(f"unknown audience_type: {audience_type}")
+
+
+# ============================================
+# 발송 요청 (발송함 적재 — 요청 스레드는 전송을 기다리지 않음)
+# ============================================
+def _enqueue(audience_type, audience, title, body, url, **coalesce):
+    from utils.push_outbox import enqueue_push
+    return enqueue_push(audience_type, audience, title, body, url, **coalesce)
+
+
+def send_push_to_class(school_id, class_grade, class_no, title, body, url='/', target_roles=None):
+    """
+    학급 단위 푸시 알림 요청.
+
+    Args:
+        school_id: 학교 ID
+        class_grade: 학년
+        class_no: 반
+        title: 알림 제목
+        body: 알림 내용
+        url: 클릭 시 이동할 URL
+        target_roles: list of roles ['student', 'parent', 'teacher'] or None=전체
+
+    Returns:
+        int | None: push_outbox id (적재 실패 시 None)
+    """
+    return _enqueue('class', {'school_id': school_id, 'class_grade': class_grade, 'class_no': class_no,
+                              'roles': target_roles}, title, body, url)
+
+
+def send_push_to_grade(school_id, class_grade, title, body, url='/', target_roles=None):
+    """학년 단위 푸시 알림 요청 (target_roles: send_push_to_class와 같음)"""
+    return _enqueue('grade', {'school_id': school_id, 'class_grade': class_grade, 'roles': target_roles},
+                    title, body, url)
+
+
+def send_push_to_student(school_id, student_id, title, body, url='/'):
+    """
+    특정 학생 + 학부모에게 푸시 요청 (상담 일정 등 개인 알림용).
+    """
+    return _enqueue('student', {'school_id': school_id, 'student_id': student_id}, title, body, url)
+
+
+def send_push_to_students(school_id, student_ids, title, body, url='/'):
+    """
+    여러 학생 + 학부모에게 같은 알림 요청 (출결 저장 등) — 학생마다 따로 적재/조회하지 않음
+    """
+    student_ids = list(dict.fromkeys(s for s in student_ids if s))
+    if not student_ids:
+        return None
+    return _enqueue('students', {'school_id': school_id, 'student_ids': student_ids}, title, body, url)
+
+
+def send_push_to_user(member_id, title, body, url='/'):
+    """특정 사용자 1명에게 푸시 알림 요청 (메신저 등 개인 알림용)."""
+    return _enqueue('users', {'member_ids': [member_id]}, title, body, url)
+
+
+def send_push_to_users(member_ids, title, body, url='/', coalesce_key=None, summary=None, sender_id=None):
+    """
+    여러 사용자에게 같은 알림 요청 — 발송 시 구독 조회 1회
+    coalesce_key/summary/sender_id: 짧은 시간 안의 같은 종류 알림을 1건으로 합침 (utils/push_outbox)
+    """
+    member_ids = list(dict.fromkeys(m for m in member_ids if m))
+    if not member_ids:
+        return None
+    return _enqueue('users', {'member_ids': member_ids}, title, body, url,
+                    coalesce_key=coalesce_key, summary=summary, sender_id=sender_id)
+
+
+def send_push_to_school(school_id, title, body, url='/', role=None):
+    """학교 전체(또는 역할별) 알림 요청 — /api/push/send"""
+    return _enqueue('school', {'school_id': school_id, 'role': role}, title, body, url)
@@ -0,0 +1,339 @@
+"""
+푸시 알림 발송함(outbox) — 요청 처리와 푸시 서비스 전송을 분리
+- 적재: enqueue_push(audience_type, audience, title, body, url) → push_outbox INSERT 1건 후 바로 반환
+- 워커: 대기 행 선점(claim_token) → 대상 확장(push_helper.audience_subscriptions) → deliver_push로 동시 발송
+  - 일시 오류(5xx/429/타임아웃) endpoint만 모아 같은 행을 'endpoints' 대상으로 바꿔 재시도 (지수 백오프)
+  - 404/410 구독은 deliver_push가 한 번에 삭제
+  - 기기별 발송 상한 초과 endpoint는 시도 횟수를 쓰지 않고 OUTBOX_THROTTLE_DELAY초 뒤 다시 발송
+    (묶음 발송 행은 다음 묶음 알림이 대신하므로 버림)
+  - 'sending' 상태로 STALE_SECONDS 넘게 남은 행(워커 중단)은 시도 1회로 계산해 다시 대기로 (한도 도달 시 failed)
+    결과 기록은 claim_token이 그대로인 경우에만 → 회수 후 다시 선점된 행을 원래 워커가 덮어쓰지 않음
+  - 완료 후 OUTBOX_KEEP_DAYS일 지난 행은 정리
+- 실행 방식 (SCHOOLUS_PUSH_WORKER)
+  - inprocess(기본): Gunicorn 워커마다 백그라운드 스레드 1개 (적재 시 즉시 깨움, 평소 OUTBOX_POLL_SECONDS 간격)
+  - external: 앱은 적재만, 별도 프로세스가 발송 — python -m utils.push_outbox
+- 대기 건수/지연: outbox_stats()  (/api/push/outbox-stats)
+- 묶음 발송(coalesce_key): 같은 키의 요청은 PUSH_COALESCE_SECONDS 동안 대기 행 1건에 합침
+  (예: 대화방 'room:12' → "2학년 3반 새 메시지 3개" 1건). 'users' 대상은 수신자 합집합에서 마지막 발신자 제외
+"""
+
+import os
+import sys
+import json
+import time
+import uuid
+import socket
+import threading
+
+from utils.db import get_db_connection
+
+PUSH_WORKER_MODE = os.environ.get('SCHOOLUS_PUSH_WORKER', 'inprocess').lower()
+OUTBOX_BATCH = int(os.environ.get('SCHOOLUS_PUSH_OUTBOX_BATCH', '20'))
+OUTBOX_POLL_SECONDS = float(os.environ.get('SCHOOLUS_PUSH_OUTBOX_POLL', '5'))
+OUTBOX_MAX_ATTEMPTS = 5
+OUTBOX_BACKOFF_BASE = 30          # 재시도 간격: 30초, 60초, 120초, ... (최대 1시간)
+OUTBOX_BACKOFF_MAX = 3600
+OUTBOX_STALE_SECONDS = 600
+OUTBOX_THROTTLE_DELAY = 60        # 기기별 상한 초과분 재발송 대기 (다음 1분 구간)
+OUTBOX_KEEP_DAYS = 7
+PUSH_COALESCE_SECONDS = int(os.environ.get('SCHOOLUS_PUSH_COALESCE_SECONDS', '10'))
+
+_wake = threading.Event()
+_worker_thread = None
+_worker_lock = threading.Lock()
+
+
+# ============================================
+# 적재
+# ============================================
+def _merge_pending(cursor, coalesce_key, audience_type, audience, url, summary, sender_id):
+    """같은 키의 대기 행(아직 발송 전, 묶음 시간 안)에 합침 → 합친 행 id (없으면 None)"""
+    from utils.push_helper import build_payload
+    cursor.execute("""
+        SELECT id, audience_type, audience, merged_count FROM push_outbox
+        WHERE coalesce_key = %s AND status = 'pending' AND attempts = 0 AND next_attempt_at > NOW()
+        ORDER BY id DESC LIMIT 1
+        FOR UPDATE
+    """, (coalesce_key,))
+    row = cursor.fetchone()
+    if not row or row['audience_type'] != audience_type:
+        return None
+
+    merged = json.loads(row['audience'])
+    if audience_type == 'users':
+        member_ids = list(dict.fromkeys((merged.get('member_ids') or []) + (audience.get('member_ids') or [])))
+        merged['member_ids'] = [m for m in member_ids if m != sender_id]
+    count = row['merged_count'] + 1
+    summary = summary or {'title': '새 알림', 'body': '새 알림 {count}개'}
+    # {count}만 치환 (대화방 제목 등 사용자 입력에 들어 있는 중괄호는 그대로 둠)
+    title = summary['title'].replace('{count}', str(count))
+    body = summary['body'].replace('{count}', str(count))
+    cursor.execute("""
+        UPDATE push_outbox SET audience = %s, payload = %s, merged_count = %s WHERE id = %s
+    """, (json.dumps(merged, ensure_ascii=False, default=str),
+          build_payload(title, body, url), count, row['id']))
+    return row['id']
+
+
+def enqueue_push(audience_type, audience, title, body, url='/',
+                 coalesce_key=None, summary=None, sender_id=None):
+    """
+    발송 요청 1건 적재 → outbox id (실패 시 None, 호출한 요청은 계속 진행)
+    - coalesce_key: 같은 키의 요청을 PUSH_COALESCE_SECONDS 동안 1건으로 합침
+    - summary: 합쳐졌을 때 알림 {'title', 'body'} ({count} 자리에 합친 건수)
+    - sender_id: 'users' 대상 합칠 때 수신자에서 뺄 발신자
+    """
+    from utils.push_helper import build_payload
+    conn = get_db_connection()
+    if not conn:
+        print("[PushOutbox] DB 연결 실패, 알림 적재 생략")
+        return None
+    cursor = None
+    try:
+        cursor = conn.cursor()
+        outbox_id = None
+        if coalesce_key:
+            outbox_id = _merge_pending(cursor, coalesce_key, audience_type, audience, url, summary, sender_id)
+        if outbox_id is None:
+            cursor.execute("""
+                INSERT INTO push_outbox (audience_type, audience, payload, coalesce_key, next_attempt_at)
+                VALUES (%s, %s, %s, %s, NOW() + INTERVAL %s SECOND)
+            """, (audience_type, json.dumps(audience, ensure_ascii=False, default=str),
+                  build_payload(title, body, url), coalesce_key,
+                  PUSH_COALESCE_SECONDS if coalesce_key else 0))
+            outbox_id = cursor.lastrowid
+        conn.commit()
+    except Exception as e:
+        if conn: conn.rollback()
+        print(f"[PushOutbox] 적재 오류: {e}")
+        return None
+    finally:
+        if cursor: cursor.close()
+        conn.close()
+
+    if PUSH_WORKER_MODE == 'inprocess':
+        start_outbox_worker()
+        _wake.set()
+    return outbox_id
+
+
+# ============================================
+# 처리
+# ============================================
+def _claim(cursor, conn, limit):
+    token = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+    cursor.execute("""
+        UPDATE push_outbox SET status = 'sending', claim_token = %s, started_at = NOW()
+        WHERE status = 'pending' AND next_attempt_at <= NOW()
+        ORDER BY next_attempt_at, id
+        LIMIT %s
+    """, (token, limit))
+    conn.commit()
+    if cursor.rowcount == 0:
+        return []
+    cursor.execute("""
+        SELECT id, audience_type, audience, payload, attempts, coalesce_key, claim_token
+        FROM push_outbox WHERE claim_token = %s AND status = 'sending'
+        ORDER BY id
+    """, (token,))
+    return cursor.fetchall()
+
+
+def _backoff_seconds(attempts):
+    return min(OUTBOX_BACKOFF_MAX, OUTBOX_BACKOFF_BASE * (2 ** attempts))
+
+
+def _process_row(cursor, conn, row):
+    from utils.push_helper import audience_subscriptions, deliver_push
+    attempts = row['attempts'] + 1
+    try:
+        subscriptions = audience_subscriptions(cursor, row['audience_type'], json.loads(row['audience']))
+        conn.commit()  # 조회 트랜잭션 종료 (발송 동안 스냅샷을 잡고 있지 않도록)
+        result = deliver_push(subscriptions, row['payload'])
+    except Exception as e:
+        print(f"[PushOutbox] #{row['id']} 처리 오류: {e}")
+        cursor.execute("""
+            UPDATE push_outbox
+            SET status = IF(%s >= %s, 'failed', 'pending'), attempts = %s,
+                next_attempt_at = NOW() + INTERVAL %s SECOND,
+                finished_at = IF(%s >= %s, NOW(), NULL), last_error = %s
+            WHERE id = %s AND claim_token = %s
+        """, (attempts, OUTBOX_MAX_ATTEMPTS, attempts, _backoff_seconds(attempts),
+              attempts, OUTBOX_MAX_ATTEMPTS, str(e)[:255], row['id'], row['claim_token']))
+        conn.commit()
+        return
+
+    retry = result['retry_endpoints']
+    throttled = result['throttled_endpoints']
+    notes = []
+    if throttled and row['coalesce_key']:
+        # 묶음 발송 행(대화방 알림 등)은 다음 묶음 알림이 최신 내용을 알리므로 상한 초과분은 버림
+        notes.append(f"{len(throttled)}건 발송 상한 초과로 생략")
+        throttled = []
+    # 시도 횟수는 일시 오류가 있을 때만 증가 (상한 초과만 남은 경우는 다음 구간에 다시 — 실패로 끝나지 않음)
+    if not retry:
+        attempts = row['attempts']
+    permanent_failed = result['failed'] - result['expired'] - len(retry)
+    remaining = retry + throttled
+    if remaining and attempts < OUTBOX_MAX_ATTEMPTS:
+        # 일시 오류/상한 초과 endpoint만 남겨 재시도
+        if retry:
+            notes.append(f"{len(retry)}건 일시 오류, 재시도 예정")
+        if throttled:
+            notes.append(f"{len(throttled)}건 발송 상한 초과, 다음 구간에 발송")
+        cursor.execute("""
+            UPDATE push_outbox
+            SET status = 'pending', attempts = %s, audience_type = 'endpoints', audience = %s,
+                next_attempt_at = NOW() + INTERVAL %s SECOND,
+                sent = sent + %s, failed = failed + %s, expired = expired + %s,
+                last_error = %s
+            WHERE id = %s AND claim_token = %s
+        """, (attempts, json.dumps({'endpoints': remaining}),
+              _backoff_seconds(attempts) if retry else OUTBOX_THROTTLE_DELAY,
+              result['sent'], permanent_failed, result['expired'],
+              ', '.join(notes)[:255], row['id'], row['claim_token']))
+    else:
+        if remaining:
+            notes.append(f"{len(remaining)}건 재시도 한도 초과")
+        cursor.execute("""
+            UPDATE push_outbox
+            SET status = %s, attempts = %s, finished_at = NOW(),
+                sent = sent + %s, failed = failed + %s, expired = expired + %s,
+                last_error = %s
+            WHERE id = %s AND claim_token = %s
+        """, ('failed' if remaining else 'done', attempts,
+              result['sent'], permanent_failed + len(remaining), result['expired'],
+              ', '.join(notes)[:255] or None, row['id'], row['claim_token']))
+    if cursor.rowcount == 0:
+        print(f"[PushOutbox] #{row['id']} 선점이 회수된 행 — 결과 기록 생략")
+    conn.commit()
+
+
+def _recover_stale(cursor, conn):
+    from utils.push_helper import purge_rate_windows
+    # 중단/멈춘 워커의 선점 회수 — 시도 1회로 계산 (워커를 죽이는 행이 무한 재시도되지 않도록)
+    # (MySQL UPDATE는 SET을 왼쪽부터 적용 → status/finished_at의 attempts는 증가한 값)
+    cursor.execute("""
+        UPDATE push_outbox
+        SET attempts = attempts + 1, claim_token = NULL,
+            status = IF(attempts >= %s, 'failed', 'pending'),
+            finished_at = IF(attempts >= %s, NOW(), NULL),
+            next_attempt_at = NOW() + INTERVAL %s SECOND,
+            last_error = '발송 중 워커 응답 없음 (선점 회수)'
+        WHERE status = 'sending' AND started_at < NOW() - INTERVAL %s SECOND
+    """, (OUTBOX_MAX_ATTEMPTS, OUTBOX_MAX_ATTEMPTS, OUTBOX_BACKOFF_BASE, OUTBOX_STALE_SECONDS))
+    cursor.execute("""
+        DELETE FROM push_outbox
+        WHERE status IN ('done', 'failed') AND finished_at < NOW() - INTERVAL %s DAY
+        LIMIT 1000
+    """, (OUTBOX_KEEP_DAYS,))
+    purge_rate_windows(cursor)
+    conn.commit()
+
+
+def process_outbox(limit=OUTBOX_BATCH, housekeeping=False):
+    """대기 중인 발송 요청 최대 limit건 처리 → 처리 건수"""
+    conn = get_db_connection()
+    if not conn:
+        return 0
+    cursor = None
+    try:
+        cursor = conn.cursor()
+        if housekeeping:
+            _recover_stale(cursor, conn)
+        rows = _claim(cursor, conn, limit)
+        for row in rows:
+            _process_row(cursor, conn, row)
+        return len(rows)
+    except Exception as e:
+        print(f"[PushOutbox] 처리 오류: {e}")
+        return 0
+    finally:
+        if cursor: cursor.close()
+        conn.close()
+
+
+def run_worker(poll_seconds=OUTBOX_POLL_SECONDS):
+    """발송 루프 (백그라운드 스레드 또는 별도 프로세스)"""
+    last_housekeeping = 0.0
+    while True:
+        now = time.time()
+        housekeeping = now - last_housekeeping >= 60
+        if housekeeping:
+            last_housekeeping = now
+        try:
+            handled = process_outbox(housekeeping=housekeeping)
+        except Exception as e:
+            print(f"[PushOutbox] 워커 오류: {e}")
+            handled = 0
+        if handled < OUTBOX_BATCH:
+            _wake.wait(poll_seconds)
+            _wake.clear()
+
+
+def start_outbox_worker():
+    """워커 프로세스 내 발송 스레드 기동 (inprocess 모드, 이미 실행 중이면 무시)"""
+    global _worker_thread
+    if PUSH_WORKER_MODE != 'inprocess':
+        return False
+    if _worker_thread is not None and _worker_thread.is_alive():
+        return True
+    with _worker_lock:
+        if _worker_thread is None or not _worker_thread.is_alive():
+            _worker_thread = threading.Thread(target=run_worker, name='push-outbox', daemon=True)
+            _worker_thread.start()
+    return True
+
+
+# ============================================
+# 모니터링
+# ============================================
+def outbox_stats():
+    """대기 건수/가장 오래된 대기 시간 + 최근 1시간 적재→완료 지연"""
+    stats = {'pending': 0, 'sending': 0, 'oldest_pending_seconds': 0,
+             'done_1h': 0, 'failed_1h': 0, 'avg_latency_seconds': None, 'max_latency_seconds': None,
+             'worker_mode': PUSH_WORKER_MODE}
+    conn = get_db_connection()
+    if not conn:
+        return stats
+    cursor = None
+    try:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT status, COUNT(*) AS cnt,
+                   TIMESTAMPDIFF(SECOND, MIN(created_at), NOW()) AS oldest
+            FROM push_outbox WHERE status IN ('pending', 'sending')
+            GROUP BY status
+        """)
+        for r in cursor.fetchall():
+            stats[r['status']] = int(r['cnt'])
+            if r['status'] == 'pending':
+                stats['oldest_pending_seconds'] = int(r['oldest'] or 0)
+        cursor.execute("""
+            SELECT SUM(status = 'done') AS done_cnt, SUM(status = 'failed') AS failed_cnt,
+                   AVG(TIMESTAMPDIFF(SECOND, created_at, finished_at)) AS avg_latency,
+                   MAX(TIMESTAMPDIFF(SECOND, created_at, finished_at)) AS max_latency
+            FROM push_outbox WHERE finished_at >= NOW() - INTERVAL 1 HOUR
+        """)
+        r = cursor.fetchone()
+        if r:
+            stats['done_1h'] = int(r['done_cnt'] or 0)
+            stats['failed_1h'] = int(r['failed_cnt'] or 0)
+            if r['avg_latency'] is not None:
+                stats['avg_latency_seconds'] = round(float(r['avg_latency']), 1)
+                stats['max_latency_seconds'] = int(r['max_latency'])
+        return stats
+    except Exception as e:
+        print(f"[PushOutbox] 통계 오류: {e}")
+        return stats
+    finally:
+        if cursor: cursor.close()
+        conn.close()
+
+
+if __name__ == '__main__':
+    if '--once' in sys.argv:
+        print(f"[PushOutbox] 처리: {process_outbox(housekeeping=True)}건")
+    else:
+        print("[PushOutbox] 발송 워커 시작")
+        run_worker()
@@ -0,0 +1,173 @@
+"""
+메시지 대화방 목록 요약 (message.py / messenger.py 공용)
+- message_rooms에 마지막 메시지(id/미리보기/발신자/시각)를 저장해 두고 목록 조회 시 그대로 읽음
+  → 방마다 messages를 다시 훑는 상관 서브쿼리 없음 (대화 이력이 늘어도 목록 조회 비용 일정)
+- 메시지 INSERT 직후 touch_room, 삭제 직후 refresh_room_summary 호출 (caller 트랜잭션 안, commit은 caller가)
+- 멤버 목록은 방 id 목록으로 한 번에 조회 (attach_members)
+- 안 읽은 수: message_room_members.unread_count 카운터 (전송 시 다른 멤버 +1, 읽음 시 0)
+  → 변경분은 호출자가 수신자 member 채널에 'unread' 이벤트로 발행 (utils/message_bus)
+  → 배지 합계는 내 멤버 행 SUM 한 번 (messages 전체 JOIN 없음)
+"""
+
+PREVIEW_LENGTH = 200
+
+
+def _preview(content, file_name=None):
+    text = (content or '').strip()
+    if not text and file_name:
+        text = f'[파일] {file_name}'
+    return text[:PREVIEW_LENGTH]
+
+
+# ============================================
+# 갱신
+# ============================================
+def touch_room(cursor, room_id, message_id, content, sender_name, file_name=None):
+    """새 메시지를 방 요약에 반영 (늦게 커밋된 이전 메시지가 최신 요약을 덮지 않도록 id 비교)"""
+    cursor.execute("""
+        UPDATE message_rooms
+        SET last_message_id = %s, last_message_preview = %s,
+            last_sender_name = %s,
+            last_message_at = (SELECT created_at FROM messages WHERE id = %s)
+        WHERE id = %s AND (last_message_id IS NULL OR last_message_id < %s)
+    """, (message_id, _preview(content, file_name), sender_name, message_id, room_id, message_id))
+
+
+def refresh_room_summary(cursor, room_id):
+    """삭제 등으로 마지막 메시지가 바뀔 수 있을 때: 삭제되지 않은 최신 메시지로 요약 재계산 (핫 테이블에 없으면 보관분)"""
+    last = None
+    for table in ('messages', 'messages_archive'):
+        cursor.execute(f"""
+            SELECT id, content, file_name, sender_name, created_at FROM {table}
+            WHERE room_id = %s AND is_deleted = 0
+            ORDER BY id DESC LIMIT 1
+        """, (room_id,))
+        last = cursor.fetchone()
+        if last:
+            break
+    if last:
+        cursor.execute("""
+            UPDATE message_rooms
+            SET last_message_id = %s, last_message_preview = %s,
+                last_sender_name = %s, last_message_at = %s
+            WHERE id = %s
+        """, (last['id'], _preview(last['content'], last['file_name']),
+              last['sender_name'], last['created_at'], room_id))
+    else:
+        cursor.execute("""
+            UPDATE message_rooms
+            SET last_message_id = NULL, last_message_preview = NULL,
+                last_sender_name = NULL, last_message_at = NULL
+            WHERE id = %s
+        """, (room_id,))
+
+
+# ============================================
+# 안 읽은 수 카운터
+# ============================================
+def bump_unread(cursor, room_id, sender_id):
+    """
+    새 메시지: 발신자를 뺀 활성 멤버 전원 +1 (UPDATE 1회)
+    → 올린 멤버 id 목록 (안 읽은 수 이벤트/푸시 수신 대상으로 재사용)
+    """
+    cursor.execute("""
+        SELECT member_id FROM message_room_members
+        WHERE room_id = %s AND member_id != %s AND is_active = 1
+    """, (room_id, sender_id))
+    recipients = [r['member_id'] for r in cursor.fetchall()]
+    if recipients:
+        cursor.execute("""
+            UPDATE message_room_members SET unread_count = unread_count + 1
+            WHERE room_id = %s AND member_id != %s AND is_active = 1
+        """, (room_id, sender_id))
+    return recipients
+
+
+def mark_room_read(cursor, room_id, member_id):
+    """읽음 처리: last_read_at 갱신 + 카운터 0"""
+    cursor.execute("""
+        UPDATE message_room_members SET last_read_at = NOW(), unread_count = 0
+        WHERE room_id = %s AND member_id = %s AND is_active = 1
+    """, (room_id, member_id))
+
+
+def drop_unread(cursor, room_id, sender_id, created_at):
+    """메시지 삭제: 아직 그 메시지를 읽지 않은 멤버만 -1"""
+    cursor.execute("""
+        UPDATE message_room_members SET unread_count = unread_count - 1
+        WHERE room_id = %s AND member_id != %s AND is_active = 1 AND unread_count > 0
+          AND COALESCE(last_read_at, joined_at) < %s
+    """, (room_id, sender_id, created_at))
+
+
+def total_unread(cursor, member_id, room_types=None):
+    """배지용 안 읽은 수 합계"""
+    type_sql = ''
+    params = []
+    if room_types:
+        type_sql = f" AND r.room_type IN ({','.join(['%s'] * len(room_types))})"
+        params += list(room_types)
+    params.append(member_id)
+    cursor.execute(f"""
+        SELECT COALESCE(SUM(rm.unread_count), 0) AS total_unread
+        FROM message_room_members rm
+        JOIN message_rooms r ON r.id = rm.room_id AND r.is_active = 1{type_sql}
+        WHERE rm.member_id = %s AND rm.is_active = 1 AND rm.unread_count > 0
+    """, params)
+    row = cursor.fetchone()
+    return int(row['total_unread'] or 0) if row else 0
+
+
+# ============================================
+# 조회
+# ============================================
+def list_rooms(cursor, member_id, school_id, room_types=None, limit=30, offset=0):
+    """
+    내 대화방 목록 (최근 메시지순).
+    반환 행: id, room_type, room_title, announcement_only, created_at, is_active, is_admin,
+            last_read_at, unread_count, last_message, last_sender, last_msg_time
+    """
+    type_sql = ''
+    params = [member_id, school_id]
+    if room_types:
+        type_sql = f" AND r.room_type IN ({','.join(['%s'] * len(room_types))})"
+        params += list(room_types)
+    params += [limit, offset]
+    cursor.execute(f"""
+        SELECT r.id, r.room_type, r.room_title, r.announcement_only,
+               r.created_at, r.is_active,
+               rm.is_admin, rm.last_read_at, rm.unread_count,
+               r.last_message_preview AS last_message,
+               r.last_sender_name AS last_sender,
+               r.last_message_at AS last_msg_time
+        FROM message_room_members rm
+        JOIN message_rooms r ON r.id = rm.room_id
+        WHERE rm.member_id = %s AND rm.is_active = 1
+          AND r.school_id = %s AND r.is_active = 1{type_sql}
+        ORDER BY COALESCE(r.last_message_at, r.created_at) DESC, r.id DESC
+        LIMIT %s OFFSET %s
+    """, params)
+    return cursor.fetchall()
+
+
+def attach_members(cursor, rooms, exclude_member_id=None, per_room_limit=None):
+    """rooms 각 행에 'members' 목록 첨부 — 방 수와 관계없이 쿼리 1회"""
+    for room in rooms:
+        room['members'] = []
+    if not rooms:
+        return rooms
+    by_id = {room['id']: room for room in rooms}
+    ids = list(by_id)
+    cursor.execute(f"""
+        SELECT room_id, member_id, member_name, member_role, is_admin
+        FROM message_room_members
+        WHERE room_id IN ({','.join(['%s'] * len(ids))}) AND is_active = 1
+        ORDER BY room_id, id
+    """, ids)
+    for m in cursor.fetchall():
+        if exclude_member_id and m['member_id'] == exclude_member_id:
+            continue
+        members = by_id[m.pop('room_id')]['members']
+        if per_room_limit is None or len(members) < per_room_limit:
+            members.append(m)
+    return rooms
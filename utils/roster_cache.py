@@ -0,0 +1,193 @@
+"""
+SchoolUs 학교별 명단(roster) 캐시
+- tea_all / stu_all / fm_all / message_users를 학교 단위로 한 번 읽어 워커 메모리에 보관
+- id / (학년, 반) / 이름 인덱스 → 명단 기반 조회(이름→ID 매핑, 대상 인원 수 등)를 메모리 연산으로 처리
+- 명단을 바꾸는 라우트는 커밋 후 invalidate_roster(school_id, ...) 호출 (write-through 무효화)
+
+워커 간 무효화: utils.cache_version의 학교별 버전 비교 (Redis 또는 /dev/shm 버전 파일)
+- 버전과 무관하게 SCHOOLUS_ROSTER_CACHE_TTL(초, 기본 300) 경과 시 재조회 (안전장치)
+"""
+
+import os
+import time
+import threading
+
+from utils.db import get_db_connection
+from utils.cache_version import get_version, bump_version, backend_name
+
+ROSTER_CACHE_TTL = int(os.environ.get('SCHOOLUS_ROSTER_CACHE_TTL', '300'))
+
+# 종류별 조회 SQL — 자주 바뀌는 값(point 등)과 연락처는 담지 않음
+_ROSTER_QUERIES = {
+    'students': """
+        SELECT id, member_id, member_name, class_grade, class_no, class_num
+        FROM stu_all WHERE school_id = %s
+        ORDER BY class_grade, class_no, class_num_sort, class_num
+    """,
+    'teachers': """
+        SELECT id, member_id, member_name, member_school, member_birth,
+               department, department_position, class_grade, class_no
+        FROM tea_all WHERE school_id = %s
+        ORDER BY member_name
+    """,
+    'parents': """
+        SELECT id, member_id, member_name, child_name, class_grade, class_no, class_num
+        FROM fm_all WHERE school_id = %s
+        ORDER BY class_grade, class_no, class_num_sort, class_num
+    """,
+    'message_users': """
+        SELECT member_id, member_name, member_role, class_grade, class_no, class_num, parent_of_name
+        FROM message_users WHERE school_id = %s
+        ORDER BY member_role, member_name
+    """,
+}
+ROSTER_KINDS = tuple(_ROSTER_QUERIES)
+_KIND_TABLES = {'students': 'stu_all', 'teachers': 'tea_all', 'parents': 'fm_all'}
+
+
+# ============================================
+# 명단 인덱스
+# ============================================
+class Roster:
+    """한 학교·한 종류의 명단 + 인덱스 (읽기 전용으로 사용)"""
+
+    __slots__ = ('rows', 'by_member_id', 'by_class', 'by_name', 'version', 'loaded_at')
+
+    def __init__(self, rows, version):
+        self.rows = rows
+        self.by_member_id = {}
+        self.by_class = {}
+        self.by_name = {}
+        for r in rows:
+            if r.get('member_id'):
+                self.by_member_id.setdefault(r['member_id'], r)
+            if r.get('class_grade') and r.get('class_no'):
+                key = (str(r['class_grade']), str(r['class_no']))
+                self.by_class.setdefault(key, []).append(r)
+            if r.get('member_name'):
+                self.by_name.setdefault(r['member_name'], []).append(r)
+        self.version = version
+        self.loaded_at = time.time()
+
+    def get(self, member_id):
+        return self.by_member_id.get(member_id)
+
+    def in_class(self, class_grade, class_no):
+        return self.by_class.get((str(class_grade), str(class_no)), [])
+
+    def named(self, member_name):
+        return self.by_name.get(member_name, [])
+
+    def name_to_id(self):
+        """이름 → member_id (동명이인은 먼저 조회된 쪽, member_id 없는 행 제외)"""
+        mapping = {}
+        for r in self.rows:
+            name = r.get('member_name')
+            if r.get('member_id') and name and name not in mapping:
+                mapping[name] = r['member_id']
+        return mapping
+
+    def count(self, grades=None, role=None):
+        """인원 수. grades: 학년 목록(None=전체), role: message_users의 member_role 필터"""
+        grade_set = {str(gr) for gr in grades} if grades else None
+        n = 0
+        for r in self.rows:
+            if role and r.get('member_role') != role:
+                continue
+            if grade_set is not None and str(r.get('class_grade')) not in grade_set:
+                continue
+            n += 1
+        return n
+
+
+# ============================================
+# 캐시 조회 / 무효화
+# ============================================
+_cache_lock = threading.Lock()
+_cache = {}
+
+
+def _load(cursor, school_id, kind):
+    cursor.execute(_ROSTER_QUERIES[kind], (school_id,))
+    return list(cursor.fetchall())
+
+
+def get_roster(school_id, kind, cursor=None):
+    """
+    학교 명단 반환 (Roster). DB 오류 시 None.
+
+    Args:
+        school_id: 학교 ID
+        kind: 'students' | 'teachers' | 'parents' | 'message_users'
+        cursor: 이미 열린 커서가 있으면 재사용 (없으면 새 커넥션)
+    """
+    if kind not in _ROSTER_QUERIES:
+        raise ValueError(f"알 수 없는 명단 종류: {kind}")
+    if not school_id:
+        return None
+    school_id = str(school_id)
+    key = (school_id, kind)
+    version = get_version('roster', f"{school_id}.{kind}")
+
+    cached = _cache.get(key)
+    if cached and cached.version == version and time.time() - cached.loaded_at < ROSTER_CACHE_TTL:
+        return cached
+
+    try:
+        if cursor is not None:
+            rows = _load(cursor, school_id, kind)
+        else:
+            conn = get_db_connection()
+            if not conn:
+                return cached
+            try:
+                cur = conn.cursor()
+                rows = _load(cur, school_id, kind)
+                cur.close()
+            finally:
+                conn.close()
+    except Exception as e:
+        print(f"[Roster] {kind} 명단 조회 오류 (school_id={school_id}): {e}")
+        return cached
+
+    roster = Roster(rows, version)
+    with _cache_lock:
+        _cache[key] = roster
+    return roster
+
+
+def invalidate_roster(school_id, *kinds):
+    """
+    명단 변경 후 호출 (커밋 이후). kinds 생략 시 tea/stu/fm 명단 전체
+    올린 명단 버전은 푸시 대상 세그먼트(utils/push_audience)도 다음 발송 때 비교해 재구성
+    """
+    if not school_id:
+        return
+    school_id = str(school_id)
+    for kind in kinds or ('students', 'teachers', 'parents'):
+        bump_version('roster', f"{school_id}.{kind}")
+        with _cache_lock:
+            _cache.pop((school_id, kind), None)
+
+
+def roster_schools(cursor, kind, key_column, keys):
+    """
+    명단 행(key_column IN keys)이 실제로 속한 school_id 목록 — invalidate_roster 대상 확인용
+    (요청 본문의 school_id가 빠지거나 틀려도 바뀐 행의 학교를 무효화)
+    """
+    keys = [k for k in keys if k]
+    if not keys:
+        return []
+    fmt = ','.join(['%s'] * len(keys))
+    cursor.execute(f"SELECT DISTINCT school_id FROM {_KIND_TABLES[kind]} WHERE {key_column} IN ({fmt})", keys)
+    return [r['school_id'] for r in cursor.fetchall() if r['school_id']]
+
+
+def get_roster_cache_stats():
+    """워커 프로세스 단위 캐시 현황"""
+    with _cache_lock:
+        return {
+            'entries': len(_cache),
+            'rows': sum(len(r.rows) for r in _cache.values()),
+            'backend': backend_name(),
+        }
@@ -0,0 +1,279 @@
+"""
+SchoolUs SQL 계측 / N+1 탐지기
+- utils.db.get_db_connection을 감싸 요청별 쿼리 수, 총/최장 실행시간, 반복 쿼리 형태를 기록
+- 같은 형태의 쿼리가 한 요청에서 N+1 임계값 이상 반복되면 N+1 의심으로 표시
+- 디버그 모드: 응답 헤더(X-SQL-*)로 요청별 통계 노출
+- 엔드포인트별 누적 리포트: GET /api/debug/sql-report, 초기화: POST /api/debug/sql-report/reset
+  (워커 프로세스 단위 집계, 서버 운영자만 — SCHOOLUS_SQL_REPORT_ADMINS에 등록한 member_id)
+
+활성화: SCHOOLUS_SQL_PROFILE=true 환경변수 설정 후 재시작
+"""
+
+import os
+import re
+import time
+import threading
+from collections import Counter
+
+from flask import g, has_request_context, request, jsonify, session
+
+import utils.db
+
+SQL_PROFILE_ENABLED = os.environ.get('SCHOOLUS_SQL_PROFILE', 'false').lower() == 'true'
+# 리포트 조회/초기화 가능한 운영자 member_id (쉼표 구분, 비우면 아무도 접근 불가)
+SQL_REPORT_ADMINS = {m.strip() for m in os.environ.get('SCHOOLUS_SQL_REPORT_ADMINS', '').split(',') if m.strip()}
+
+_N_PLUS_ONE_THRESHOLD = 5       # 같은 형태 쿼리가 요청당 이 횟수 이상이면 N+1 의심
+_SLOW_QUERY_MS = 500            # 이 시간 이상 걸린 쿼리는 로그 출력
+_MAX_SHAPE_LEN = 300            # 리포트에 남길 쿼리 형태 최대 길이
+
+# ============================================
+# 쿼리 형태 정규화
+# ============================================
+_RE_STRING = re.compile(r"'(?:[^'\\]|\\.)*'")
+_RE_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_RE_PLACEHOLDER_LIST = re.compile(r'\(\s*(?:(?:%s|\?)\s*,\s*)+(?:%s|\?)\s*\)')
+_RE_WS = re.compile(r'\s+')
+
+
+def normalize_query(query):
+    """파라미터/리터럴을 제거한 쿼리 형태 반환 (IN 목록 길이 차이도 같은 형태로 취급)"""
+    if isinstance(query, bytes):
+        query = query.decode('utf-8', 'replace')
+    shape = _RE_STRING.sub('?', str(query))
+    shape = _RE_NUMBER.sub('?', shape)
+    shape = _RE_PLACEHOLDER_LIST.sub('(...)', shape)
+    shape = _RE_WS.sub(' ', shape).strip()
+    return shape[:_MAX_SHAPE_LEN]
+
+
+# ============================================
+# 요청별 통계
+# ============================================
+class RequestSqlStats:
+    """한 요청 동안 실행된 쿼리 통계"""
+
+    __slots__ = ('count', 'total_ms', 'slowest_ms', 'slowest_sql', 'shapes')
+
+    def __init__(self):
+        self.count = 0
+        self.total_ms = 0.0
+        self.slowest_ms = 0.0
+        self.slowest_sql = ''
+        self.shapes = Counter()
+
+    def record(self, query, elapsed_ms):
+        shape = normalize_query(query)
+        self.count += 1
+        self.total_ms += elapsed_ms
+        self.shapes[shape] += 1
+        if elapsed_ms > self.slowest_ms:
+            self.slowest_ms = elapsed_ms
+            self.slowest_sql = shape
+
+    def n_plus_one(self):
+        """N+1 의심 형태 목록 [(shape, count), ...]"""
+        return [(s, c) for s, c in self.shapes.most_common() if c >= _N_PLUS_ONE_THRESHOLD]
+
+
+def _current_stats():
+    if not has_request_context():
+        return None
+    stats = getattr(g, '_sql_stats', None)
+    if stats is None:
+        stats = RequestSqlStats()
+        g._sql_stats = stats
+    return stats
+
+
+def _record(query, elapsed_ms):
+    stats = _current_stats()
+    if stats is None:
+        return
+    stats.record(query, elapsed_ms)
+    if elapsed_ms >= _SLOW_QUERY_MS:
+        print(f"[SQL] 느린 쿼리 {elapsed_ms:.1f}ms path={request.path}: {normalize_query(query)[:150]}")
+
+
+# ============================================
+# 커서/커넥션 래퍼
+# ============================================
+class ProfiledCursor:
+    """execute/executemany 시간을 기록하는 커서 프록시 (나머지는 원본 커서에 위임)"""
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def execute(self, query, args=None):
+        start = time.perf_counter()
+        try:
+            return self._cursor.execute(query, args)
+        finally:
+            _record(query, (time.perf_counter() - start) * 1000)
+
+    def executemany(self, query, args):
+        start = time.perf_counter()
+        try:
+            return self._cursor.executemany(query, args)
+        finally:
+            _record(query, (time.perf_counter() - start) * 1000)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self._cursor.close()
+
+
+class ProfiledConnection:
+    """cursor()가 ProfiledCursor를 반환하는 커넥션 프록시"""
+
+    def __init__(self, conn):
+        self._conn = conn
+
+    def cursor(self, *args, **kwargs):
+        return ProfiledCursor(self._conn.cursor(*args, **kwargs))
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self._conn.close()
+
+
+# ============================================
+# 엔드포인트별 누적 리포트 (워커 프로세스 단위)
+# ============================================
+_report_lock = threading.Lock()
+_endpoint_report = {}
+
+
+def _aggregate(endpoint, stats):
+    with _report_lock:
+        entry = _endpoint_report.get(endpoint)
+        if entry is None:
+            entry = {'requests': 0, 'queries': 0, 'total_ms': 0.0, 'max_request_ms': 0.0,
+                     'slowest_ms': 0.0, 'slowest_sql': '', 'n_plus_one_requests': 0,
+                     'n_plus_one_shapes': Counter()}
+            _endpoint_report[endpoint] = entry
+        entry['requests'] += 1
+        entry['queries'] += stats.count
+        entry['total_ms'] += stats.total_ms
+        entry['max_request_ms'] = max(entry['max_request_ms'], stats.total_ms)
+        if stats.slowest_ms > entry['slowest_ms']:
+            entry['slowest_ms'] = stats.slowest_ms
+            entry['slowest_sql'] = stats.slowest_sql
+        suspects = stats.n_plus_one()
+        if suspects:
+            entry['n_plus_one_requests'] += 1
+            for shape, cnt in suspects:
+                entry['n_plus_one_shapes'][shape] = max(entry['n_plus_one_shapes'][shape], cnt)
+
+
+def get_sql_report(limit=50):
+    """엔드포인트별 통계를 총 DB 시간 내림차순으로 반환"""
+    with _report_lock:
+        rows = []
+        for endpoint, e in _endpoint_report.items():
+            rows.append({
+                'endpoint': endpoint,
+                'requests': e['requests'],
+                'queries': e['queries'],
+                'avg_queries': round(e['queries'] / e['requests'], 1) if e['requests'] else 0,
+                'total_ms': round(e['total_ms'], 1),
+                'avg_ms': round(e['total_ms'] / e['requests'], 1) if e['requests'] else 0,
+                'max_request_ms': round(e['max_request_ms'], 1),
+                'slowest_ms': round(e['slowest_ms'], 1),
+                'slowest_sql': e['slowest_sql'],
+                'n_plus_one_requests': e['n_plus_one_requests'],
+                'n_plus_one_shapes': [{'sql': s, 'max_count': c}
+                                      for s, c in e['n_plus_one_shapes'].most_common(5)],
+            })
+    rows.sort(key=lambda r: r['total_ms'], reverse=True)
+    return rows[:limit]
+
+
+def reset_sql_report():
+    with _report_lock:
+        _endpoint_report.clear()
+
+
+# ============================================
+# Flask 연동
+# ============================================
+def init_sql_profiler(app):
+    """
+    utils.db.get_db_connection을 계측 버전으로 교체하고 요청 훅을 등록.
+    블루프린트 import 이전에 호출해야 각 라우트의 `from utils.db import get_db_connection`에 반영됨.
+    """
+    if not SQL_PROFILE_ENABLED:
+        return
+
+    original = utils.db.get_db_connection
+    if getattr(original, '_sql_profiled', False):
+        return
+
+    def profiled_get_db_connection(*args, **kwargs):
+        conn = original(*args, **kwargs)
+        if not conn or not has_request_context():
+            return conn
+        return ProfiledConnection(conn)
+
+    profiled_get_db_connection._sql_profiled = True
+    utils.db.get_db_connection = profiled_get_db_connection
+
+    expose_header = app.debug or os.environ.get('FLASK_DEBUG', 'False').lower() == 'true'
+
+    @app.after_request
+    def _sql_profile_after_request(response):
+        stats = getattr(g, '_sql_stats', None)
+        if stats is None or stats.count == 0:
+            return response
+        try:
+            endpoint = request.url_rule.rule if request.url_rule else request.path
+            _aggregate(f"{request.method} {endpoint}", stats)
+            suspects = stats.n_plus_one()
+            if suspects:
+                shape, cnt = suspects[0]
+                print(f"[SQL] N+1 의심: {request.method} {endpoint} "
+                      f"queries={stats.count} repeat={cnt} sql={shape[:150]}")
+            if expose_header:
+                response.headers['X-SQL-Queries'] = str(stats.count)
+                response.headers['X-SQL-Time-Ms'] = f"{stats.total_ms:.1f}"
+                response.headers['X-SQL-Slowest-Ms'] = f"{stats.slowest_ms:.1f}"
+                response.headers['X-SQL-N-Plus-One'] = str(len(suspects))
+        except Exception as e:
+            print(f"[SQL] profiler after_request 오류: {e}")
+        return response
+
+    def _is_report_admin():
+        # 프로세스 전체 쿼리 형태가 보이므로 학교 교사가 아닌 서버 운영자로 제한
+        return session.get('user_id') in SQL_REPORT_ADMINS
+
+    @app.route('/api/debug/sql-report', methods=['GET'])
+    def sql_report():
+        if not _is_report_admin():
+            return jsonify({'success': False, 'message': '권한이 없습니다.'}), 403
+        try:
+            limit = max(1, min(200, int(request.args.get('limit', 50))))
+        except (TypeError, ValueError):
+            limit = 50
+        return jsonify({'success': True, 'pid': os.getpid(), 'endpoints': get_sql_report(limit)})
+
+    @app.route('/api/debug/sql-report/reset', methods=['POST'])
+    def sql_report_reset():
+        if not _is_report_admin():
+            return jsonify({'success': False, 'message': '권한이 없습니다.'}), 403
+        reset_sql_report()
+        return jsonify({'success': True, 'endpoints': []})
+
+    print("[SQL] 쿼리 계측 활성화됨 (SCHOOLUS_SQL_PROFILE=true)")
@@ -0,0 +1,221 @@
+"""
+학생 개인 주간 시간표 물리화 (timetable_stu_week)
+- 원반 시간표(timetable, 없으면 timetable_tea) + 선택과목 교육반(timetable_stu_group)
+  + 밴드 시간대(timetable_band_slots) 오버레이 결과를 학생당 한 행으로 저장
+- 학생 행: stu_all 기준 (stu_id, member_id, 이름), 학급 행: member_id='' / stu_id NULL (오버레이 없는 원반)
+- 시간표 입력이 바뀌는 쓰기 경로에서 rebuild_student_weeks(cursor, school_id[, grade[, class_no]]) 호출
+  (caller 트랜잭션 안에서 실행, commit은 caller가. 오류는 그대로 전파 → caller가 rollback해야
+   삭제만 되고 다시 채워지지 않은 상태가 커밋되지 않음)
+- 조회 API는 키 조회 한 번으로 응답, 행이 없으면 기존 실시간 계산으로 폴백
+- 최초 적재: python -m utils.student_week
+
+저장 형식 (JSON 배열, 항목당 [요일, 교시, 과목, 교사, 교육반, 밴드] — 비선택 수업은 교육반/밴드 null)
+"""
+
+import json
+
+from utils.db_batch import bulk_insert
+
+
+# ============================================
+# 오버레이 / 인코딩
+# ============================================
+def overlay_week(base_rows, period_band_map, stu_groups):
+    """원반 시간표 행에 학생 교육반 오버레이 → 압축 항목 목록"""
+    items = []
+    for item in base_rows:
+        p = str(item['period'])
+        day = item['day_of_week']
+        band = period_band_map.get(f"{day}_{p}") if stu_groups else None
+        if band and band in stu_groups:
+            sg = stu_groups[band]
+            items.append([day, item['period'], sg['subject'], sg['teacher_name'], sg['group_no'], band])
+        else:
+            items.append([day, item['period'], item['subject'], item['member_name'] or '', None, None])
+    return items
+
+
+def decode_week(blob):
+    """저장된 JSON → API 응답 형식 항목 목록"""
+    result = []
+    for day, period, subject, member_name, group_no, band in json.loads(blob):
+        entry = {
+            'period': period,
+            'subject': subject,
+            'member_name': member_name,
+            'day_of_week': day,
+            'is_elective': band is not None
+        }
+        if band is not None:
+            entry['group_no'] = group_no
+            entry['band'] = band
+        result.append(entry)
+    return result
+
+
+def _encode(items):
+    return json.dumps(items, ensure_ascii=False, separators=(',', ':'))
+
+
+# ============================================
+# 일괄 재생성
+# ============================================
+def _grade_filter(grade, column='grade'):
+    return (f" AND {column}=%s", [grade]) if grade else ('', [])
+
+
+def _class_filter(grade, class_no, grade_column='grade', class_column='class_no'):
+    """학년(+반) 조건. class_no는 grade가 있을 때만 적용"""
+    where, params = _grade_filter(grade, grade_column)
+    if grade and class_no:
+        where += f" AND {class_column}=%s"
+        params = params + [class_no]
+    return where, params
+
+
+def _load_base_rows(cursor, school_id, grade, class_no=None):
+    """{(grade, class_no): [행...]} — timetable 우선, 없는 학급은 timetable_tea"""
+    where, params = _class_filter(grade, class_no)
+    by_class = {}
+    for table in ('timetable', 'timetable_tea'):
+        cursor.execute(f"""
+            SELECT grade, class_no, period, subject, member_name, day_of_week
+            FROM {table}
+            WHERE school_id=%s{where} AND day_of_week IN ('월','화','수','목','금')
+            ORDER BY grade, class_no, day_of_week, CAST(period AS UNSIGNED)
+        """, [school_id] + params)
+        table_rows = {}
+        for r in cursor.fetchall():
+            table_rows.setdefault((str(r['grade']), str(r['class_no'])), []).append(r)
+        for key, rows in table_rows.items():
+            by_class.setdefault(key, rows)
+    return by_class
+
+
+def rebuild_student_weeks(cursor, school_id, grade=None, class_no=None):
+    """
+    학교(또는 학년, 학급) 학생 주간 시간표 재생성. 저장한 행 수 반환
+    오류는 caller로 전파 (caller 트랜잭션을 rollback해야 함)
+    """
+    if not school_id:
+        return 0
+    grade = str(grade) if grade else None
+    class_no = str(class_no) if grade and class_no else None
+    try:
+        base_by_class = _load_base_rows(cursor, school_id, grade, class_no)
+
+        where, params = _grade_filter(grade)
+        cursor.execute(f"""
+            SELECT grade, band, period, day_of_week
+            FROM timetable_band_slots
+            WHERE school_id=%s{where} AND day_of_week IN ('월','화','수','목','금')
+        """, [school_id] + params)
+        band_maps = {}
+        for r in cursor.fetchall():
+            band_maps.setdefault(str(r['grade']), {})[f"{r['day_of_week']}_{r['period']}"] = r['band']
+
+        cursor.execute(f"""
+            SELECT grade, member_id, subject, group_no, band, teacher_name
+            FROM timetable_stu_group
+            WHERE school_id=%s{where}
+        """, [school_id] + params)
+        groups = {}
+        for r in cursor.fetchall():
+            groups.setdefault((str(r['grade']), r['member_id']), {})[r['band']] = r
+
+        where_stu, params_stu = _class_filter(grade, class_no, 'class_grade', 'class_no')
+        cursor.execute(f"""
+            SELECT id, member_id, member_name, class_grade, class_no
+            FROM stu_all
+            WHERE school_id=%s{where_stu} AND class_grade IS NOT NULL AND class_no IS NOT NULL
+        """, [school_id] + params_stu)
+        students = cursor.fetchall()
+
+        rows = []
+        for (g, c), base_rows in base_by_class.items():
+            rows.append((school_id, g, c, None, '', None, _encode(overlay_week(base_rows, {}, {}))))
+        for s in students:
+            key = (str(s['class_grade']), str(s['class_no']))
+            base_rows = base_by_class.get(key)
+            if not base_rows:
+                continue
+            member_id = s['member_id'] or ''
+            stu_groups = groups.get((key[0], member_id), {}) if member_id else {}
+            items = overlay_week(base_rows, band_maps.get(key[0], {}), stu_groups)
+            rows.append((school_id, key[0], key[1], s['id'], member_id, s['member_name'], _encode(items)))
+
+        where_week, params_week = _class_filter(grade, class_no)
+        cursor.execute(f"DELETE FROM timetable_stu_week WHERE school_id=%s{where_week}",
+                       [school_id] + params_week)
+        return bulk_insert(
+            cursor, 'timetable_stu_week',
+            ['school_id', 'grade', 'class_no', 'stu_id', 'member_id', 'student_name', 'timetable'],
+            rows, const_values={'built_at': 'NOW()'})
+    except Exception as e:
+        print(f"[StudentWeek] 재생성 오류 (school_id={school_id}, grade={grade}, class_no={class_no}): {e}")
+        raise
+
+
+# ============================================
+# 조회
+# ============================================
+def find_student_week(cursor, school_id, grade, class_no, member_id=None, stu_id=None):
+    """학생 한 명의 물리화 행 (없으면 None → caller가 실시간 계산으로 폴백)"""
+    try:
+        if member_id:
+            cursor.execute("""
+                SELECT member_id, student_name, timetable FROM timetable_stu_week
+                WHERE school_id=%s AND grade=%s AND class_no=%s AND member_id=%s LIMIT 1
+            """, (school_id, grade, class_no, member_id))
+        elif stu_id:
+            cursor.execute("""
+                SELECT member_id, student_name, timetable FROM timetable_stu_week
+                WHERE school_id=%s AND stu_id=%s AND grade=%s AND class_no=%s LIMIT 1
+            """, (school_id, stu_id, grade, class_no))
+        else:
+            return None
+        return cursor.fetchone()
+    except Exception as e:
+        print(f"[StudentWeek] 조회 오류: {e}")
+        return None
+
+
+def load_class_weeks(cursor, school_id, grade, class_no):
+    """학급 전체 물리화 행 → (학급 행, {stu_id: 행}, {member_id: 행})"""
+    class_row = None
+    by_stu_id = {}
+    by_member_id = {}
+    try:
+        cursor.execute("""
+            SELECT stu_id, member_id, student_name, timetable FROM timetable_stu_week
+            WHERE school_id=%s AND grade=%s AND class_no=%s
+        """, (school_id, grade, class_no))
+        rows = cursor.fetchall()
+    except Exception as e:
+        print(f"[StudentWeek] 학급 조회 오류: {e}")
+        return class_row, by_stu_id, by_member_id
+    for r in rows:
+        if r['stu_id'] is None and not r['member_id']:
+            class_row = r
+            continue
+        if r['stu_id'] is not None:
+            by_stu_id[str(r['stu_id'])] = r
+        if r['member_id']:
+            by_member_id.setdefault(r['member_id'], r)
+    return class_row, by_stu_id, by_member_id
+
+
+if __name__ == '__main__':
+    # 최초 적재/전체 재생성: python -m utils.student_week
+    from utils.db import get_db_connection
+    conn = get_db_connection()
+    cur = conn.cursor()
+    cur.execute("SELECT DISTINCT school_id FROM timetable UNION SELECT DISTINCT school_id FROM timetable_tea")
+    for sid in [r['school_id'] for r in cur.fetchall() if r['school_id']]:
+        try:
+            print(f"[StudentWeek] {sid}: {rebuild_student_weeks(cur, sid)}행")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+    cur.close()
+    conn.close()
@@ -0,0 +1,160 @@
+"""
+이미지 첨부 썸네일 (채팅 말풍선/목록 미리보기용)
+- 업로드 직후 schedule_thumbnails(remote_path) → 워커 스레드 풀에서 생성 (요청 응답은 기다리지 않음)
+- 크기: 's' 작은 미리보기(목록), 'm' 중간(말풍선). 원본 옆에 '{원본경로}.thumb_{크기}.jpg'로 저장
+- 원본은 디스크 캐시(utils/file_cache)에서 읽음 → 업로드 시 store_cached_file로 미리 넣어 두면 SFTP 재다운로드 없음
+- Pillow 미설치 시 생성하지 않음 (THUMBNAILS_ENABLED=False, 썸네일 API는 원본으로 대체)
+- 디코딩 실패(지원하지 않는 형식/손상/과대 이미지)는 경로별 표시 파일로 FAILED_TTL_SECONDS 동안 기억
+  → thumbnail_failed()가 True면 썸네일 조회/재생성 없이 바로 원본 (조회할 때마다 다운로드·디코딩 반복 방지)
+  원본 읽기/업로드 실패(SFTP 장애 등 일시적 오류)는 표시하지 않음 → 다음 조회 때 다시 생성
+"""
+
+import io
+import os
+import time
+import hashlib
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    from PIL import Image, ImageOps, UnidentifiedImageError
+    _DECODE_ERRORS = (UnidentifiedImageError, Image.DecompressionBombError, OSError)
+except ImportError:
+    Image = None
+    ImageOps = None
+    _DECODE_ERRORS = ()
+
+from utils.file_cache import read_cached_file, store_cached_file
+
+THUMBNAILS_ENABLED = Image is not None
+
+THUMB_SIZES = {'s': 160, 'm': 640}   # 긴 변 기준 px
+FAILED_TTL_SECONDS = int(os.environ.get('SCHOOLUS_THUMB_FAILED_TTL', str(7 * 24 * 3600)))
+_FAILED_DIR = os.environ.get('SCHOOLUS_THUMB_FAILED_DIR') or os.path.join(
+    tempfile.gettempdir(), 'schoolus_thumb_failed')
+_JPEG_QUALITY = 80
+_POOL_WORKERS = 2                     # 디코딩은 CPU를 많이 쓰므로 워커당 2개로 제한
+
+_pool = None
+_pool_lock = threading.Lock()
+_pending = set()                      # 생성 중인 원본 경로 (같은 파일 중복 작업 방지)
+
+
+def thumb_path(remote_path, size):
+    return f"{remote_path}.thumb_{size}.jpg"
+
+
+def _failed_marker(remote_path):
+    return os.path.join(_FAILED_DIR, hashlib.sha256(remote_path.encode('utf-8')).hexdigest())
+
+
+def thumbnail_failed(remote_path):
+    """최근 FAILED_TTL_SECONDS 안에 생성에 실패한 원본인지 (만료된 표시는 삭제)"""
+    marker = _failed_marker(remote_path)
+    try:
+        age = time.time() - os.stat(marker).st_mtime
+    except OSError:
+        return False
+    if age < FAILED_TTL_SECONDS:
+        return True
+    try:
+        os.remove(marker)
+    except OSError:
+        pass
+    return False
+
+
+def _mark_failed(remote_path):
+    try:
+        os.makedirs(_FAILED_DIR, exist_ok=True)
+        with open(_failed_marker(remote_path), 'w'):
+            pass
+    except OSError as e:
+        print(f"[Thumbnail] 실패 표시 저장 오류: {e}")
+
+
+def _get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ThreadPoolExecutor(max_workers=_POOL_WORKERS, thread_name_prefix='thumbnail')
+    return _pool
+
+
+def _render(image, max_side):
+    """긴 변을 max_side로 축소한 JPEG bytes (투명 배경은 흰색으로)"""
+    thumb = image.copy()
+    thumb.thumbnail((max_side, max_side), Image.LANCZOS)
+    if thumb.mode in ('RGBA', 'LA', 'P'):
+        thumb = thumb.convert('RGBA')
+        background = Image.new('RGB', thumb.size, (255, 255, 255))
+        background.paste(thumb, mask=thumb.split()[-1])
+        thumb = background
+    elif thumb.mode != 'RGB':
+        thumb = thumb.convert('RGB')
+    out = io.BytesIO()
+    thumb.save(out, 'JPEG', quality=_JPEG_QUALITY, optimize=True, progressive=True)
+    return out.getvalue()
+
+
+def generate_thumbnails(remote_path):
+    """원본 이미지 → 크기별 썸네일 생성/업로드. 성공한 크기 목록 반환"""
+    if not THUMBNAILS_ENABLED:
+        return []
+    from routes.subject_utils import sftp_upload_file
+
+    data = read_cached_file(remote_path)
+    if not data:
+        print(f"[Thumbnail] 원본을 읽을 수 없음: {remote_path}")
+        return []
+
+    try:
+        with Image.open(io.BytesIO(data)) as src:
+            # JPEG는 디코딩 단계에서 축소 (큰 사진도 빠르게)
+            src.draft('RGB', (max(THUMB_SIZES.values()),) * 2)
+            image = ImageOps.exif_transpose(src)
+            image.load()
+    except _DECODE_ERRORS as e:
+        print(f"[Thumbnail] 디코딩 불가 ({remote_path}): {e}")
+        _mark_failed(remote_path)
+        return []
+
+    done = []
+    try:
+        for size, max_side in THUMB_SIZES.items():
+            body = _render(image, max_side)
+            target = thumb_path(remote_path, size)
+            if sftp_upload_file(io.BytesIO(body), target):
+                store_cached_file(target, io.BytesIO(body))
+                done.append(size)
+    except Exception as e:
+        print(f"[Thumbnail] 생성 오류 ({remote_path}): {e}")
+    return done
+
+
+def _run(remote_path):
+    try:
+        generate_thumbnails(remote_path)
+    finally:
+        with _pool_lock:
+            _pending.discard(remote_path)
+
+
+def schedule_thumbnails(remote_path):
+    """백그라운드 생성 예약 (이미 생성 중이면 무시). Pillow가 없으면 아무것도 하지 않음"""
+    if not THUMBNAILS_ENABLED or not remote_path or thumbnail_failed(remote_path):
+        return False
+    with _pool_lock:
+        if remote_path in _pending:
+            return False
+        _pending.add(remote_path)
+    try:
+        _get_pool().submit(_run, remote_path)
+    except Exception as e:
+        print(f"[Thumbnail] 작업 예약 실패: {e}")
+        with _pool_lock:
+            _pending.discard(remote_path)
+        return False
+    return True
@@ -8,6 +8,7 @@
 """
 import random
 import copy
+from utils.student_week import rebuild_student_weeks
 
 DAYS = ['월', '화', '수', '목', '금']
 DAY_IDX = {'월': 0, '화': 1, '수': 2, '목': 3, '금': 4}
@@ -593,11 +594,13 @@ def refresh_homeroom_timetable(cursor, school_id):
     if not fixed_subjects:
         return 0
 
+    rows_seen = 0
     for subj in fixed_subjects:
         cursor.execute(
             "SELECT id, grade, class_no FROM timetable WHERE school_id=%s AND subject=%s",
             (school_id, subj))
         rows = cursor.fetchall()
+        rows_seen += len(rows)
         for r in rows:
             hk = f"{r['grade']}_{r['class_no']}"
             hr = hmap.get(hk)
@@ -610,4 +613,6 @@ def refresh_homeroom_timetable(cursor, school_id):
                 cursor.execute(
                     "UPDATE timetable SET member_id='', member_name='(담임)' WHERE id=%s",
                     (r['id'],))
+    if rows_seen:
+        rebuild_student_weeks(cursor, school_id)
     return updated
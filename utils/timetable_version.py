@@ -0,0 +1,63 @@
+"""
+학교별 시간표 버전 카운터 + 조건부 GET
+- 시간표 데이터(timetable, timetable_tea, timetable_changes)를 바꾸는 모든 쓰기 경로는
+  커밋 후 bump_timetable_version(school_id) 호출
+- 조회 API는 @timetable_conditional 로 선언: 버전 + 요청 인자로 ETag를 만들고,
+  클라이언트 If-None-Match가 현재 버전이면 DB를 거치지 않고 304 반환
+- school_id 없이 member_school로만 조회하는 요청은 버전 키가 없으므로 그대로 처리
+"""
+
+import hashlib
+from functools import wraps
+
+from flask import request, make_response
+
+from utils.cache_version import get_version, bump_version
+
+_CACHE_CONTROL = 'private, no-cache'
+
+
+def timetable_version(school_id):
+    return get_version('timetable', school_id, init=True)
+
+
+def bump_timetable_version(school_id):
+    if school_id:
+        bump_version('timetable', school_id)
+
+
+def _etag(school_id, extra_versions):
+    parts = [request.path, str(timetable_version(school_id))]
+    parts += [str(get_version(ns, key(school_id))) for ns, key in extra_versions]
+    parts += [f"{k}={v}" for k, v in sorted(request.args.items(multi=True))]
+    return hashlib.sha1('|'.join(parts).encode('utf-8')).hexdigest()
+
+
+def timetable_conditional(*extra_versions):
+    """
+    시간표 조회 라우트용 ETag/304 데코레이터.
+    extra_versions: 응답에 함께 들어가는 다른 데이터의 버전 [(namespace, school_id → key), ...]
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated(*args, **kwargs):
+            school_id = request.args.get('school_id')
+            if not school_id:
+                return f(*args, **kwargs)
+
+            etag = _etag(school_id, extra_versions)
+            if request.if_none_match.contains_weak(etag):  # gzip 응답의 약한 ETag도 일치로 취급
+                response = make_response('', 304)
+                response.set_etag(etag)
+                response.headers['Cache-Control'] = _CACHE_CONTROL
+                return response
+
+            response = make_response(f(*args, **kwargs))
+            if response.status_code == 200:
+                data = response.get_json(silent=True)
+                if data and data.get('success'):
+                    response.set_etag(etag)
+                    response.headers['Cache-Control'] = _CACHE_CONTROL
+            return response
+        return decorated
+    return decorator